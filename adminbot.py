@@ -5,12 +5,18 @@ from functools import wraps
 import logging
 
 from telegram import Update, Message
-from telegram.ext import ApplicationBuilder, Defaults, ContextTypes, filters
+from telegram.ext import Application, Defaults, ContextTypes, filters
 from telegram.ext import CommandHandler, MessageHandler, ConversationHandler
 
 from bookparse import BookReader
-from database import Database
-from config import DOWNLOAD_DIR, DB_CONFIG, ADMIN_BOT_TOKEN
+from database import Database, AsyncDatabase
+from ingress import application_builder, run_application
+from sendqueue import SendQueue
+from config import DOWNLOAD_DIR, DB_CONFIG, ADMIN_BOT_TOKEN, DB_POOL_SIZE, DB_POOL_TIMEOUT
+from config import INSERT_BATCH_SIZE, INSERT_BATCH_BYTES
+from config import ROLE_CACHE_SIZE, ROLE_CACHE_TTL, ADMIN_WEBHOOK_PORT
+from config import SEND_GLOBAL_RATE, SEND_CHAT_RATE, SEND_GROUP_RATE, SEND_BURST, SEND_MAX_RETRIES
+from config import SEND_CHAT_QUEUE_SIZE
 
 
 NO_RIGHTS_MSG = "У вас нет прав на использование этого бота."
@@ -39,6 +45,11 @@ COUNTS_MSG = """<b>Статистика по чатам:</b>
 Заблокированные: {}
 Админы: {}
 """
+POOL_STATS_MSG = """<b>Соединения с базой данных:</b>
+Заняты: {in_use} из {size}
+Выдано: {checkouts}
+Ожидания: {waits} ({wait_time} с)
+"""
 SHOW_ADMINS_MSG = "<b>Список администраторов:</b>\n"
 NEW_ADMIN_INSTRUCTIONS_MSG = """Вы хотите добавить нового администратора.
 <b>Новый администратор будет иметь все права, что и вы.
@@ -68,7 +79,8 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-db: Database
+db: AsyncDatabase
+send_queue: SendQueue
 
 def admin_check(action):
     @wraps(action)
@@ -76,21 +88,21 @@ def admin_check(action):
                       context: ContextTypes.DEFAULT_TYPE, 
                       *args, **kwargs):
         chat_id = update.effective_chat.id
-        if db.check_for_admin(chat_id):
+        if await db.check_for_admin(chat_id):
             return await action(update, context, *args, **kwargs)
         else:
-            await context.bot.send_message(chat_id, text=NO_RIGHTS_MSG)
+            send_queue.send_message(chat_id, text=NO_RIGHTS_MSG)
     return wrapper
 
 @admin_check
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await context.bot.send_message(update.effective_chat.id, 
-                                   text=GREET_MSG)
+    send_queue.send_message(update.effective_chat.id, 
+                            text=GREET_MSG)
 
 @admin_check    
 async def help(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await context.bot.send_message(update.effective_chat.id,
-                                   text=HELP_MSG)
+    send_queue.send_message(update.effective_chat.id,
+                            text=HELP_MSG)
 
 async def download_file(message: Message) -> Path:
     attachment = message.effective_attachment
@@ -103,18 +115,27 @@ async def download_file(message: Message) -> Path:
 async def new_book(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """upload book in .txt fromat to database"""
     chat_id = update.effective_chat.id
-    await context.bot.send_message(chat_id, text=FILE_UPLOADED_MSG)
+    send_queue.send_message(chat_id, text=FILE_UPLOADED_MSG)
+    book = None
     try:
         path = await download_file(update.effective_message)
-        db.insert_book(BookReader.read_book(path))
+        # reading of a big book takes time, don't block the bot
+        book = await asyncio.to_thread(BookReader.read_book, path, lazy=True)
+        if book.pages is None:
+            raise ValueError(f"there is no text after the header in {path}")
+        await db.insert_book(book, batch_size=INSERT_BATCH_SIZE, batch_bytes=INSERT_BATCH_BYTES)
     except UnicodeDecodeError as exc:
-        await context.bot.send_message(chat_id, text=UNICODE_ERR_MSG)
+        send_queue.send_message(chat_id, text=UNICODE_ERR_MSG)
         logging.error(exc)
     except Exception as exc:
-        await context.bot.send_message(chat_id, text=FILE_ERR_MSG)
+        send_queue.send_message(chat_id, text=FILE_ERR_MSG)
         logging.error(exc)
     else:
-        await context.bot.send_message(chat_id, text=FILE_DONE_MSG)
+        send_queue.send_message(chat_id, text=FILE_DONE_MSG)
+    finally:
+        # temporary file with pages
+        if book is not None and book.pages is not None:
+            book.pages.close()
 
 @admin_check
 async def see_logs(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -125,24 +146,27 @@ async def see_logs(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def users_counts(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """sends message with number of users"""
     chat_id = update.effective_chat.id
-    await context.bot.send_message(chat_id,
-                                   text=COUNTS_MSG.format(*db.users_counts()))
+    message = COUNTS_MSG.format(*await db.users_counts())
+    pool_stats = db.sync.pool_stats()
+    if pool_stats is not None:
+        message += POOL_STATS_MSG.format(**pool_stats)
+    send_queue.send_message(chat_id, text=message)
     
 @admin_check
 async def show_admins(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
-    admins = db.search_admins()
-    await context.bot.send_message(chat_id,
-                                   text=SHOW_ADMINS_MSG + str(admins))
+    admins = await db.search_admins()
+    send_queue.send_message(chat_id,
+                            text=SHOW_ADMINS_MSG + str(admins))
     
 async def my_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
-    await context.bot.send_message(chat_id, text=chat_id)
+    send_queue.send_message(chat_id, text=chat_id)
 
 @admin_check
 async def new_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
-    await context.bot.send_message(chat_id, NEW_ADMIN_INSTRUCTIONS_MSG)
+    send_queue.send_message(chat_id, NEW_ADMIN_INSTRUCTIONS_MSG)
     return ADD_STATE # ConversationHandler state
 
 @admin_check
@@ -151,23 +175,23 @@ async def record_new_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         admin_chat_id = int(update.effective_message.text)
     except ValueError:
-        await context.bot.send_message(chat_id, INVALID_ID_MSG)
+        send_queue.send_message(chat_id, INVALID_ID_MSG)
         return ADD_STATE # ConversationHandler state
-    db.new_admin(admin_chat_id)
-    await context.bot.send_message(chat_id, ADMIN_ADDED_MSG)
+    await db.new_admin(admin_chat_id)
+    send_queue.send_message(chat_id, ADMIN_ADDED_MSG)
     return ConversationHandler.END
 
 @admin_check
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
-    await context.bot.send_message(chat_id, CANCEL_MSG)
+    send_queue.send_message(chat_id, CANCEL_MSG)
     return ConversationHandler.END
 
 @admin_check
 async def reconnect_adminbot_db(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
-    db.reconnect()
-    await context.bot.send_message(chat_id, DB_RECONNECT_MSG)
+    await db.reconnect()
+    send_queue.send_message(chat_id, DB_RECONNECT_MSG)
 
 @admin_check
 async def clear_download_cache(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -183,42 +207,63 @@ async def clear_download_cache(update: Update, context: ContextTypes.DEFAULT_TYP
     # split message by 2048 characters (4096 is limit for latin characters)
     messages = [message[i:i+2048] for i in range(0, len(message), 2048)]
     for m in messages:
-        await context.bot.send_message(chat_id, m)
-        await asyncio.sleep(1)
+        # parts are sent one by one, so a failed part stops the rest
+        await send_queue.send_message(chat_id, m)
 
 @admin_check
 async def ban_chats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     try:
         ban_ids = list(map(int, context.args))
-        if db.ban_users(ban_ids) == None:
+        if await db.ban_users(ban_ids) == None:
             raise ValueError
-        await context.bot.send_message(chat_id, SUCCESS_BAN_MSG)
+        send_queue.send_message(chat_id, SUCCESS_BAN_MSG)
     except ValueError:
-        await context.bot.send_message(chat_id, INVALID_BAN_ID_MSG)
+        send_queue.send_message(chat_id, INVALID_BAN_ID_MSG)
 
 @admin_check
 async def unban_chats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     try:
         ban_ids = list(map(int, context.args))
-        if db.unban_users(ban_ids) == None:
+        if await db.unban_users(ban_ids) == None:
             raise ValueError
-        await context.bot.send_message(chat_id, SUCCESS_UNBAN_MSG)
+        send_queue.send_message(chat_id, SUCCESS_UNBAN_MSG)
     except ValueError:
-        await context.bot.send_message(chat_id, INVALID_UNBAN_ID_MSG)
+        send_queue.send_message(chat_id, INVALID_UNBAN_ID_MSG)
+
+async def start_send_queue(application: Application):
+    send_queue.start(application.bot)
+
+async def flush_messages(application: Application):
+    await send_queue.stop()
+
+async def close_database(application: Application):
+    db.shutdown()
 
 # there are no remove_admin method because new admin can remove old one 
 # (at least for now)
 
 def main():
-    global db
-    db = Database(DB_CONFIG)
+    global db, send_queue
+    db = AsyncDatabase(Database(DB_CONFIG, 
+                                pool_size=DB_POOL_SIZE,
+                                pool_timeout=DB_POOL_TIMEOUT,
+                                role_cache_size=ROLE_CACHE_SIZE,
+                                role_cache_ttl=ROLE_CACHE_TTL))
+    send_queue = SendQueue(SEND_GLOBAL_RATE, 
+                           SEND_CHAT_RATE, 
+                           SEND_GROUP_RATE, 
+                           burst=SEND_BURST, 
+                           max_retries=SEND_MAX_RETRIES,
+                           max_chat_pending=SEND_CHAT_QUEUE_SIZE)
 
     defaults = Defaults(parse_mode='HTML')
-    applaction = ApplicationBuilder().defaults(defaults)     \
-                                     .token(ADMIN_BOT_TOKEN) \
-                                     .build()
+    applaction = application_builder(ADMIN_BOT_TOKEN).defaults(defaults) \
+                                                     .post_init(start_send_queue) \
+                                                     .post_stop(flush_messages) \
+                                                     .post_shutdown(close_database) \
+                                                     .build()
     
     start_handler = CommandHandler('start', start)
     help_handler = CommandHandler('help', help)
@@ -254,7 +299,7 @@ def main():
 
     logging.getLogger("httpx").setLevel(logging.WARNING)
 
-    applaction.run_polling()
+    run_application(applaction, url_path="adminbot", port=ADMIN_WEBHOOK_PORT)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,23 @@
+# Build sentence index (`page.sentences`) for books uploaded before it was introduced
+
+import logging
+
+import mysql.connector
+
+from database import Database
+from config import DB_CONFIG
+
+BATCH_SIZE = 500
+
+logging.basicConfig(level=logging.INFO)
+
+
+if __name__ == '__main__':
+    logging.getLogger(mysql.connector.__name__).setLevel(logging.WARNING)
+    db = Database(DB_CONFIG)
+    db.add_sentence_index()
+    total = 0
+    while updated := db.backfill_sentence_index(BATCH_SIZE):
+        total += updated
+        logging.info(f"pages indexed: {total}")
+    logging.info("Done.")
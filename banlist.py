@@ -0,0 +1,180 @@
+import logging
+import time
+from array import array
+from bisect import bisect_left
+from datetime import timedelta
+from heapq import merge
+from typing import Iterable, Iterator, Optional
+
+MAX_CHAT_ID = 2 ** 64 - 1
+
+
+class ChatIdSet:
+    """
+    Compact immutable set of chat ids (8 bytes per id).
+
+    Ids are kept in a sorted `array('Q')` and searched by bisection.
+    Small updates are kept in two ordinary sets (`added`, `removed`) on top
+    of the array; they are merged into a new array when they become
+    larger than `1/overlay_ratio` of it.
+    """
+    _ids: array
+    _added: frozenset
+    _removed: frozenset
+
+    def __init__(self, 
+                 ids: Iterable[int] = (), 
+                 overlay_ratio: int = 64, 
+                 *, 
+                 _sorted: Optional[array] = None):
+        if _sorted is None:
+            _sorted = self._build(ids)
+        self._ids = _sorted
+        self._added = frozenset()
+        self._removed = frozenset()
+        self._overlay_ratio = overlay_ratio
+
+    def __contains__(self, chat_id: int) -> bool:
+        if chat_id in self._added:
+            return True
+        return chat_id not in self._removed and self._in_array(chat_id)
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._added) - len(self._removed)
+
+    def __iter__(self) -> Iterator[int]:
+        removed = self._removed
+        base = (i for i in self._ids if i not in removed) if removed else iter(self._ids)
+        return merge(base, sorted(self._added))
+
+    def updated(self, added: Iterable[int], removed: Iterable[int]) -> 'ChatIdSet':
+        """New set with `added` ids and without `removed` ones"""
+        new_added, new_removed = set(self._added), set(self._removed)
+        for chat_id in added:
+            if self._in_array(chat_id):
+                new_removed.discard(chat_id)
+            else:
+                new_added.add(chat_id)
+        for chat_id in removed:
+            if self._in_array(chat_id):
+                new_removed.add(chat_id)
+            else:
+                new_added.discard(chat_id)
+        result = ChatIdSet(overlay_ratio=self._overlay_ratio, _sorted=self._ids)
+        result._added = frozenset(new_added)
+        result._removed = frozenset(new_removed)
+        if len(new_added) + len(new_removed) > len(self._ids) // self._overlay_ratio:
+            return result.compacted()
+        return result
+
+    def compacted(self) -> 'ChatIdSet':
+        """Same set with all updates merged into the array"""
+        return ChatIdSet(overlay_ratio=self._overlay_ratio, _sorted=array('Q', self))
+
+    def nbytes(self) -> int:
+        """Approximate memory used by ids"""
+        return (self._ids.itemsize * len(self._ids) 
+                + 64 * (len(self._added) + len(self._removed)))
+
+    @staticmethod
+    def _build(ids: Iterable[int]) -> array:
+        # ids are appended to the array as they come, sorted ids
+        #  (`get_banned_users` orders them) are never copied to a list
+        result = array('Q')
+        ordered = True
+        for chat_id in ids:
+            if not 0 <= chat_id <= MAX_CHAT_ID:
+                continue
+            if result and chat_id <= result[-1]:
+                if chat_id == result[-1]:
+                    continue
+                ordered = False
+            result.append(chat_id)
+        if not ordered:
+            result = array('Q', sorted(set(result)))
+        return result
+
+    def _in_array(self, chat_id: int) -> bool:
+        if not 0 <= chat_id <= MAX_CHAT_ID:
+            return False
+        i = bisect_left(self._ids, chat_id)
+        return i < len(self._ids) and self._ids[i] == chat_id
+
+
+class BanList:
+    """
+    Set of banned chats which is updated in background by `refresh`.
+
+    `refresh` loads only bans and unbans recorded in `chat_role_log`
+    after the last loaded record (watermark). The last `log_window` records
+    before the watermark are loaded again: transactions commit out of order
+    of log ids, so a record with a lower id can appear after a higher one
+    was loaded. Only the last action of each chat is applied, so applying
+    a record twice changes nothing. The whole list is reloaded
+    on first call, when the log is unavailable and every `full_reload_interval`.
+    New set replaces the old one at once, so membership checks never wait.
+    """
+    interval: timedelta
+    watermark: Optional[int]
+    last_duration: Optional[float]
+    _chats: ChatIdSet
+
+    def __init__(self, 
+                 interval: timedelta, 
+                 full_reload_interval: timedelta, 
+                 log_window: int = 1000):
+        self.interval = interval
+        self.log_window = log_window
+        self._full_reload_interval = full_reload_interval.total_seconds()
+        self._next_full_reload = 0.0
+        self._chats = ChatIdSet()
+        self.watermark = None
+        self.last_duration = None
+
+    def __contains__(self, chat_id: int) -> bool:
+        return chat_id in self._chats
+
+    def __len__(self) -> int:
+        return len(self._chats)
+
+    async def refresh(self, db) -> None:
+        """Update the list from `db` (`AsyncDatabase`)"""
+        start = time.perf_counter()
+        changes = None
+        if self.watermark is not None and time.monotonic() < self._next_full_reload:
+            changes = await db.get_ban_changes(max(0, self.watermark - self.log_window))
+        if changes is None:
+            await self._reload(db)
+        elif changes:
+            new_changes = sum(1 for log_id, _, _ in changes if log_id > self.watermark)
+            self._apply(changes)
+            if new_changes:
+                logging.info(f"ban list: {new_changes} changes applied")
+        self.last_duration = time.perf_counter() - start
+
+    def stats(self) -> dict:
+        return {'banned': len(self._chats),
+                'bytes': self._chats.nbytes(),
+                'watermark': self.watermark,
+                'interval': self.interval.total_seconds(),
+                'last_duration': self.last_duration}
+
+    async def _reload(self, db) -> None:
+        # changes made during the reload are applied again by the next refresh
+        watermark = await db.ban_log_watermark()
+        chats = await db.get_banned_users()
+        if chats is None:
+            logging.error("ban list is not loaded, the old one is used")
+            return
+        self._chats = ChatIdSet(chats)
+        self.watermark = watermark
+        self._next_full_reload = time.monotonic() + self._full_reload_interval
+        logging.info(f"ban list reloaded: {len(self._chats)} chats")
+
+    def _apply(self, changes: list) -> None:
+        # only the last change of each chat matters
+        final = {chat_id: action for _, chat_id, action in changes}
+        added = [chat_id for chat_id, action in final.items() if action == 'grant']
+        removed = [chat_id for chat_id, action in final.items() if action != 'grant']
+        self._chats = self._chats.updated(added, removed)
+        self.watermark = max(self.watermark, changes[-1][0])
@@ -0,0 +1,54 @@
+"""
+Memory and lookup time of `banlist.ChatIdSet` compared with built-in `set`.
+
+    python -m benchmarks.bench_banlist [sizes ...]
+
+Default sizes: 10000 1000000 10000000 (10M `set` needs about 1 GB of memory).
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+from banlist import ChatIdSet
+
+LOOKUPS = 200_000
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+
+
+def measure(factory, ids: list[int]):
+    """Returns (structure, peak allocated bytes, build time)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    structure = factory(ids)
+    elapsed = time.perf_counter() - start
+    _, size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return structure, size, elapsed
+
+
+def lookup_time(structure, queries: list[int]) -> float:
+    start = time.perf_counter()
+    for q in queries:
+        q in structure
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main(sizes: list[int]):
+    print(f"{'size':>10} {'type':>10} {'memory MB':>10} {'build s':>8} {'lookup ns':>10}")
+    for size in sizes:
+        # telegram user ids are below 10^10
+        # sorted as returned by `get_banned_users`
+        ids = sorted(random.sample(range(10 ** 10), size))
+        queries = random.sample(ids, min(size, LOOKUPS // 2)) \
+                  + random.sample(range(10 ** 10), LOOKUPS // 2)
+        for name, factory in (("set", set), ("ChatIdSet", ChatIdSet)):
+            structure, memory, build = measure(factory, ids)
+            lookup = lookup_time(structure, queries)
+            print(f"{size:>10} {name:>10} {memory / 2 ** 20:>10.1f} "
+                  f"{build:>8.2f} {lookup * 1e9:>10.0f}")
+            del structure
+
+
+if __name__ == '__main__':
+    main([int(s) for s in sys.argv[1:]] or DEFAULT_SIZES)
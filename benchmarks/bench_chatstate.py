@@ -0,0 +1,92 @@
+"""
+Memory of dialogue state of many chats in the middle of a conversation:
+old `chat_data` (titles and sentences of the selected page in every chat)
+compared with `ChatState` (book id, page and number of sentences).
+
+    python -m benchmarks.bench_chatstate [chats, default 100000]
+
+Texts of pages are in the page cache of `Database` in both cases,
+so they are not counted.
+"""
+import pickle
+import random
+import sys
+import time
+import tracemalloc
+
+from chatstate import STATE_KEY, ChatState, idle_chats
+from sentsplit import encode_spans, sentences_from_index
+
+BOOKS = 50
+PAGES = 400
+SENTENCES = 20
+
+
+def make_page(book_id: int, num: int) -> tuple[str, str]:
+    """Text of a page and its sentence index as in `page` table"""
+    sentences = [f"Предложение {i} на странице {num} книги {book_id}, "
+                 f"в котором герой долго смотрел в окно и думал о судьбе."
+                 for i in range(SENTENCES)]
+    text = " ".join(sentences)
+    spans, start = [], 0
+    for sent in sentences:
+        spans.append((start, start + len(sent)))
+        start += len(sent) + 1
+    return text, encode_spans(spans)
+
+
+def old_state(books: dict, pages: dict, book_id: int, page: int) -> dict:
+    title, author, _ = books[book_id]
+    return {"author": title, "title": author,
+            "sentences": sentences_from_index(*pages[(book_id, page)]),
+            "page": page}
+
+
+def new_state(books: dict, pages: dict, book_id: int, page: int) -> ChatState:
+    state = ChatState(book_id)
+    state.select_page(page, len(sentences_from_index(*pages[(book_id, page)])))
+    return state
+
+
+def measure(make_state, chats: list, books: dict, pages: dict):
+    """Returns (chat_data of all chats, allocated bytes)"""
+    tracemalloc.start()
+    # one dict per chat as `Application.chat_data`
+    chat_data = {chat_id: {STATE_KEY: make_state(books, pages, book_id, page)}
+                 for chat_id, book_id, page in chats}
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chat_data, size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    random.seed(1)
+    # shared by all chats: cached book metadata and pages
+    books = {book_id: (f"Книга {book_id}", f"Автор {book_id}", "NULL")
+             for book_id in range(BOOKS)}
+    chats = [(chat_id, random.randrange(BOOKS), random.randrange(1, PAGES + 1))
+             for chat_id in range(count)]
+    pages = {(book_id, page): make_page(book_id, page) for _, book_id, page in chats}
+
+    print(f"{count} chats, {len(pages)} different pages")
+    print(f"{'state':>10} {'memory MB':>10} {'bytes/chat':>10} {'pickled':>8}")
+    for name, make_state in (("old dict", old_state), ("ChatState", new_state)):
+        chat_data, size = measure(make_state, chats, books, pages)
+        pickled = len(pickle.dumps(chat_data[0], pickle.HIGHEST_PROTOCOL))
+        print(f"{name:>10} {size / 2**20:>10.1f} {size / count:>10.0f} {pickled:>8}")
+
+    # `page_line` cuts sentences from the cached page again
+    start = time.perf_counter()
+    for _, book_id, page in chats[:10_000]:
+        sentences_from_index(*pages[(book_id, page)])
+    print(f"sentences of a cached page: "
+          f"{(time.perf_counter() - start) / 10_000 * 1e6:.1f} us")
+
+    start = time.perf_counter()
+    idle = idle_chats(chat_data, ttl=3600)
+    print(f"search of idle chats: {time.perf_counter() - start:.3f} s ({len(idle)} idle)")
+
+
+if __name__ == '__main__':
+    main()
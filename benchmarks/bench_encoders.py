@@ -0,0 +1,46 @@
+"""
+Encoding time and size of a quote card for each `imgen.ImageEncoder` mode.
+
+    python -m benchmarks.bench_encoders [font.ttf]
+
+Fonts from `fonts/` are used by default.
+"""
+import sys
+import timeit
+
+from imgen import ImageEncoder, QuoteImage
+from benchmarks.bench_imgen import AUTHOR, TITLE, QUOTE
+
+RUNS = 20
+ENCODERS = [
+    ImageEncoder('png'),
+    ImageEncoder('png', png_level=1),
+    ImageEncoder('png', png_level=9),
+    ImageEncoder('png-palette', colors=16),
+    ImageEncoder('png-palette', colors=64),
+    ImageEncoder('png-palette', colors=64, png_level=9),
+    ImageEncoder('jpeg', quality=80),
+    ImageEncoder('jpeg', quality=90),
+    ImageEncoder('webp', quality=80),
+    ImageEncoder('webp', quality=90),
+    ImageEncoder('png-palette', colors=64, scale=0.75),
+    ImageEncoder('jpeg', quality=85, scale=0.75),
+]
+
+
+def main(font_path: str | None):
+    fonts = {}
+    if font_path:
+        fonts = dict(author_font_path=font_path, 
+                     title_font_path=font_path, 
+                     quote_font_path=font_path)
+    image = QuoteImage(**fonts).make(AUTHOR, TITLE, QUOTE)
+    print(f"{'encoder':<60} {'ms':>7} {'KB':>7}")
+    for encoder in ENCODERS:
+        size = len(encoder.encode(image))
+        total = timeit.timeit(lambda: encoder.encode(image), number=RUNS)
+        print(f"{encoder!r:<60} {total / RUNS * 1000:7.2f} {size / 1024:7.1f}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
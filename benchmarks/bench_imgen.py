@@ -0,0 +1,70 @@
+"""
+Time of `QuoteImage.make` with the pre-rendered template compared with
+drawing of the whole picture (borders and logo included) for every quote.
+
+    python -m benchmarks.bench_imgen [font.ttf]
+
+Fonts from `fonts/` are used by default.
+"""
+import sys
+import timeit
+from functools import partial
+
+from PIL import Image, ImageDraw
+
+from imgen import QuoteImage
+
+AUTHOR = "Лев Толстой"
+TITLE = "Анна Каренина"
+QUOTE = ("Все счастливые семьи похожи друг на друга, каждая несчастливая "
+         "семья несчастлива по-своему. Все смешалось в доме Облонских.")
+RUNS = 200
+
+
+def make_without_template(generator: QuoteImage, 
+                          author: str, title: str, quote: str) -> Image.Image:
+    """`QuoteImage.make` before the template was added"""
+    image = Image.new(mode='RGB', 
+                      size=(generator._width, generator._height), 
+                      color=generator._background_color)
+    drawing = ImageDraw.Draw(image)
+    generator._draw_author(author, drawing)
+    generator._draw_title(title, drawing)
+    generator._draw_wrapped_quote(quote, drawing)
+    generator._draw_borders(drawing)
+    generator._paste_logo(image)
+    return image
+
+
+def static_layer(generator: QuoteImage) -> Image.Image:
+    """Background, borders and logo drawn from scratch"""
+    image = Image.new(mode='RGB', 
+                      size=(generator._width, generator._height), 
+                      color=generator._background_color)
+    generator._draw_borders(ImageDraw.Draw(image))
+    generator._paste_logo(image)
+    return image
+
+
+def report(name: str, func) -> None:
+    total = timeit.timeit(func, number=RUNS)
+    print(f"{name:>24}: {total / RUNS * 1000:6.2f} ms/image")
+
+
+def main(font_path: str | None):
+    fonts = {}
+    if font_path:
+        fonts = dict(author_font_path=font_path, 
+                     title_font_path=font_path, 
+                     quote_font_path=font_path)
+    generator = QuoteImage(**fonts)
+    template = generator._template
+    report("static layer: drawn", partial(static_layer, generator))
+    report("static layer: copied", template.copy)
+    report("make: without template", 
+           partial(make_without_template, generator, AUTHOR, TITLE, QUOTE))
+    report("make: with template", partial(generator.make, AUTHOR, TITLE, QUOTE))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
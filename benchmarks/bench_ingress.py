@@ -0,0 +1,284 @@
+"""
+Throughput and latency of updates in polling and webhook modes,
+measured with a local fake Telegram Bot API server (no network access needed).
+
+    python -m benchmarks.bench_ingress [--mode polling|webhook] [--updates 2000] [--rate 500]
+
+By default a minimal echo bot is started in this process. With `--external`
+only the fake server and the update poster are started, so a real bot can be
+measured (its handler for "/help" must reply with a message):
+
+    python -m benchmarks.bench_ingress --external --mode webhook
+    TELEGRAM_API_URL=http://127.0.0.1:8081 UPDATE_MODE=webhook \
+        WEBHOOK_URL=http://127.0.0.1:8443 WEBHOOK_SECRET=secret python runbot.py
+
+Latency of an update is time from its delivery to the bot
+(webhook request or `getUpdates` queue) to the reply of the bot.
+"""
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import threading
+import time
+from typing import AsyncIterator, Optional
+from urllib.parse import parse_qs
+
+import httpx
+
+TOKEN = "123456:fake-token"
+SECRET = "fake-secret"
+FIRST_CHAT_ID = 1_000_000
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "Fake", "username": "fake_bot",
+            "can_join_groups": True, "can_read_all_group_messages": False,
+            "supports_inline_queries": False}
+
+
+def _parse_params(content_type: str, body: bytes) -> dict:
+    if not body:
+        return {}
+    if content_type.startswith('application/json'):
+        return json.loads(body)
+    if content_type.startswith('multipart/form-data'):
+        boundary = content_type.split('boundary=')[1].strip('"').encode()
+        params = {}
+        for part in body.split(b'--' + boundary):
+            head, _, value = part.partition(b'\r\n\r\n')
+            name = re.search(rb'name="([^"]+)"', head)
+            if name and b'filename=' not in head:
+                params[name[1].decode()] = value.rstrip(b'\r\n').decode()
+        return params
+    return {key: values[0] for key, values in parse_qs(body.decode()).items()}
+
+
+class FakeTelegram:
+    """
+    Bot API server which delivers `count` "/help" messages from different chats
+    and records time of the replies (any `send*` method)
+    """
+    webhook: Optional[tuple[str, str]]     # (url, secret token)
+
+    def __init__(self, count: int, rate: float, connections: int):
+        self.count = count
+        self.rate = rate
+        self.connections = connections
+        self.webhook = None
+        self.sent_at = {}           # chat_id -> time of delivery
+        self.replied_at = {}        # chat_id -> time of reply
+        self.posting_errors = 0
+        self.finished = threading.Event()    # all replies are received
+        self._updates = []
+        self._loop = None
+        self._ready = None
+        self._stop = None
+        self._new_updates = None
+
+    async def serve(self, host: str, port: int) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._new_updates = asyncio.Condition()
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        async with server:
+            await self._ready.wait()
+            await self._post_updates()
+            await self._stop.wait()
+
+    def start_in_thread(self, host: str, port: int) -> threading.Thread:
+        thread = threading.Thread(target=asyncio.run, args=(self.serve(host, port),),
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        """Stop `serve` running in another thread"""
+        self._loop.call_soon_threadsafe(self._stop.set)
+
+    def report(self, mode: str) -> None:
+        latencies = sorted(self.replied_at[chat] - self.sent_at[chat]
+                           for chat in self.replied_at if chat in self.sent_at)
+        if not latencies:
+            print(f"{mode}: no replies")
+            return
+        elapsed = max(self.replied_at.values()) - min(self.sent_at.values())
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(f"{mode}: {len(latencies)}/{self.count} updates in {elapsed:.2f} s, "
+              f"{len(latencies) / elapsed:.0f} updates/s; latency ms: "
+              f"p50 {quantiles[49] * 1000:.1f}, p95 {quantiles[94] * 1000:.1f}, "
+              f"p99 {quantiles[98] * 1000:.1f}, max {latencies[-1] * 1000:.1f}"
+              + (f"; {self.posting_errors} failed posts" if self.posting_errors else ""))
+
+    def _update(self, i: int) -> dict:
+        chat_id = FIRST_CHAT_ID + i
+        return {"update_id": i + 1,
+                "message": {"message_id": 1,
+                            "date": int(time.time()),
+                            "chat": {"id": chat_id, "type": "private"},
+                            "from": {"id": chat_id, "is_bot": False, "first_name": "User"},
+                            "text": "/help",
+                            "entities": [{"type": "bot_command", "offset": 0, "length": 5}]}}
+
+    async def _arrivals(self) -> AsyncIterator[int]:
+        start = time.perf_counter()
+        for i in range(self.count):
+            if self.rate:
+                delay = start + i / self.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield i
+
+    async def _post_updates(self) -> None:
+        if self.webhook is None:
+            async for i in self._arrivals():
+                self.sent_at[FIRST_CHAT_ID + i] = time.perf_counter()
+                async with self._new_updates:
+                    self._updates.append(self._update(i))
+                    self._new_updates.notify_all()
+            return
+        url, secret = self.webhook
+        connections = asyncio.Semaphore(self.connections)
+        limits = httpx.Limits(max_connections=self.connections)
+        async with httpx.AsyncClient(limits=limits) as client:
+            async def post(i: int):
+                try:
+                    self.sent_at[FIRST_CHAT_ID + i] = time.perf_counter()
+                    response = await client.post(
+                        url, json=self._update(i),
+                        headers={"X-Telegram-Bot-Api-Secret-Token": secret})
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    self.posting_errors += 1
+                finally:
+                    connections.release()
+            tasks = []
+            async for i in self._arrivals():
+                await connections.acquire()
+                tasks.append(asyncio.create_task(post(i)))
+            await asyncio.gather(*tasks)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        try:
+            while request_line := await reader.readline():
+                path = request_line.decode().split(' ')[1]
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    name, _, value = line.decode().partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                params = _parse_params(headers.get('content-type', ''), body)
+                result = await self._api_call(path.rsplit('/', 1)[-1], params)
+                payload = json.dumps({"ok": True, "result": result}).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: %d\r\n\r\n" % len(payload) + payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # connection is closed by the bot or the server is stopped
+            pass
+        finally:
+            writer.close()
+
+    async def _api_call(self, method: str, params: dict):
+        if method == 'getMe':
+            return BOT_USER
+        if method == 'setWebhook':
+            self.webhook = (params['url'], params.get('secret_token', ''))
+            self._ready.set()
+            return True
+        if method == 'getUpdates':
+            self._ready.set()
+            return await self._get_updates(int(params.get('offset') or 0),
+                                           int(params.get('limit') or 100),
+                                           float(params.get('timeout') or 0))
+        if method.startswith('send') or method.startswith('edit'):
+            chat_id = int(params['chat_id'])
+            self.replied_at.setdefault(chat_id, time.perf_counter())
+            if len(self.replied_at) >= self.count:
+                self.finished.set()
+            return {"message_id": len(self.replied_at),
+                    "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "text": params.get('text', '')}
+        return True
+
+    async def _get_updates(self, offset: int, limit: int, timeout: float) -> list:
+        async with self._new_updates:
+            # confirmed updates are not needed anymore
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            if not self._updates:
+                try:
+                    await asyncio.wait_for(self._new_updates.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            return self._updates[:limit]
+
+
+def run_echo_bot(server: FakeTelegram, mode: str, api_url: str,
+                 webhook_port: int, concurrent_updates: int, delay: float) -> None:
+    """
+    Minimal bot which answers every message after `delay` seconds 
+    (e.g. slow rendering), stops after all updates
+    """
+    from telegram import Update
+    from telegram.ext import ApplicationBuilder, ContextTypes, MessageHandler, filters
+    from chatorder import ChatOrderedUpdateProcessor
+
+    async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if delay:
+            await asyncio.sleep(delay)
+        await context.bot.send_message(update.effective_chat.id, "ok")
+        if len(server.replied_at) >= server.count:
+            context.application.stop_running()
+
+    application = ApplicationBuilder().token(TOKEN) \
+                                      .base_url(f"{api_url}/bot") \
+                                      .concurrent_updates(
+                                          ChatOrderedUpdateProcessor(concurrent_updates)) \
+                                      .build()
+    application.add_handler(MessageHandler(filters.ALL, echo))
+    if mode == 'polling':
+        application.run_polling(poll_interval=0)
+    else:
+        application.run_webhook(listen='127.0.0.1',
+                                port=webhook_port,
+                                url_path="bot",
+                                webhook_url=f"http://127.0.0.1:{webhook_port}/bot",
+                                secret_token=SECRET,
+                                max_connections=server.connections)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare polling and webhook modes")
+    parser.add_argument('--mode', choices=('polling', 'webhook'), default='polling')
+    parser.add_argument('--updates', type=int, default=2000)
+    parser.add_argument('--rate', type=float, default=500,
+                        help="updates per second (0 - as fast as possible)")
+    parser.add_argument('--connections', type=int, default=40,
+                        help="parallel webhook requests (as `max_connections` of Telegram)")
+    parser.add_argument('--concurrent-updates', type=int, default=1,
+                        help="updates handled at the same time by the echo bot")
+    parser.add_argument('--handler-delay', type=float, default=0,
+                        help="seconds spent by the echo bot on each update")
+    parser.add_argument('--api-port', type=int, default=8081)
+    parser.add_argument('--webhook-port', type=int, default=8443)
+    parser.add_argument('--external', action='store_true',
+                        help="measure a bot started separately")
+    parser.add_argument('--timeout', type=float, default=300)
+    args = parser.parse_args()
+
+    server = FakeTelegram(args.updates, args.rate, args.connections)
+    thread = server.start_in_thread('127.0.0.1', args.api_port)
+    if args.external:
+        print(f"fake Bot API: http://127.0.0.1:{args.api_port}, waiting for the bot...")
+    else:
+        run_echo_bot(server, args.mode, f"http://127.0.0.1:{args.api_port}",
+                     args.webhook_port, args.concurrent_updates, args.handler_delay)
+    server.finished.wait(args.timeout)
+    server.report(args.mode)
+    server.stop()
+    thread.join()
+
+
+if __name__ == '__main__':
+    main()
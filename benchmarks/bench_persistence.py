@@ -0,0 +1,53 @@
+"""
+Write and restore time of `chat_data` of many chats in `SqlitePersistence`.
+
+    python -m benchmarks.bench_persistence [chats, default 1000000]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from persistence import SqlitePersistence
+
+
+def chat_data(chat_id: int) -> dict:
+    # state left by `set_book` and `select_page`
+    return {chat_id: {"author": "Лев Николаевич Толстой",
+                      "title": "Война и мир",
+                      "page": chat_id % 500}}
+
+
+async def write(path: str, chats: int) -> float:
+    persistence = SqlitePersistence(path)
+    start = time.perf_counter()
+    for chat_id in range(chats):
+        await persistence.update_chat_data(chat_id, chat_data(chat_id))
+    await persistence.flush()
+    return time.perf_counter() - start
+
+
+async def restore(path: str) -> tuple[float, int]:
+    persistence = SqlitePersistence(path)
+    start = time.perf_counter()
+    restored = await persistence.get_chat_data()
+    elapsed = time.perf_counter() - start
+    await persistence.flush()
+    return elapsed, len(restored)
+
+
+def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "state.sqlite3")
+        elapsed = asyncio.run(write(path, chats))
+        size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+        print(f"write:   {chats} chats in {elapsed:.2f} s, file {size / 2**20:.1f} MB "
+              f"({size / chats:.0f} bytes per chat)")
+        elapsed, restored = asyncio.run(restore(path))
+        print(f"restore: {restored} chats in {elapsed:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare sentence tokenizers: import/load time and time per page.
+
+    python -m benchmarks.bench_sentsplit [book.txt ...]
+
+Without arguments a short story is used.
+"""
+import subprocess
+import sys
+import timeit
+
+import sentsplit
+from bookparse import BookReader, Book
+
+ENGINES = ("builtin", "nltk")
+# LLM generated text (the same as in the tests):
+STORY = """Медведи живут в тайге. Они едят ягоды, грибы и орехи. У них есть медведица и медвежата. 
+Медведя зовут Миша. Он самый сильный медведь в лесу. 
+Миша любит свою семью и защищает их от других зверей. А медвежата любят играть с мамой-медведем. 
+Она их кормит, защищает и учит охотиться. 
+Однажды Миша увидел, что на поляну вышел большой медведь. Миша испугался и спрятался за деревом. 
+Но медведь его не заметил. Медведь наелся ягод и решил уйти. Он пошел в другую сторону.
+Как-то раз в далекой-далекой стране жил-был юный принц. Он был очень умным, талантливым и добрым. 
+У него было много друзей, но однажды он решил отправиться в путешествие, чтобы найти себя. 
+И вот он отправился в путь, и ему казалось, что он идет уже целую вечность. 
+Но, пройдя множество стран, он понял, что путешествует всего лишь два года. 
+Вначале он думал, что это какой-то другой мир, но потом понял, что просто не может вернуться домой.
+"""
+LOAD_CODE = """
+import time
+start = time.perf_counter()
+import sentsplit
+sentsplit.SENT_TOKENIZER = {engine!r}
+sentsplit.split_sentences("Тест. Тест.")
+print(time.perf_counter() - start)
+"""
+
+
+def load_time(engine: str) -> float:
+    """Import and first call time in a fresh interpreter"""
+    result = subprocess.run([sys.executable, "-c", LOAD_CODE.format(engine=engine)],
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout)
+
+
+def page_time(engine: str, pages: list[str]) -> float:
+    """Average time of splitting one page"""
+    sentsplit.SENT_TOKENIZER = engine
+    runs = max(1, 2000 // len(pages))
+    total = timeit.timeit(lambda: [sentsplit.split_sentences(p) for p in pages],
+                          number=runs)
+    return total / (runs * len(pages))
+
+
+def main(paths: list[str]):
+    if paths:
+        books = {p: BookReader.read_book(p, lazy=True).pages for p in paths}
+    else:
+        books = {"story": Book(text=STORY * 20).pages}
+    for engine in ENGINES:
+        try:
+            print(f"{engine:>8}: load {load_time(engine) * 1000:8.1f} ms")
+        except subprocess.CalledProcessError:
+            print(f"{engine:>8}: not available (see nltk_setup.py)")
+            continue
+        for name, pages in books.items():
+            pages = list(pages)
+            print(f"{'':>8}  {name}: {page_time(engine, pages) * 1e6:8.1f} us/page"
+                  f" ({len(pages)} pages)")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
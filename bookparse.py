@@ -1,8 +1,13 @@
 import logging
-from typing import List, Optional
+import tempfile
+from array import array
+from itertools import chain
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sequence
 
 LINE_SYMBOLS = 55
 PAGE_SYMBOLS = 50
+# characters read from a file at once in lazy mode
+READ_CHUNK_SIZE = 64 * 1024
 
 
 logging.basicConfig(
@@ -14,7 +19,7 @@ class Book:
     author: str
     title: str
     info: str
-    pages: Optional[List[str]]
+    pages: Optional[Sequence[str]]
 
     def __init__(self, 
                  author: str = "",
@@ -27,7 +32,7 @@ class Book:
         if text:
             self.pages = self.pages_from_text(text)
         else:
-            self.pages = text       # None
+            self.pages = None
 
     def __str__(self) -> str:
         return f"'{self.title}', '{self.author}', '{self.info}'"
@@ -35,19 +40,7 @@ class Book:
     def pages_from_text(self, raw_text: str) -> List[str]:
         """Split text by pages with `LINE_SYMBOLS` on a line
         and `PAGE_SYMBOLS` lines on a page"""
-        paragraphs = [p for p in raw_text.split('\n') if p]
-        lines = [""]
-        for p in paragraphs:
-            words = p.split()
-            self._add_lines(lines, words)
-        pages =[[]]
-        for index, line in enumerate(lines):
-            pages[-1].append(line)
-            if (index + 1) % PAGE_SYMBOLS == 0:
-                pages.append([])
-         # list of lines to one string object for each page
-        pages = ["\n".join(p) for p in pages]
-        return pages
+        return list(paginate([raw_text]))
 
     def _add_lines(self, lines: List[str], words: List[str]) -> None:
         """Adds words to last line if it's length < `LINE_SYMBOLS`, 
@@ -63,10 +56,136 @@ class Book:
         lines.append("") # new line at the end of the paragraph
 
 
+class Paginator:
+    """
+    Incremental version of `Book.pages_from_text`.
+
+    Text is passed in chunks of any size with `feed`, finished pages
+    are returned as soon as they are complete. Call `close` after
+    the last chunk to get the rest of the text.
+    Only the current page and an unfinished word are kept in memory.
+    """
+    _line_symbols: int
+    _page_symbols: int
+    _words: List[str]       # words of the current line
+    _line_len: int          # length of the current line with spaces
+    _lines: List[str]       # finished lines of the current page
+    _tail: str              # unfinished part of the current paragraph
+    _in_paragraph: bool     # some part of the paragraph is already processed
+
+    def __init__(self):
+        self._line_symbols = LINE_SYMBOLS
+        self._page_symbols = PAGE_SYMBOLS
+        self._words = []
+        self._line_len = 0
+        self._lines = []
+        self._tail = ""
+        self._in_paragraph = False
+
+    def feed(self, chunk: str) -> List[str]:
+        """Process next `chunk` of text. Returns pages finished by this chunk"""
+        pages = []
+        paragraphs = (self._tail + chunk).split('\n')
+        self._tail = paragraphs.pop()
+        for p in paragraphs:
+            if p or self._in_paragraph:
+                self._add_words(p.split(), pages)
+                self._end_line(pages)
+            self._in_paragraph = False
+        # long paragraph: take complete words, keep the last one
+        # because it can continue in the next chunk
+        if self._tail:
+            self._in_paragraph = True
+            words = self._tail.split()
+            if words and not self._tail[-1].isspace():
+                self._tail = words.pop()
+            else:
+                self._tail = ""
+            self._add_words(words, pages)
+        return pages
+
+    def close(self) -> List[str]:
+        """Process the rest of the text. Returns the last pages"""
+        pages = self.feed('\n') if self._tail or self._in_paragraph else []
+        self._end_line(pages)
+        pages.append("\n".join(self._lines))
+        self._lines = []
+        return pages
+
+    def _add_words(self, words: List[str], pages: List[str]) -> None:
+        """Same rules as `Book._add_lines`, but the line is kept as list of words"""
+        for w in words:
+            if self._line_len + len(w) < self._line_symbols:
+                if self._words:
+                    self._line_len += 1
+                self._words.append(w)
+                self._line_len += len(w)
+            else:
+                self._end_line(pages)
+                self._words.append(w)
+                self._line_len = len(w)
+
+    def _end_line(self, pages: List[str]) -> None:
+        self._lines.append(" ".join(self._words))
+        self._words = []
+        self._line_len = 0
+        if len(self._lines) == self._page_symbols:
+            pages.append("\n".join(self._lines))
+            self._lines = []
+
+
+def paginate(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Generator of pages from text given as iterable of chunks
+    (e.g. file object). Result is the same as `Book.pages_from_text`
+    """
+    paginator = Paginator()
+    for chunk in chunks:
+        yield from paginator.feed(chunk)
+    yield from paginator.close()
+
+
+class SpilledPages(Sequence[str]):
+    """
+    Read-only sequence of pages stored in a temporary file.
+    In memory there are only offsets of the pages (8 bytes per page).
+    The file is deleted on `close` or when the object is garbage collected.
+    """
+    _file: BinaryIO
+    _offsets: array
+
+    def __init__(self, pages: Iterable[str]):
+        self._file = tempfile.TemporaryFile()
+        self._offsets = array('Q', [0])
+        for page in pages:
+            self._offsets.append(self._offsets[-1] + self._file.write(page.encode()))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError('page index out of range')
+        start, end = self._offsets[index], self._offsets[index + 1]
+        self._file.seek(start)
+        return self._file.read(end - start).decode()
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self) -> None:
+        self._file.close()
+
+
 class BookReader:
 
     @staticmethod
-    def read_book(file_path: str) -> Book:
+    def read_book(file_path: str, lazy: bool = False) -> Book:
         """Reads book from `file_path`. 
         First 4 lines must be formatted as follows:\n
         ```
@@ -75,8 +194,13 @@ class BookReader:
         \n
         Some information about the book.
         ```
+        With `lazy=True` the text is paginated while reading
+        and pages are kept on disk (see `SpilledPages`),
+        so memory usage doesn't depend on the size of the book.
         """
         logging.info(f'reading book {file_path}')
+        if lazy:
+            return BookReader._read_book_lazy(file_path)
         with open(file_path, "r", encoding='utf-8') as file:
             raw_text = file.readlines()
         book = Book(author=raw_text[0].strip(),
@@ -84,3 +208,17 @@ class BookReader:
                     info=raw_text[3].strip(),
                     text="".join(raw_text[4:]))
         return book
+
+    @staticmethod
+    def _read_book_lazy(file_path: str) -> Book:
+        with open(file_path, "r", encoding='utf-8') as file:
+            header = [file.readline() for _ in range(4)]
+            book = Book(author=header[0].strip(),
+                        title=header[1].strip(),
+                        info=header[3].strip())
+            first_chunk = file.read(READ_CHUNK_SIZE)
+            # without text after the header pages are `None` as in `Book`
+            if first_chunk:
+                chunks = chain([first_chunk], iter(lambda: file.read(READ_CHUNK_SIZE), ""))
+                book.pages = SpilledPages(paginate(chunks))
+        return book
@@ -0,0 +1,138 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache limited by total size of values in bytes.
+
+    Size of a value is computed by `sizeof` (`sys.getsizeof` by default).
+    The least recently used values are evicted when the size exceeds `max_bytes`.
+
+    A value loaded from a slow source without a lock is stored by
+    `finish_load` only if its key was not changed (`put`, `discard`,
+    `invalidate`) after `start_load`, so an older value never replaces
+    a newer change.
+    """
+    max_bytes: int
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+    _data: OrderedDict      # key -> (value, size of value)
+    _loads: dict            # key -> [loads in progress, generation of the key]
+
+    def __init__(self,
+                 max_bytes: int,
+                 sizeof: Callable[[Any], int] = sys.getsizeof):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._data = OrderedDict()
+        self._loads = {}
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Add `value` to the cache. Values bigger than `max_bytes` are not stored"""
+        size = self._sizeof(value)
+        with self._lock:
+            self._changed(key)
+            self._store(key, value, size)
+
+    def discard(self, key: Hashable) -> None:
+        """Remove value of `key` if it is cached"""
+        with self._lock:
+            self._changed(key)
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+
+    def start_load(self, key: Hashable) -> int:
+        """
+        Generation of `key` before its value is loaded.
+        Every `start_load` must be followed by `finish_load`
+        """
+        with self._lock:
+            load = self._loads.setdefault(key, [0, 0])
+            load[0] += 1
+            return load[1]
+
+    def finish_load(self, key: Hashable, value: Any, generation: int) -> bool:
+        """
+        Store loaded `value` (`None` - nothing is loaded) if `key`
+        is not changed since `start_load` returned `generation`
+        """
+        size = 0 if value is None else self._sizeof(value)
+        with self._lock:
+            load = self._loads[key]
+            load[0] -= 1
+            if load[0] == 0:
+                del self._loads[key]
+            if value is None or load[1] != generation:
+                return False
+            self._store(key, value, size)
+            return True
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Remove values with keys that satisfy `predicate`. Returns number of removed"""
+        with self._lock:
+            for key in self._loads:
+                if predicate(key):
+                    self._loads[key][1] += 1
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                self.size -= self._data.pop(key)[1]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def _changed(self, key: Hashable) -> None:
+        load = self._loads.get(key)
+        if load is not None:
+            load[1] += 1
+
+    def _store(self, key: Hashable, value: Any, size: int) -> None:
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        if size > self.max_bytes:
+            return
+        self._data[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted_size) = self._data.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._data),
+                    'bytes': self.size,
+                    'max_bytes': self.max_bytes,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions}
@@ -0,0 +1,76 @@
+import logging
+from typing import Any, Callable, List, Optional, Tuple
+
+bookRowT = Tuple[int, str, str]     # (id, title, author)
+
+# rows loaded from database by one query
+LOAD_CHUNK = 1000
+
+
+class BookCatalog:
+    """
+    In-memory list of available books ordered by id with cached menus.
+
+    Books are loaded from database by chunks using keyset pagination
+    (`Database.search_book` with `after_id`). Menu of each page is built
+    once by `build_menu(book_rows, page_num)`, where `book_rows` contains
+    one extra row if there is a next page.
+    Catalog is reloaded and menus are dropped when `refresh` finds
+    that books in database have changed.
+    """
+    _books: List[bookRowT]
+    _menus: dict                 # page number -> menu
+    _version: Optional[tuple]    # (count of books, max id)
+
+    def __init__(self, rows_per_page: int, build_menu: Callable[[list, int], Any]):
+        self.rows_per_page = rows_per_page
+        self._build_menu = build_menu
+        self._books = []
+        self._menus = {}
+        self._version = None
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    @property
+    def pages_count(self) -> int:
+        return max(1, -(-len(self._books) // self.rows_per_page))
+
+    async def load(self, db) -> None:
+        """Load all books from `db` (`AsyncDatabase`)"""
+        books = []
+        after_id = 0
+        while True:
+            rows = await db.search_book(rows_count=LOAD_CHUNK, after_id=after_id)
+            if rows is None:
+                # database error, keep the loaded catalog until the next refresh
+                logging.error(f"book catalog is not loaded: query after book {after_id} failed")
+                return
+            if not rows:
+                break
+            books += [tuple(row) for row in rows]
+            after_id = rows[-1][0]
+            if len(rows) < LOAD_CHUNK:
+                break
+        self._books = books
+        self._menus = {}
+        self._version = (len(books), books[-1][0] if books else None)
+        logging.info(f"book catalog loaded: {len(books)} books")
+
+    async def refresh(self, db) -> None:
+        """Reload books if they were inserted or deleted"""
+        version = await db.book_catalog_version()
+        if version != None and tuple(version) != self._version:
+            await self.load(db)
+
+    def menu(self, page_num: int) -> Any:
+        """Menu for page `page_num` of the catalog (starts from 1)"""
+        menu = self._menus.get(page_num)
+        if menu is None:
+            rows = self.rows_per_page
+            start = rows * max(0, page_num - 1)
+            # extra row - indicator of the next page for the menu
+            menu = self._build_menu(self._books[start:start + rows + 1], page_num)
+            if 1 <= page_num <= self.pages_count:
+                self._menus[page_num] = menu
+        return menu
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any, Awaitable, Optional
+
+from telegram.ext import BaseUpdateProcessor
+
+
+def _chat_id(update: object) -> Optional[int]:
+    chat = getattr(update, 'effective_chat', None)
+    return None if chat is None else chat.id
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates of different chats concurrently (at most
+    `max_concurrent_updates` at the same time), updates of one chat are
+    processed one by one in the order of arrival, so states of
+    `ConversationHandler`s are changed in the right order.
+
+    An update waits for the previous updates of its chat before it takes
+    a slot of `max_concurrent_updates`, so a chat with many updates
+    doesn't take slots of other chats.
+    """
+    _chats: dict    # chat_id -> [lock, number of updates processed or waiting]
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._chats = {}
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat_id = _chat_id(update)
+        if chat_id is None:
+            await super().process_update(update, coroutine)
+            return
+        entry = self._chats.get(chat_id)
+        if entry is None:
+            entry = self._chats[chat_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            # waiters of `asyncio.Lock` are woken up in FIFO order
+            async with entry[0]:
+                await super().process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._chats[chat_id]
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {'processing': self.current_concurrent_updates,
+                'max': self.max_concurrent_updates,
+                'active_chats': len(self._chats)}
@@ -0,0 +1,70 @@
+import time
+from typing import Mapping, MutableMapping, Optional
+
+# key of `ChatState` in `context.chat_data`
+STATE_KEY = "state"
+
+
+class ChatState:
+    """
+    Position of a chat in the divination dialogue: selected book,
+    selected page and number of sentences on it (`page` is `None`
+    until a page is selected, `book_id` is `None` while the chat
+    chooses a book). Texts are not kept here, titles and
+    sentences are taken from caches of `Database` shared by all chats.
+    `last_used` is wall-clock time, so it stays valid after restarts
+    """
+    __slots__ = ('book_id', 'page', 'sentences', 'last_used')
+
+    def __init__(self, book_id: Optional[int]):
+        self.book_id = book_id
+        self.page = None
+        self.sentences = 0
+        self.last_used = time.time()
+
+    def select_page(self, page: int, sentences: int) -> None:
+        self.page = page
+        self.sentences = sentences
+
+    def reset_page(self) -> None:
+        self.page = None
+        self.sentences = 0
+
+    # pickled without `__dict__` by `SqlitePersistence`
+
+    def __getstate__(self) -> tuple:
+        return (self.book_id, self.page, self.sentences, self.last_used)
+
+    def __setstate__(self, state: tuple) -> None:
+        self.book_id, self.page, self.sentences, self.last_used = state
+
+    def __repr__(self) -> str:
+        return (f"ChatState(book_id={self.book_id}, page={self.page}, "
+                f"sentences={self.sentences})")
+
+
+def chat_state(chat_data: MutableMapping) -> Optional[ChatState]:
+    """`ChatState` of the chat (marked as used) or `None`"""
+    state = chat_data.get(STATE_KEY)
+    if isinstance(state, ChatState):
+        state.last_used = time.time()
+        return state
+    return None
+
+
+def idle_chats(chat_data: Mapping[int, Mapping], ttl: float,
+               now: Optional[float] = None) -> list[int]:
+    """
+    Chats which state was not used for `ttl` seconds
+    and chats with empty `chat_data`
+    """
+    deadline = (time.time() if now is None else now) - ttl
+    idle = []
+    for chat_id, data in chat_data.items():
+        state = data.get(STATE_KEY)
+        if isinstance(state, ChatState):
+            if state.last_used < deadline:
+                idle.append(chat_id)
+        elif not data:
+            idle.append(chat_id)
+    return idle
@@ -9,6 +9,21 @@ BOT_TOKEN = os.environ.get("BOT_TOKEN")
 
 ADMIN_BOT_TOKEN = os.environ.get("ADMIN_BOT_TOKEN")
 
+# How bots receive updates: "polling" or "webhook"
+UPDATE_MODE = os.environ.get("UPDATE_MODE", "polling")
+# Webhook mode: address and ports of local HTTP listeners (behind a reverse proxy 
+#  with HTTPS), public URL (paths "bot" and "adminbot" are added), secret token
+#  which Telegram sends with every update, max parallel connections from Telegram
+WEBHOOK_LISTEN = os.environ.get("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", 8443))
+ADMIN_WEBHOOK_PORT = int(os.environ.get("ADMIN_WEBHOOK_PORT", 8444))
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL")
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET")
+WEBHOOK_MAX_CONNECTIONS = int(os.environ.get("WEBHOOK_MAX_CONNECTIONS", 40))
+# Bot API server (None - api.telegram.org), e.g. "http://127.0.0.1:8081" 
+#  for `python -m benchmarks.bench_ingress --external`
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL")
+
 DB_CONFIG = {
     'host': '127.0.0.1',
     'port': 3306,
@@ -17,8 +32,92 @@ DB_CONFIG = {
     'database': 'divination'
 }
 
+# Max number of updates processed by the bot at the same time
+#  (updates of one chat are always processed one by one)
+CONCURRENT_UPDATES = int(os.environ.get("CONCURRENT_UPDATES", 64))
+
+# Limits of messages sent by a bot (Telegram allows about 30 messages per second
+#  in total, 1 per second in a chat with short bursts, 20 per minute in a group):
+#  messages per second, messages sent at once to a chat and retries of a message
+#  after "429 Too Many Requests"
+SEND_GLOBAL_RATE = float(os.environ.get("SEND_GLOBAL_RATE", 30))
+SEND_CHAT_RATE = float(os.environ.get("SEND_CHAT_RATE", 1))
+SEND_GROUP_RATE = float(os.environ.get("SEND_GROUP_RATE", 20 / 60))
+SEND_BURST = int(os.environ.get("SEND_BURST", 3))
+SEND_MAX_RETRIES = int(os.environ.get("SEND_MAX_RETRIES", 3))
+# Max number of messages waiting in the queue of a chat, above it the oldest
+#  replaceable ones (edits of messages) are dropped
+SEND_CHAT_QUEUE_SIZE = int(os.environ.get("SEND_CHAT_QUEUE_SIZE", 20))
+
+# File with `chat_data` and conversation states of the bot (kept across restarts)
+#  and time between writes of changed chats to it
+PERSISTENCE_FILE = os.environ.get("PERSISTENCE_FILE", "bot_state.sqlite3")
+PERSISTENCE_INTERVAL = timedelta(seconds=30)
+
+# Time after which dialogue state of an inactive chat (selected page) is dropped
+#  from memory and the file above and its conversation is ended,
+#  and time between checks for such chats
+CHAT_STATE_TTL = timedelta(hours=24)
+CHAT_STATE_EVICT_INTERVAL = timedelta(minutes=30)
+
+# Number of connections to database in a bot process (0 - one shared connection)
+#  and max time a query waits for a free connection of the pool
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 0))
+DB_POOL_TIMEOUT = timedelta(seconds=10)
+
+# Memory limit for pages cached by the bot (bytes)
+PAGE_CACHE_BYTES = int(os.environ.get("PAGE_CACHE_BYTES", 64 * 1024 * 1024))
+
+# Number of chats with cached selected book
+CHAT_CACHE_SIZE = int(os.environ.get("CHAT_CACHE_SIZE", 100_000))
+
+# Number of chats with cached roles (used by admin bot) and time before
+#  cached roles are loaded again (roles can be changed by other processes)
+ROLE_CACHE_SIZE = int(os.environ.get("ROLE_CACHE_SIZE", 10_000))
+ROLE_CACHE_TTL = timedelta(minutes=5)
+
+# Time between checks for new books in database (list of books is cached by the bot)
+CATALOG_REFRESH_INTERVAL = timedelta(minutes=1)
+
+# Time between logging of connection pool and cache statistics
+DB_STATS_INTERVAL = timedelta(minutes=10)
+
 DOWNLOAD_DIR = "downloaded_books"
 
+# Directory and size limit (bytes) for rendered quote images
+#  and Telegram file ids of sent images
+QUOTE_CACHE_DIR = "quote_cache"
+QUOTE_CACHE_BYTES = int(os.environ.get("QUOTE_CACHE_BYTES", 256 * 1024 * 1024))
+
+# Processes which render quote images (0 - one thread of the bot process)
+#  and max number of images rendered or waiting for a worker at the same time
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", os.cpu_count() or 1))
+RENDER_MAX_PENDING = int(os.environ.get("RENDER_MAX_PENDING", 32))
+
+# Format of sent images: "png", "png-palette", "jpeg" or "webp",
+#  quality of jpeg/webp, zlib level of png (0-9) and scale of images
+#  (compare them with `python -m benchmarks.bench_encoders`)
+IMAGE_FORMAT = os.environ.get("IMAGE_FORMAT", "png")
+IMAGE_QUALITY = int(os.environ.get("IMAGE_QUALITY", 85))
+IMAGE_PNG_LEVEL = int(os.environ.get("IMAGE_PNG_LEVEL", 6))
+IMAGE_SCALE = float(os.environ.get("IMAGE_SCALE", 1.0))
+
+# Number of pages inserted into database by one statement
+INSERT_BATCH_SIZE = int(os.environ.get("INSERT_BATCH_SIZE", 500))
+# and max bytes of their text (statement must fit in `max_allowed_packet` of MySQL)
+INSERT_BATCH_BYTES = int(os.environ.get("INSERT_BATCH_BYTES", 1024 * 1024))
+
 # Time between updates of banned users list from database
-#  Note: updates are lazy evaluated (when it needs to check user for ban)    
+#  Note: updates run in background and load only new bans/unbans
 BANLIST_UPD_INTERVAL = timedelta(minutes=2)
+
+# Number of ban log records before the last loaded one which are loaded again
+#  by every update (records of concurrent transactions can commit out of order)
+BANLIST_LOG_WINDOW = int(os.environ.get("BANLIST_LOG_WINDOW", 1000))
+
+# Time between full reloads of banned users list
+BANLIST_RELOAD_INTERVAL = timedelta(hours=6)
+
+# Sentence tokenizer: "builtin" (rule-based, see `sentsplit.py`)
+#  or "nltk" (punkt, needs `nltk_setup.py`)
+SENT_TOKENIZER = os.environ.get("SENT_TOKENIZER", "builtin")
@@ -1,22 +1,65 @@
 import logging
-from typing import Callable, Optional, Sequence
-from itertools import count
-from functools import wraps
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence
+from itertools import count, islice
+from functools import partial, wraps
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import datetime
+import queue
+import sys
+import threading
+import time
 
 import mysql.connector
 from mysql.connector import MySQLConnection
 from mysql.connector import Error, errorcode
+from mysql.connector.errors import PoolError
 
 from bookparse import Book
+from cache import LRUCache
+from sentsplit import encode_spans, sentence_spans, sentences_from_index
+
+class QueryCounter:
+    """
+    Counts database calls made in the current context, e.g. 
+    while handling one update:
+    ```
+    with QueryCounter() as queries:
+        ...
+    print(queries.count)
+    ```
+    """
+    count: int
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self) -> 'QueryCounter':
+        self._token = _query_counter.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _query_counter.reset(self._token)
+
+_query_counter: ContextVar[Optional[QueryCounter]] = ContextVar('query_counter', 
+                                                                default=None)
 
 # MySQL Errors handling. Used as decorator
 def handle_mysql_errors(func: Callable):
     @wraps(func)
     def wrapper(db_obj, *args, **kwargs):
+        counter = _query_counter.get()
+        if counter is not None:
+            counter.count += 1
         try:
-            db_obj._validate_connection()
-            return func(db_obj, *args, **kwargs)
+            with db_obj._checkout():
+                try:
+                    return func(db_obj, *args, **kwargs)
+                except Error:
+                    db_obj._rollback()
+                    raise
         except Error as err:
             if err.errno == errorcode.ER_PARSE_ERROR:
                 logging.error(f'incorrect SQL syntax')
@@ -25,27 +68,159 @@ def handle_mysql_errors(func: Callable):
             else:
                 logging.error(f'unexpected error: {err}')
             logging.error(f'\t in {func.__name__} args={args}, kwargs={kwargs}')
-            if hasattr(db_obj, '_connection') and db_obj._connection.is_connected():
-                db_obj._connection.rollback()
     return wrapper
 
 
+class ConnectionPool:
+    """
+    Fixed size pool of MySQL connections.
+
+    Connections are created on first use. A connection which was idle
+    longer than `ping_interval` is checked (and reconnected if needed)
+    before it is given out. If all connections are in use, `get` waits
+    up to `timeout` seconds and raises `PoolError` after that.
+    """
+    _config: dict
+    _idle: queue.LifoQueue     # pairs (connection or None, last use time)
+
+    def __init__(self, 
+                 config: dict, 
+                 size: int, 
+                 timeout: float = 10,
+                 ping_interval: float = 30):
+        self._config = config
+        self.size = size
+        self._timeout = timeout
+        self._ping_interval = ping_interval
+        self._idle = queue.LifoQueue(size)
+        for _ in range(size):
+            self._idle.put((None, 0.0))
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+
+    def get(self) -> MySQLConnection:
+        """Take connection from the pool. Return it back with `put`"""
+        try:
+            cnx, last_use = self._idle.get_nowait()
+        except queue.Empty:
+            start = time.perf_counter()
+            try:
+                cnx, last_use = self._idle.get(timeout=self._timeout)
+            except queue.Empty:
+                raise PoolError(f'no free connections in the pool ({self.size})')
+            finally:
+                with self._lock:
+                    self.waits += 1
+                    self.wait_time += time.perf_counter() - start
+        try:
+            cnx = self._healthy(cnx, last_use)
+        except Error:
+            self._idle.put((None, 0.0))
+            raise
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+        return cnx
+
+    def put(self, cnx: MySQLConnection, healthy: bool = True) -> None:
+        """Return connection to the pool. 
+        Connection is checked on next `get` if it's not `healthy`"""
+        with self._lock:
+            self.in_use -= 1
+        self._idle.put((cnx, time.monotonic() if healthy else 0.0))
+
+    def reset(self) -> None:
+        """Close idle connections, they will be opened again on demand"""
+        closed = []
+        while True:
+            try:
+                closed.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for cnx, _ in closed:
+            if cnx is not None:
+                cnx.close()
+            self._idle.put((None, 0.0))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'size': self.size,
+                    'in_use': self.in_use,
+                    'checkouts': self.checkouts,
+                    'waits': self.waits,
+                    'wait_time': round(self.wait_time, 3)}
+
+    def _healthy(self, cnx: Optional[MySQLConnection], last_use: float) -> MySQLConnection:
+        if cnx is None:
+            return mysql.connector.connect(**self._config, autocommit=True)
+        if time.monotonic() - last_use > self._ping_interval and not cnx.is_connected():
+            cnx.reconnect()
+        return cnx
+
+
+_MISSING = object()
+
+
 class Database:
     _ids = count(0)
-    _connection: MySQLConnection
+    _shared_connection: Optional[MySQLConnection]
+    _pool: Optional[ConnectionPool]
+    _page_cache: LRUCache       # (book_id, num) -> (content, sentences)
+    _chat_cache: LRUCache       # chat_id -> (selected book_id, hex_color), both can be None
+    _books: dict                # book_id -> (title, author, info, max page)
+    _role_cache: LRUCache       # chat_id -> (roles, monotonic load time, load date)
+    _sentence_index: Optional[bool]     # `page.sentences` exists, `None` - not checked
     _config: dict
 
-    def __init__(self, config: dict):
+    def __init__(self, 
+                 config: dict, 
+                 pool_size: int = 0, 
+                 pool_timeout: datetime.timedelta = datetime.timedelta(seconds=10),
+                 page_cache_bytes: int = 0,
+                 chat_cache_size: int = 0,
+                 role_cache_size: int = 0,
+                 role_cache_ttl: datetime.timedelta = datetime.timedelta(minutes=5)):
+        """
+        `pool_size` > 0 enables pool of connections (see `ConnectionPool`),
+        otherwise one connection is shared by all calls. A query waits
+        for a free connection of the pool at most `pool_timeout`.
+        `page_cache_bytes` - memory limit for cached pages.
+        `chat_cache_size` - number of chats with cached selected book and color.
+        `role_cache_size` - number of chats with cached roles, which are
+        loaded again after `role_cache_ttl` (roles can be changed by other processes)
+        """
         self.id = next(self._ids)
         if self.id > 1:
             logging.warn(f"there are {self.id} instances of `Database`")
         self._config = config
-        self.connect()
+        self._shared_connection = None
+        self._pool = None
+        self._local = threading.local()
+        self._page_cache = LRUCache(page_cache_bytes, sizeof=_page_sizeof)
+        self._chat_cache = LRUCache(chat_cache_size, sizeof=lambda _: 1)
+        self._books = {}
+        self._role_cache = LRUCache(role_cache_size, sizeof=lambda _: 1)
+        self._role_cache_ttl = role_cache_ttl.total_seconds()
+        self._sentence_index = None
+        if pool_size > 0:
+            self._pool = ConnectionPool(config, pool_size, pool_timeout.total_seconds())
+        else:
+            self.connect()
+
+    @property
+    def _connection(self) -> MySQLConnection:
+        """Connection of the current `handle_mysql_errors` call"""
+        if self._pool is None:
+            return self._shared_connection
+        return getattr(self._local, 'connection', None)
 
     def connect(self):
         try:
-            self._connection = mysql.connector.connect(**self._config, 
-                                                       autocommit=True)
+            self._shared_connection = mysql.connector.connect(**self._config, 
+                                                              autocommit=True)
         except Error as err:
             if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
                 logging.error('invalid login details')
@@ -55,38 +230,139 @@ class Database:
                 logging.error(f'unexpected error: {err} in `Database.connect`')
 
     def reconnect(self):
-        self._connection.reconnect()
+        if self._pool is not None:
+            self._pool.reset()
+        else:
+            self._shared_connection.reconnect()
+
+    def pool_stats(self) -> Optional[dict]:
+        """Statistics of the connection pool or `None` without pool"""
+        if self._pool is None:
+            return None
+        return self._pool.stats()
+
+    def cache_stats(self) -> dict:
+        """Statistics of the caches"""
+        return {'pages': self._page_cache.stats(), 
+                'chats': self._chat_cache.stats(),
+                'roles': self._role_cache.stats(),
+                'books': len(self._books)}
 
     def _validate_connection(self):
-        if not self._connection.is_connected():
+        if self._shared_connection is None or not self._shared_connection.is_connected():
             self.connect()
 
+    @contextmanager
+    def _checkout(self):
+        """Provides `_connection` for one method call"""
+        if self._pool is None:
+            self._validate_connection()
+            yield
+            return
+        if self._connection is not None:
+            # nested call, the connection is already taken
+            yield
+            return
+        self._local.connection = self._pool.get()
+        healthy = False
+        try:
+            yield
+            healthy = True
+        finally:
+            self._pool.put(self._local.connection, healthy)
+            self._local.connection = None
+
+    def _rollback(self):
+        if self._connection is not None and self._connection.is_connected():
+            self._connection.rollback()
+
     @handle_mysql_errors
-    def insert_book(self, book: Book) -> None:
-        """Insert data about the book and pages into database."""
+    def insert_book(self, 
+                    book: Book, 
+                    batch_size: int = 500, 
+                    batch_bytes: int = 1024 * 1024) -> Optional[int]:
+        """
+        Insert data about the book and pages into database.
+        Pages are inserted by multi-row statements with at most `batch_size` rows
+        and `batch_bytes` bytes of text (statement must fit in `max_allowed_packet`).
+
+        Returns id of the new book
+        """
+        start = time.perf_counter()
         self._connection.start_transaction()
         with self._connection.cursor() as cursor:
-            cursor.execute("SELECT MAX(id) FROM book")
-            new_book_id = cursor.fetchone()
-            if new_book_id and new_book_id[0] != None:
-                new_book_id = int(new_book_id[0]) + 1
+            # id is given by AUTO_INCREMENT, so concurrent uploads never get the same one
+            cursor.execute("INSERT INTO book (title, author, info) VALUES (%s, %s, %s)", 
+                           (book.title, book.author, book.info))
+            new_book_id = cursor.lastrowid
+            pages_count = 0
+            columns = ["book_id", "num", "content"]
+            if self._has_sentence_index(cursor):
+                columns.append("sentences")
+                rows = ((new_book_id, num, page, encode_spans(sentence_spans(page)))
+                        for num, page in enumerate(book.pages, start=1))
             else:
-                new_book_id = 1
-            cursor.execute(f"INSERT INTO book VALUES ('{new_book_id}', {str(book)})")
-            marked_pages = [(new_book_id, i + 1, page) for i, page in enumerate(book.pages)]
-            cursor.executemany("INSERT INTO page (book_id, num, content)\
-                                VALUES (%s, %s, %s)", marked_pages)
+                # database is not migrated, pages are split into sentences when read
+                rows = ((new_book_id, num, page) for num, page in enumerate(book.pages, start=1))
+            row_placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+            for batch in _batches(rows, batch_size, batch_bytes, sizeof=_page_row_bytes):
+                values = [value for row in batch for value in row]
+                cursor.execute(f"INSERT INTO page ({', '.join(columns)}) VALUES "
+                               + ", ".join([row_placeholders] * len(batch)), values)
+                pages_count += len(batch)
         self._connection.commit()
+        # id of deleted book can be used again
+        self._page_cache.invalidate(lambda key: key[0] == new_book_id)
+        self._books.pop(new_book_id, None)
+        elapsed = time.perf_counter() - start
+        logging.info(f"book {new_book_id} inserted: {pages_count} pages in {elapsed:.2f} s "
+                     f"({pages_count / elapsed:.0f} rows/s)")
+        return new_book_id
 
-    @handle_mysql_errors
     def check_for_admin(self, chat_id: int) -> bool:
+        return self.has_role(chat_id, 'admin')
+
+    def has_role(self, chat_id: int, role_name: str) -> bool:
+        """
+        Checks if chat has not expired role `role_name`.
+        Roles of the chat are cached (see `chat_roles`)
+        """
+        roles = self.chat_roles(chat_id)
+        if not roles or role_name not in roles:
+            return False
+        expire_date = roles[role_name]
+        # `role_expiration` event deletes roles only once a day
+        return expire_date is None or datetime.date.today() <= expire_date
+
+    def chat_roles(self, chat_id: int) -> Optional[dict]:
+        """
+        Roles of the chat in form `{role_name: expire_date}`.
+        Cached roles are loaded again after TTL and on the next day 
+        (roles granted for a future date appear in `chat_role_view` that day)
+        """
+        today = datetime.date.today()
+        cached = self._role_cache.get(chat_id)
+        if cached is not None:
+            roles, loaded_at, loaded_on = cached
+            if loaded_on == today and time.monotonic() - loaded_at < self._role_cache_ttl:
+                return roles
+        # roles changed by `ban_users`/`unban_users` during the query are not overwritten
+        generation = self._role_cache.start_load(chat_id)
+        roles = self._select_roles(chat_id)
+        entry = None if roles is None else (roles, time.monotonic(), today)
+        self._role_cache.finish_load(chat_id, entry, generation)
+        return roles
+
+    @handle_mysql_errors
+    def _select_roles(self, chat_id: int) -> dict:
         with self._connection.cursor() as cursor:
-            cursor.execute(f"SELECT role_name FROM chat_role_view \
-                             WHERE chat_id = {chat_id} \
-                             AND role_name = 'admin'")
-            if cursor.fetchone():
-                return True
-        return False
+            cursor.execute(f"SELECT role_name, expire_date FROM chat_role_view \
+                             WHERE chat_id = {int(chat_id)}")
+            return {role_name: expire_date for role_name, expire_date in cursor.fetchall()}
+
+    def _forget_roles(self, chat_ids: Iterable[int]) -> None:
+        chat_ids = set(chat_ids)
+        self._role_cache.invalidate(lambda key: key in chat_ids)
     
     @handle_mysql_errors
     def users_counts(self) -> tuple[int, int, int]:
@@ -141,14 +417,18 @@ class Database:
                 data = (expire_date, chat_id)
             cursor.execute(statement, data)
         self._connection.commit()
+        self._forget_roles([chat_id])
     
-    @handle_mysql_errors
     def check_user_exist(self, chat_id: int) -> bool:
         """
         Search user with given `chat_id` in database
 
         Returns `True` if user exists
         """
+        return chat_id in self._chat_cache or bool(self._select_user_exist(chat_id))
+
+    @handle_mysql_errors
+    def _select_user_exist(self, chat_id: int) -> bool:
         with self._connection.cursor() as cursor:
             cursor.execute(f"SELECT COUNT(*) FROM chat \
                              WHERE id = {chat_id}")
@@ -164,9 +444,34 @@ class Database:
         """
         with self._connection.cursor() as cursor:
             cursor.execute(f"SELECT chat_id FROM chat_role_view \
-                             WHERE role_name = 'banned'")
+                             WHERE role_name = 'banned' ORDER BY chat_id")
             return [row[0] for row in cursor.fetchall()]
 
+    @handle_mysql_errors
+    def ban_log_watermark(self) -> int:
+        """
+        Id of the last record in `chat_role_log`.
+        Changes after it are returned by `get_ban_changes`
+        """
+        with self._connection.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM chat_role_log")
+            return int(cursor.fetchone()[0])
+
+    @handle_mysql_errors
+    def get_ban_changes(self, after_id: int) -> list[tuple[int, int, str]]:
+        """
+        Bans and unbans recorded after `chat_role_log` record `after_id`
+        in rows `(log id, chat_id, 'grant' or 'revoke')` ordered by log id
+        """
+        with self._connection.cursor() as cursor:
+            cursor.execute(f"SELECT chat_role_log.id, chat_id, action \
+                             FROM chat_role_log INNER JOIN role \
+                                ON chat_role_log.role_id = role.id \
+                             WHERE role.name = 'banned' \
+                             AND chat_role_log.id > {int(after_id)} \
+                             ORDER BY chat_role_log.id")
+            return cursor.fetchall()
+
     @handle_mysql_errors
     def record_new_chat(self, chat_id: int) -> None:
         """
@@ -185,6 +490,8 @@ class Database:
                              (SELECT id FROM role WHERE name = 'user'), \
                              CURDATE(), NULL)")
         self._connection.commit()
+        self._chat_cache.put(chat_id, (None, None))
+        self._forget_roles([chat_id])
     
     @handle_mysql_errors
     def ban_users(self, chat_ids: Sequence[int]) -> bool | None:
@@ -202,9 +509,9 @@ class Database:
                           (%s, (SELECT id FROM role WHERE name = 'banned'), \
                           CURDATE(), NULL)"
             # add extra dimesion for separate rows
-            chat_ids = [[chat] for chat in chat_ids]
-            cursor.executemany(statement, chat_ids)
+            cursor.executemany(statement, [[chat] for chat in chat_ids])
         self._connection.commit()
+        self._forget_roles(chat_ids)
         return True
     
     @handle_mysql_errors
@@ -218,70 +525,314 @@ class Database:
             statement = "DELETE FROM chat_role WHERE \
                         role_id = (SELECT id FROM role WHERE name = 'banned') \
                         AND chat_id=%s"
-            chat_ids = [[chat] for chat in chat_ids]
-            cursor.executemany(statement, chat_ids)
+            cursor.executemany(statement, [[chat] for chat in chat_ids])
         self._connection.commit()
+        self._forget_roles(chat_ids)
         return True
 
 
     @handle_mysql_errors
-    def search_book(self, rows_count: int, offset: int = 0):
+    def search_book(self, rows_count: int, after_id: int = 0):
         """
-        Get list of available books in pairs (title, author)
+        Get list of available books in rows (id, title, author)
+        with id greater than `after_id`
         """
         with self._connection.cursor() as cursor:
             cursor.execute(f"SELECT id, title, author FROM book \
-                           ORDER BY id LIMIT {offset}, {rows_count}")
+                           WHERE id > {int(after_id)} \
+                           ORDER BY id LIMIT {int(rows_count)}")
             return cursor.fetchall()
-        
+
     @handle_mysql_errors
+    def book_catalog_version(self):
+        """
+        Returns `(count of books, max id)`. 
+        It changes when a book is inserted or deleted
+        """
+        with self._connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*), MAX(id) FROM book")
+            return cursor.fetchone()
+        
     def search_max_page(self, chat_id: int):
         """
         Returns max page number of user's book
         """
-        with self._connection.cursor() as cursor:
-            cursor.execute(f"SELECT MAX(num) FROM page WHERE book_id = \
-                           (SELECT book_id FROM chat WHERE id = {chat_id})")
-            max_page = cursor.fetchone()
-            if max_page != None:
-                return max_page[0]
-        return None 
+        book_id = self.chat_book(chat_id)
+        if book_id == None:
+            return None
+        return self.book_max_page(book_id)
     
     @handle_mysql_errors
-    def update_chat_book(self, chat_id: int, book_id):
+    def update_chat_book(self, chat_id: int, book_id) -> bool | None:
         self._connection.start_transaction()
         with self._connection.cursor() as cursor:
             cursor.execute(f"UPDATE chat SET book_id = {book_id} \
                             WHERE id = {chat_id}")
+            updated = cursor.rowcount
         self._connection.commit()
+        if updated:
+            self._update_chat_cache(chat_id, book_id=book_id)
+        return True
 
     @handle_mysql_errors
+    def update_chat_color(self, chat_id: int, hex_color: Optional[str]) -> bool | None:
+        """
+        Set color theme of chat's pictures ("RRGGBB" or `None` for default).
+        Returns `False` if the chat is not recorded (see `record_new_chat`)
+        """
+        self._connection.start_transaction()
+        with self._connection.cursor() as cursor:
+            cursor.execute("UPDATE chat SET hex_color = %s WHERE id = %s",
+                           (hex_color, chat_id))
+            exists = cursor.rowcount > 0
+            if not exists:
+                # rows with the same color are not counted as updated
+                cursor.execute("SELECT id FROM chat WHERE id = %s", (chat_id,))
+                exists = cursor.fetchone() != None
+        self._connection.commit()
+        if exists:
+            self._update_chat_cache(chat_id, hex_color=hex_color)
+        return exists
+
+    def _update_chat_cache(self, chat_id: int, book_id=_MISSING, hex_color=_MISSING) -> None:
+        entry = self._chat_cache.get(chat_id)
+        if entry is None:
+            # all fields are loaded by the next `_chat_entry`,
+            #  the value of a load started before the update is not cached
+            self._chat_cache.discard(chat_id)
+            return
+        if book_id is _MISSING:
+            book_id = entry[0]
+        if hex_color is _MISSING:
+            hex_color = entry[1]
+        self._chat_cache.put(chat_id, (book_id, hex_color))
+
     def book_metadata(self, book_id: int):
         """
         Get book metadata: title, author, description
         """
+        book = self._book_info(book_id)
+        if book == None:
+            return None
+        return book[:3]
+
+    def book_max_page(self, book_id: int):
+        """
+        Returns max page number of the book
+        """
+        book = self._book_info(book_id)
+        if book == None:
+            return None
+        return book[3]
+
+    def _book_info(self, book_id: int):
+        """Metadata and max page of the book. Books are cached"""
+        book = self._books.get(book_id)
+        if book == None:
+            book = self._select_book_info(book_id)
+            if book != None:
+                self._books[book_id] = book
+        return book
+
+    @handle_mysql_errors
+    def _select_book_info(self, book_id: int):
         with self._connection.cursor() as cursor:
-            cursor.execute(f"SELECT title, author, info \
-                           FROM book WHERE id = {book_id}")
-            metadata = cursor.fetchone()
-            return metadata
-    
+            cursor.execute(f"SELECT title, author, info, \
+                             (SELECT MAX(num) FROM page WHERE book_id = {book_id}) \
+                             FROM book WHERE id = {book_id}")
+            return cursor.fetchone()
+
+    def chat_book(self, chat_id: int) -> Optional[int]:
+        """
+        Id of the book selected by user with chat_id=`chat_id`.
+        Kept in cache, which is updated by `update_chat_book`
+        """
+        entry = self._chat_entry(chat_id)
+        return None if entry == None else entry[0]
+
+    def chat_color(self, chat_id: int) -> Optional[str]:
+        """
+        Color theme ("RRGGBB") selected by user with chat_id=`chat_id`
+        or `None`. Kept in cache with the selected book
+        """
+        entry = self._chat_entry(chat_id)
+        return None if entry == None else entry[1]
+
+    def _chat_entry(self, chat_id: int) -> Optional[tuple]:
+        entry = self._chat_cache.get(chat_id)
+        if entry is None:
+            # the chat can be updated by another thread during the query
+            generation = self._chat_cache.start_load(chat_id)
+            row = self._select_chat(chat_id)
+            entry = None if row == None else tuple(row)
+            self._chat_cache.finish_load(chat_id, entry, generation)
+        return entry
+
     @handle_mysql_errors
+    def _select_chat(self, chat_id: int):
+        with self._connection.cursor() as cursor:
+            cursor.execute(f"SELECT book_id, hex_color FROM chat WHERE id = {chat_id}")
+            return cursor.fetchone()
+
+    def book_page(self, book_id: int, page_num: int):
+        """
+        Text and sentence index of page with number=`page_num` 
+        from book with id=`book_id`. Pages are cached, 
+        because they don't change after upload
+        """
+        key = (book_id, page_num)
+        page = self._page_cache.get(key)
+        if page == None:
+            page = self._select_page(book_id, page_num)
+            if page != None:
+                self._page_cache.put(key, page)
+        return page
+
+    @handle_mysql_errors
+    def _select_page(self, book_id: int, page_num: int):
+        with self._connection.cursor() as cursor:
+            cursor.execute(f"SELECT content, sentences FROM page WHERE \
+                            book_id = {book_id} AND num = {page_num}")
+            return cursor.fetchone()
+
     def page_content(self, chat_id: int, page_num: int):
         """
         Text of page with number=`page_num` from user's book
         with chat_id=`chat_id`
         """
-        with self._connection.cursor() as cursor:
-            cursor.execute(f"SELECT content FROM page WHERE \
-                            num = {page_num} AND book_id = \
-                            (SELECT book_id FROM chat WHERE id = {chat_id})")
-            page_text = cursor.fetchone()
-            if page_text != None:
-                return page_text[0]
+        book_id = self.chat_book(chat_id)
+        if book_id == None:
+            return None
+        page = self.book_page(book_id, page_num)
+        if page != None:
+            return page[0]
+        return None
+
+    def book_sentences(self, book_id: int, page_num: int):
+        """
+        Sentences of page with number=`page_num` from book with id=`book_id`.
+        Page is taken from cache, sentences are cut by its index
+        """
+        page = self.book_page(book_id, page_num)
+        if page != None:
+            return sentences_from_index(*page)
         return None
+
+    @handle_mysql_errors
+    def add_sentence_index(self) -> None:
+        """
+        Add `page.sentences` column to the database 
+        created before sentence index was introduced
+        """
+        with self._connection.cursor() as cursor:
+            if not self._has_sentence_index(cursor):
+                cursor.execute("ALTER TABLE page ADD COLUMN sentences TEXT NULL")
+                self._sentence_index = True
+
+    def _has_sentence_index(self, cursor) -> bool:
+        """Whether `page.sentences` column exists (checked once)"""
+        if self._sentence_index is None:
+            cursor.execute("SHOW COLUMNS FROM page LIKE 'sentences'")
+            self._sentence_index = cursor.fetchone() != None
+            if not self._sentence_index:
+                logging.warning("there is no `page.sentences` column, "
+                                "run `db_setup.py --migrate`")
+        return self._sentence_index
+
+    @handle_mysql_errors
+    def backfill_sentence_index(self, rows_count: int) -> int:
+        """
+        Build sentence index for `rows_count` pages which don't have it.
+
+        Returns number of updated pages
+        """
+        self._connection.start_transaction()
+        with self._connection.cursor() as cursor:
+            cursor.execute(f"SELECT book_id, num, content FROM page \
+                             WHERE sentences IS NULL AND content IS NOT NULL \
+                             LIMIT {rows_count} FOR UPDATE")
+            pages = cursor.fetchall()
+            updates = [(encode_spans(sentence_spans(content)), book_id, num)
+                       for book_id, num, content in pages]
+            cursor.executemany("UPDATE page SET sentences = %s \
+                                WHERE book_id = %s AND num = %s", updates)
+        self._connection.commit()
+        updated = {(book_id, num) for book_id, num, _ in pages}
+        self._page_cache.invalidate(lambda key: key in updated)
+        return len(updates)
     
 
+
+def _batches(iterable: Iterable, 
+             size: int, 
+             max_bytes: int = 0, 
+             sizeof: Callable[[Any], int] = len) -> Iterator[list]:
+    """
+    Split `iterable` into lists of `size` elements. With `max_bytes`
+    a list is also cut before its total `sizeof` exceeds `max_bytes`
+    (a bigger element makes a list alone)
+    """
+    iterator = iter(iterable)
+    if not max_bytes:
+        while batch := list(islice(iterator, size)):
+            yield batch
+        return
+    batch, batch_bytes = [], 0
+    for item in iterator:
+        item_bytes = sizeof(item)
+        if batch and (len(batch) == size or batch_bytes + item_bytes > max_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(item)
+        batch_bytes += item_bytes
+    if batch:
+        yield batch
+
+def _page_row_bytes(row: tuple) -> int:
+    return sum(len(field.encode()) for field in row if isinstance(field, str))
+
+def _page_sizeof(page: tuple) -> int:
+    return sys.getsizeof(page) + sum(sys.getsizeof(field) for field in page)
+
+
+class AsyncDatabase:
+    """
+    Asynchronous interface of `Database`. 
+    It has the same methods, but they are coroutines: 
+    queries are executed in a thread pool and don't block the event loop.
+
+    Number of threads is equal to the size of the connection pool
+    (one thread when `Database` has a single connection).
+    Underlying `Database` is available as `sync` (e.g. for startup code)
+    """
+    sync: Database
+    _executor: ThreadPoolExecutor
+
+    def __init__(self, database: Database):
+        self.sync = database
+        workers = database._pool.size if database._pool is not None else 1
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='database')
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.sync, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        @wraps(attr)
+        async def method(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            # context is copied for `QueryCounter` of the caller
+            return await loop.run_in_executor(self._executor, 
+                                              partial(copy_context().run, attr, 
+                                                      *args, **kwargs))
+        # next time the method is found without `__getattr__`
+        setattr(self, name, method)
+        return method
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
 if __name__ == '__main__':
     logging.warning("To run the bot, use a different .py file. \
 This class is needed only to communicate with the database.")
@@ -3,7 +3,7 @@ USE `test_bot_db` ;
 
 -- tables creation
 CREATE TABLE IF NOT EXISTS `book` (
-    `id` SMALLINT UNSIGNED NOT NULL,
+    `id` SMALLINT UNSIGNED NOT NULL AUTO_INCREMENT,
     `title` VARCHAR(1024) NULL,
     `author` VARCHAR(1024) NULL,
     `info` VARCHAR(2048) NULL,
@@ -27,6 +27,7 @@ CREATE TABLE IF NOT EXISTS `page` (
     `book_id` SMALLINT UNSIGNED NOT NULL,
     `num` MEDIUMINT NOT NULL,
     `content` VARCHAR(4096) NULL,
+    `sentences` TEXT NULL,
     PRIMARY KEY (`book_id`, `num`),
     CONSTRAINT `fk_page_book_id`
         FOREIGN KEY (`book_id`)
@@ -59,6 +60,18 @@ CREATE TABLE IF NOT EXISTS `chat_role` (
 ) ENGINE = InnoDB;
 
 
+-- history of bans and unbans (for incremental updates of ban list)
+CREATE TABLE IF NOT EXISTS `chat_role_log` (
+    `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    `chat_id` BIGINT UNSIGNED NOT NULL,
+    `role_id` INT UNSIGNED NOT NULL,
+    `action` ENUM('grant', 'revoke') NOT NULL,
+    `changed_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (`id`),
+    INDEX `chat_role_log_role_id_idx` (`role_id` ASC, `id` ASC) VISIBLE
+) ENGINE = InnoDB;
+
+
 -- create the trigger to prevent fake dates from the past
 DELIMITER \\
 CREATE TRIGGER `chat_role_BEFORE_INSERT` BEFORE INSERT ON `chat_role`
@@ -69,6 +82,25 @@ BEGIN
 	END IF;
 END \\
 
+-- record bans and unbans to `chat_role_log` (other roles are not needed by the ban list)
+CREATE TRIGGER `chat_role_AFTER_INSERT` AFTER INSERT ON `chat_role`
+FOR EACH ROW
+BEGIN
+	IF NEW.role_id = (SELECT id FROM role WHERE name = 'banned') THEN
+		INSERT INTO chat_role_log (chat_id, role_id, action) 
+			VALUES (NEW.chat_id, NEW.role_id, 'grant');
+	END IF;
+END \\
+
+CREATE TRIGGER `chat_role_AFTER_DELETE` AFTER DELETE ON `chat_role`
+FOR EACH ROW
+BEGIN
+	IF OLD.role_id = (SELECT id FROM role WHERE name = 'banned') THEN
+		INSERT INTO chat_role_log (chat_id, role_id, action) 
+			VALUES (OLD.chat_id, OLD.role_id, 'revoke');
+	END IF;
+END \\
+
 -- view for convenient access to user roles
 CREATE OR REPLACE VIEW chat_role_view AS
     SELECT chat_id, role.name as role_name, expire_date
@@ -8,7 +8,8 @@ from mysql.connector import Error, errorcode
 from schema import (
     TABLES_CREATION, 
     ROLE_INSERTIONS,
-    ADMIN_INSERTION
+    ADMIN_INSERTION,
+    MIGRATIONS
 )
 
 logging.basicConfig(level=logging.INFO)
@@ -38,6 +39,17 @@ def setup_schema(connection):
             logging.info(f'create stage: {alias}')
             curs.execute(statement)
 
+def migrate_schema(connection):
+    for alias, statement in MIGRATIONS.items():
+        with connection.cursor() as curs:
+            logging.info(f'migration stage: {alias}')
+            try:
+                curs.execute(statement)
+            except Error as err:
+                if err.errno != errorcode.ER_DUP_FIELDNAME:
+                    raise err
+                logging.info(f'migration stage: {alias} is already applied')
+
 def insert_roles(connection):
     for alisas, insertion in ROLE_INSERTIONS.items():
         with connection.cursor() as curs:
@@ -59,7 +71,11 @@ def insert_admin(connection):
 if __name__ == '__main__':
     logging.getLogger(mysql.connector.__name__).setLevel(logging.WARNING)
     with establish_connection() as connection:
-        setup_schema(connection)
-        insert_roles(connection)
-        insert_admin(connection)
+        if '--migrate' in sys.argv:
+            # database already exists, only apply new changes
+            migrate_schema(connection)
+        else:
+            setup_schema(connection)
+            insert_roles(connection)
+            insert_admin(connection)
         logging.info("Done.")
\ No newline at end of file
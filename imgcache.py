@@ -0,0 +1,147 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+class QuoteImageCache:
+    """
+    Rendered quote images on disk and Telegram `file_id`s of sent images.
+
+    Entry key is a hash of author, title, quote, color theme and 
+    image encoding (see `key`).
+    Image of the entry is stored in `<key>.img`, its `file_id` in `<key>.fid`.
+    The least recently used entries are removed when total size of files
+    exceeds `max_bytes`. Order of entries is kept by modification time of
+    the files, so it survives restarts.
+    """
+    max_bytes: int
+    size: int
+    _entries: OrderedDict      # key -> size of files
+    _file_ids: dict            # key -> file_id
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._file_ids = {}
+        self.size = 0
+        self.file_id_hits = 0
+        self.image_hits = 0
+        self.misses = 0
+        self._load()
+
+    @staticmethod
+    def key(author: str, title: str, quote: str, theme, encoding: str = "") -> str:
+        data = "\0".join((author, title, quote, repr(theme), encoding))
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def file_id(self, key: str) -> Optional[str]:
+        """`file_id` of the image sent before"""
+        with self._lock:
+            file_id = self._file_ids.get(key)
+            if file_id is not None:
+                self.file_id_hits += 1
+                self._touch(key)
+            return file_id
+
+    def image(self, key: str) -> Optional[bytes]:
+        """Rendered image or `None`"""
+        with self._lock:
+            try:
+                data = self._path(key, '.img').read_bytes()
+            except OSError:
+                self.misses += 1
+                return None
+            self.image_hits += 1
+            self._touch(key)
+            return data
+
+    def put_image(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._write(key, '.img', data)
+
+    def put_file_id(self, key: str, file_id: str) -> None:
+        with self._lock:
+            self._write(key, '.fid', file_id.encode())
+            self._file_ids[key] = file_id
+
+    def forget_file_id(self, key: str) -> None:
+        """Remove `file_id` which is not accepted by Telegram anymore"""
+        with self._lock:
+            if self._file_ids.pop(key, None) is not None:
+                self._remove(key, '.fid')
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries),
+                    'file_ids': len(self._file_ids),
+                    'bytes': self.size,
+                    'max_bytes': self.max_bytes,
+                    'file_id_hits': self.file_id_hits,
+                    'image_hits': self.image_hits,
+                    'misses': self.misses}
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self._dir / (key + suffix)
+
+    def _load(self):
+        files = sorted((f for f in self._dir.iterdir() if f.suffix in ('.img', '.fid')),
+                       key=lambda f: f.stat().st_mtime)
+        for f in files:
+            self._add_size(f.stem, f.stat().st_size)
+            if f.suffix == '.fid':
+                self._file_ids[f.stem] = f.read_text()
+        self._evict()
+        logging.info(f"quote image cache: {len(self._entries)} entries, {self.size} bytes")
+
+    def _touch(self, key: str):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        for suffix in ('.img', '.fid'):
+            try:
+                os.utime(self._path(key, suffix))
+            except OSError:
+                pass
+
+    def _write(self, key: str, suffix: str, data: bytes):
+        path = self._path(key, suffix)
+        if path.exists():
+            self._add_size(key, -path.stat().st_size)
+        # other processes never see partly written files
+        temp_path = path.with_suffix(suffix + '.tmp')
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+        self._add_size(key, len(data))
+        self._evict()
+
+    def _remove(self, key: str, suffix: str):
+        path = self._path(key, suffix)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        self._add_size(key, -size)
+
+    def _add_size(self, key: str, size: int):
+        self._entries[key] = self._entries.get(key, 0) + size
+        self._entries.move_to_end(key)
+        self.size += size
+        if self._entries[key] <= 0:
+            del self._entries[key]
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._file_ids.pop(key, None)
+            self._remove(key, '.img')
+            self._remove(key, '.fid')
+            # files can be already removed by another process
+            if key in self._entries:
+                self.size -= self._entries.pop(key)
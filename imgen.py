@@ -1,14 +1,37 @@
-from typing import Union
-import textwrap
+from collections import OrderedDict
+from typing import Iterable, Iterator, Optional, Union
+import copy
+import re
+import io
 import functools
 
 from PIL import Image, ImageDraw, ImageFont
 
+from textlayout import TextLayout
+
 QUOTE_LINES = 6
-QUOTE_WIDTH = 60
+# max width of text lines (part of picture width)
+TEXT_WIDTH = 0.75
 
 colorT = Union[tuple[int, int, int], str, None]
 
+DEFAULT_THEME = (143, 143, 143)
+# number of color themes with prepared pictures kept by `QuoteImage.for_theme`
+THEME_CACHE_SIZE = 8
+
+ENCODER_MODES = ('png', 'png-palette', 'jpeg', 'webp')
+
+_HEX_COLOR = re.compile(r'[0-9a-fA-F]{6}')
+
+
+def hex_to_rgb(hex_color: str) -> Optional[tuple[int, int, int]]:
+    """Color from "RRGGBB" string (as in `chat.hex_color`) or `None` if it's invalid"""
+    if not _HEX_COLOR.fullmatch(hex_color):
+        return None
+    value = int(hex_color, 16)
+    return (value >> 16, (value >> 8) & 0xFF, value & 0xFF)
+
+
 class QuoteImage:
     _width: int = 1280
     _height: int = 720
@@ -17,6 +40,10 @@ class QuoteImage:
     _author_font: ImageFont.FreeTypeFont
     _title_font: ImageFont.FreeTypeFont
     _quote_font: ImageFont.FreeTypeFont
+    _author_layout: TextLayout
+    _title_layout: TextLayout
+    _quote_layout: TextLayout
+    _themes: OrderedDict         # theme -> QuoteImage
     _background_color: colorT = "white"
     _border_color: colorT = (199, 163, 143)
     _quote_color: colorT = "black"
@@ -24,7 +51,7 @@ class QuoteImage:
     _title_color: colorT = "black"
 
     def __init__(self, 
-                 color_theme: colorT=(143, 143, 143),
+                 color_theme: colorT=DEFAULT_THEME,
                  logo_path: str="images/logo_qr.png",
                  author_font_path: str="fonts/Ubuntu-Bold.ttf",
                  title_font_path: str="fonts/Ubuntu-Bold.ttf",
@@ -34,9 +61,44 @@ class QuoteImage:
         self._author_font = ImageFont.truetype(author_font_path, 42)
         self._title_font = ImageFont.truetype(title_font_path, 28)
         self._quote_font = ImageFont.truetype(quote_font_path, 32)
+        self._author_layout = TextLayout(self._author_font)
+        self._title_layout = TextLayout(self._title_font)
+        self._quote_layout = TextLayout(self._quote_font)
         self._border_ratio = border_ratio
         self._border_color = color_theme
+        self._themes = OrderedDict()
     
+    @property
+    def theme(self) -> colorT:
+        """Color theme of pictures"""
+        return self._border_color
+
+    def for_theme(self, theme: colorT) -> 'QuoteImage':
+        """
+        Generator of pictures with color `theme`. 
+        It shares fonts, logo and text metrics with this one, 
+        generators of recently used themes are kept with their templates
+        """
+        if theme == self._border_color:
+            return self
+        generator = self._themes.get(theme)
+        if generator is None:
+            generator = copy.copy(self)
+            generator._border_color = theme
+            generator._themes = OrderedDict()
+            # template of this theme is drawn on the first call of `make`
+            generator.__dict__.pop('_template', None)
+            self._themes[theme] = generator
+            if len(self._themes) > THEME_CACHE_SIZE:
+                self._themes.popitem(last=False)
+        else:
+            self._themes.move_to_end(theme)
+        return generator
+
+    @functools.cached_property
+    def _text_width(self) -> float:
+        return self._width * TEXT_WIDTH
+
     @functools.cached_property
     def _q_margin(self):
         """margin between lines of quote"""
@@ -51,13 +113,15 @@ class QuoteImage:
     def _draw_wrapped_quote(self, 
                            text: str,
                            image_draw: ImageDraw.ImageDraw) -> None:
+        layout = self._quote_layout
         lines = []
         for l in text.splitlines():
-            lines += textwrap.wrap(l, width=QUOTE_WIDTH)
+            lines += layout.wrap(l, self._text_width)
 
         if len(lines) > QUOTE_LINES:
-            lines = lines[:QUOTE_LINES]
-            lines[-1] = lines[-1] + '...'
+            # the rest of the quote is cut to one line with "..."
+            rest = " ".join(lines[QUOTE_LINES - 1:])
+            lines = lines[:QUOTE_LINES - 1] + [layout.shorten(rest, self._text_width)]
 
         # line with margin:
         wide_line = self._q_line_h + self._q_margin
@@ -66,7 +130,7 @@ class QuoteImage:
         quote_pos = (self._height - quote_height) / 2
         
         for i, line in enumerate(lines):
-            line_w = image_draw.textlength(line, self._quote_font)
+            line_w = layout.width(line)
             pos = ( (self._width - line_w) / 2, quote_pos + wide_line * i )
             image_draw.text(
                 xy=pos,
@@ -76,8 +140,8 @@ class QuoteImage:
             
     def _draw_author(self, text: str, image_draw: ImageDraw.ImageDraw):
         im_w, im_h, k = self._width, self._height, self._border_ratio
-        text = textwrap.shorten(text, width=QUOTE_WIDTH, placeholder="...")
-        author_w = image_draw.textlength(text, self._author_font)
+        text = self._author_layout.shorten(text, self._text_width)
+        author_w = self._author_layout.width(text)
         image_draw.text(
             ( (im_w - author_w) / 2, 2.5 * im_h / k ), 
             text=text, 
@@ -87,8 +151,8 @@ class QuoteImage:
         
     def _draw_title(self, text: str, image_draw: ImageDraw.ImageDraw):
         im_w, im_h, k = self._width, self._height, self._border_ratio
-        text = textwrap.shorten(text, width=72, placeholder="...")
-        title_w = image_draw.textlength(text, self._title_font)
+        text = self._title_layout.shorten(text, self._text_width)
+        title_w = self._title_layout.width(text)
         image_draw.text(
             ((im_w - title_w) / 2, 5 * im_h / k ),
             text=text,
@@ -111,16 +175,91 @@ class QuoteImage:
             mask=self._logo
         )
 
-    def make(self, author: str, title: str, quote: str) -> Image.Image:
-        """Generate new picture of given quote"""
+    @functools.cached_property
+    def _template(self) -> Image.Image:
+        """Background with borders and logo, which don't depend on the quote"""
         image = Image.new(mode='RGB', 
                           size=(self._width, self._height), 
                           color=self._background_color)
+        self._draw_borders(ImageDraw.Draw(image))
+        self._paste_logo(image)
+        return image
+
+    def make_many(self, items: Iterable[tuple]) -> Iterator[Image.Image]:
+        """
+        Pictures of `(author, title, quote, theme)` items, 
+        `theme` is `None` for this generator's theme
+        """
+        for author, title, quote, theme in items:
+            generator = self if theme is None else self.for_theme(theme)
+            yield generator.make(author, title, quote)
+
+    def make(self, author: str, title: str, quote: str) -> Image.Image:
+        """Generate new picture of given quote"""
+        image = self._template.copy()
         drawing = ImageDraw.Draw(image)
         self._draw_author(author, drawing)
         self._draw_title(title, drawing)
         self._draw_wrapped_quote(quote, drawing)
-        self._draw_borders(drawing)
-        self._paste_logo(image)
         return image
-        
\ No newline at end of file
+        
+
+class ImageEncoder:
+    """
+    Converts pictures to bytes in one of `ENCODER_MODES`:
+    - `png` - lossless, `png_level` is zlib compression level (0-9)
+    - `png-palette` - PNG with `colors` colors (cards are mostly flat, so 
+    a small palette is barely visible and gives much smaller files)
+    - `jpeg` - optimized JPEG with `quality`
+    - `webp` - lossy WebP with `quality`
+
+    Pictures are resized by `scale` before encoding if it isn't 1
+    """
+    mode: str
+    scale: float
+
+    def __init__(self, 
+                 mode: str = 'png', 
+                 quality: int = 85,
+                 png_level: int = 6,
+                 colors: int = 64,
+                 scale: float = 1.0):
+        if mode not in ENCODER_MODES:
+            raise ValueError(f"unknown image encoder mode: {mode}")
+        self.mode = mode
+        self.quality = quality
+        self.png_level = png_level
+        self.colors = colors
+        self.scale = scale
+
+    def __repr__(self) -> str:
+        if self.mode == 'png':
+            options = f"png_level={self.png_level}"
+        elif self.mode == 'png-palette':
+            options = f"colors={self.colors}, png_level={self.png_level}"
+        else:
+            options = f"quality={self.quality}"
+        return f"ImageEncoder({self.mode!r}, {options}, scale={self.scale})"
+
+    @property
+    def filename(self) -> str:
+        extension = {'jpeg': 'jpg', 'webp': 'webp'}.get(self.mode, 'png')
+        return f"image.{extension}"
+
+    def encode(self, image: Image.Image) -> bytes:
+        if self.scale != 1:
+            size = (round(image.width * self.scale), round(image.height * self.scale))
+            # area averaging: fast and good enough for downscaling
+            image = image.resize(size, Image.Resampling.BOX)
+        temp_memory = io.BytesIO()
+        if self.mode == 'png':
+            image.save(temp_memory, format='PNG', compress_level=self.png_level)
+        elif self.mode == 'png-palette':
+            image = image.quantize(colors=self.colors, method=Image.Quantize.FASTOCTREE)
+            image.save(temp_memory, format='PNG', compress_level=self.png_level)
+        elif self.mode == 'jpeg':
+            image.save(temp_memory, format='JPEG', quality=self.quality, optimize=True)
+        else:
+            # method 2 is twice faster than default 4, files are ~3% bigger
+            image.save(temp_memory, format='WEBP', quality=self.quality, method=2)
+        return temp_memory.getvalue()
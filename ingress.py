@@ -0,0 +1,43 @@
+import logging
+
+from telegram.ext import Application, ApplicationBuilder
+
+from config import UPDATE_MODE, WEBHOOK_LISTEN, WEBHOOK_URL, WEBHOOK_SECRET
+from config import WEBHOOK_MAX_CONNECTIONS, TELEGRAM_API_URL
+
+
+def application_builder(token: str) -> ApplicationBuilder:
+    """
+    `ApplicationBuilder` with `token` and Bot API server from `TELEGRAM_API_URL`
+    (e.g. the local fake server of `benchmarks.bench_ingress`)
+    """
+    builder = ApplicationBuilder().token(token)
+    if TELEGRAM_API_URL:
+        api_url = TELEGRAM_API_URL.rstrip('/')
+        builder = builder.base_url(f"{api_url}/bot").base_file_url(f"{api_url}/file/bot")
+    return builder
+
+
+def run_application(application: Application, url_path: str, port: int) -> None:
+    """
+    Receive updates by long polling or by webhook (selected by `UPDATE_MODE`).
+
+    Webhook listens on `WEBHOOK_LISTEN:port/url_path` and is registered in
+    Telegram as `WEBHOOK_URL/url_path`. Requests without `WEBHOOK_SECRET`
+    in the "X-Telegram-Bot-Api-Secret-Token" header are rejected.
+    """
+    if UPDATE_MODE == 'polling':
+        application.run_polling()
+        return
+    if UPDATE_MODE != 'webhook':
+        raise ValueError(f"unknown UPDATE_MODE: {UPDATE_MODE}")
+    if not WEBHOOK_URL or not WEBHOOK_SECRET:
+        raise ValueError("WEBHOOK_URL and WEBHOOK_SECRET are required in webhook mode")
+    webhook_url = f"{WEBHOOK_URL.rstrip('/')}/{url_path}"
+    logging.info(f"webhook: listen {WEBHOOK_LISTEN}:{port}/{url_path}, url {webhook_url}")
+    application.run_webhook(listen=WEBHOOK_LISTEN,
+                            port=port,
+                            url_path=url_path,
+                            webhook_url=webhook_url,
+                            secret_token=WEBHOOK_SECRET,
+                            max_connections=WEBHOOK_MAX_CONNECTIONS)
@@ -0,0 +1,52 @@
+# Upload books in .txt format from files or directories to database
+#  (same format as for the admin bot, see `BookReader.read_book`)
+
+import argparse
+import logging
+import time
+from pathlib import Path
+
+import mysql.connector
+
+from bookparse import BookReader
+from database import Database
+from config import DB_CONFIG, INSERT_BATCH_SIZE, INSERT_BATCH_BYTES
+
+logging.basicConfig(level=logging.INFO)
+
+
+def book_files(paths: list[str]) -> list[Path]:
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files += sorted(path.glob('*.txt'))
+        else:
+            files.append(path)
+    return files
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Upload books to database")
+    parser.add_argument('paths', nargs='+', help=".txt files or directories with them")
+    parser.add_argument('--batch-size', type=int, default=INSERT_BATCH_SIZE,
+                        help="pages inserted by one statement")
+    args = parser.parse_args()
+
+    logging.getLogger(mysql.connector.__name__).setLevel(logging.WARNING)
+    db = Database(DB_CONFIG)
+    start = time.perf_counter()
+    books = pages = 0
+    for path in book_files(args.paths):
+        book = BookReader.read_book(path, lazy=True)
+        if book.pages is None:
+            logging.warning(f"there is no text after the header in {path}")
+            continue
+        try:
+            if db.insert_book(book, batch_size=args.batch_size, batch_bytes=INSERT_BATCH_BYTES) != None:
+                books += 1
+                pages += len(book.pages)
+        finally:
+            book.pages.close()
+    elapsed = time.perf_counter() - start
+    logging.info(f"Done. {books} books, {pages} pages in {elapsed:.1f} s "
+                 f"({pages / elapsed:.0f} rows/s)")
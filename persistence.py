@@ -0,0 +1,184 @@
+import asyncio
+import gc
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+from typing import Optional
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+
+class SqlitePersistence(BasePersistence):
+    """
+    `chat_data` and states of persistent `ConversationHandler`s in an SQLite file,
+    so chats continue their conversations after restarts of the bot.
+
+    `Application` passes changed chats and conversations every `update_interval`
+    seconds (not in handlers). Changes are collected and written in background
+    by one transaction, changes of a chat made before the write replace each other.
+    Values of `chat_data` are pickled, one row per chat.
+    """
+    writes: int         # transactions
+    written: int        # changed rows
+    _chats: dict        # chat_id -> chat_data (`None` - delete) waiting for write
+    _conversations: dict    # (name, key) -> state (`None` - delete) waiting for write
+
+    def __init__(self, path: str, update_interval: float = 60):
+        super().__init__(store_data=PersistenceInput(bot_data=False,
+                                                     chat_data=True,
+                                                     user_data=False,
+                                                     callback_data=False),
+                         update_interval=update_interval)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS chat_data "
+                               "(chat_id INTEGER PRIMARY KEY, data BLOB NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS conversation "
+                               "(name TEXT, key TEXT, state TEXT NOT NULL, "
+                               "PRIMARY KEY (name, key)) WITHOUT ROWID")
+        self._chats = {}
+        self._conversations = {}
+        self._writer = None
+        self._chat_data_loaded = False
+        self.writes = 0
+        self.written = 0
+
+    async def get_chat_data(self) -> dict:
+        # the first call is made by `Application.initialize` before updates are handled
+        pause_gc = not self._chat_data_loaded
+        self._chat_data_loaded = True
+        return await asyncio.to_thread(self._load_chat_data, pause_gc)
+
+    async def get_conversations(self, name: str) -> dict:
+        return await asyncio.to_thread(self._load_conversations, name)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        # `data` is a copy made by `Application`
+        self._chats[chat_id] = data
+        self._schedule_write()
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._chats[chat_id] = None
+        self._schedule_write()
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def update_conversation(self, name: str, key: tuple,
+                                  new_state: Optional[object]) -> None:
+        self._conversations[(name, json.dumps(key))] = new_state
+        self._schedule_write()
+
+    async def flush(self) -> None:
+        """Write all changes and close the file"""
+        if self._writer is not None:
+            await self._writer
+        await asyncio.to_thread(self._write, *self._take_changes())
+        self._conn.close()
+        logging.info(f"persistence: {self.stats()}")
+
+    def stats(self) -> dict:
+        return {'waiting': len(self._chats) + len(self._conversations),
+                'writes': self.writes,
+                'written': self.written}
+
+    # user_data, bot_data and callback_data are not stored
+
+    async def get_user_data(self) -> dict:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        pass
+
+    async def update_bot_data(self, data: dict) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def drop_user_data(self, user_id: int) -> None:
+        pass
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    def _schedule_write(self):
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._write_in_background())
+
+    def _take_changes(self) -> tuple[dict, dict]:
+        # changes made during the write wait for the next one
+        chats, self._chats = self._chats, {}
+        conversations, self._conversations = self._conversations, {}
+        return chats, conversations
+
+    async def _write_in_background(self):
+        # the other `update_*` calls of the same run add their changes meanwhile
+        await asyncio.sleep(0)
+        chats, conversations = self._take_changes()
+        try:
+            await asyncio.to_thread(self._write, chats, conversations)
+        except Exception:
+            logging.exception("persistence: changes are not written")
+            # keep them for the next write, newer changes win
+            self._chats = chats | self._chats
+            self._conversations = conversations | self._conversations
+
+    def _write(self, chats: dict, conversations: dict):
+        if not chats and not conversations:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chat_data VALUES (?, ?)",
+                ((chat_id, pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+                 for chat_id, data in chats.items() if data is not None))
+            self._conn.executemany(
+                "DELETE FROM chat_data WHERE chat_id = ?",
+                ((chat_id,) for chat_id, data in chats.items() if data is None))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO conversation VALUES (?, ?, ?)",
+                ((name, key, json.dumps(state))
+                 for (name, key), state in conversations.items() if state is not None))
+            self._conn.executemany(
+                "DELETE FROM conversation WHERE name = ? AND key = ?",
+                (key for key, state in conversations.items() if state is None))
+        self.writes += 1
+        self.written += len(chats) + len(conversations)
+
+    def _load_chat_data(self, pause_gc: bool = False) -> dict:
+        # collections of the garbage collector during loading of millions 
+        #  of small dicts take half of the time. `gc.disable` affects the whole
+        #  process, so it is used only at startup when nothing else runs
+        gc_enabled = gc.isenabled()
+        if pause_gc:
+            gc.disable()
+        try:
+            with self._lock:
+                rows = self._conn.execute("SELECT chat_id, data FROM chat_data")
+                chat_data = {chat_id: pickle.loads(data) for chat_id, data in rows}
+        finally:
+            if gc_enabled:
+                gc.enable()
+        logging.info(f"persistence: chat_data of {len(chat_data)} chats loaded")
+        return chat_data
+
+    def _load_conversations(self, name: str) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT key, state FROM conversation WHERE name = ?",
+                                      (name,)).fetchall()
+        return {tuple(json.loads(key)): json.loads(state) for key, state in rows}
@@ -0,0 +1,112 @@
+# Render quote images in advance, e.g. for popular sentences or for export.
+#  Input: JSON lines {"author": ..., "title": ..., "quote": ..., "theme": "RRGGBB" or null}
+#  Output: directory, .zip archive or the bot's quote image cache (--cache)
+
+import argparse
+import contextlib
+import json
+import logging
+import sys
+import time
+import zipfile
+from pathlib import Path
+from typing import Iterator
+
+from imgcache import QuoteImageCache
+from imgen import ImageEncoder, ENCODER_MODES, hex_to_rgb
+from renderpool import RenderPool
+from config import QUOTE_CACHE_DIR, QUOTE_CACHE_BYTES, RENDER_WORKERS
+from config import IMAGE_FORMAT, IMAGE_QUALITY, IMAGE_PNG_LEVEL, IMAGE_SCALE
+
+logging.basicConfig(level=logging.INFO)
+
+REPORT_EVERY = 1000
+
+
+def read_items(lines) -> Iterator[tuple]:
+    """
+    `(author, title, quote, theme)` from JSON lines.
+    Items with invalid theme are skipped
+    """
+    for num, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        theme = item.get("theme")
+        rgb = None
+        if theme:
+            rgb = hex_to_rgb(theme)
+            if rgb is None:
+                logging.warning(f"line {num}: invalid theme {theme!r}, the quote is skipped")
+                continue
+        yield (item["author"], item["title"], item["quote"], rgb)
+
+
+class ImageSink:
+    """Saves images to a directory or a .zip archive by names `<key><extension>`"""
+
+    def __init__(self, path: Path, extension: str):
+        self._extension = extension
+        self._zip = None
+        self._dir = path
+        if path.suffix == '.zip':
+            self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_STORED)
+        else:
+            path.mkdir(parents=True, exist_ok=True)
+
+    def put_image(self, key: str, data: bytes):
+        name = key + self._extension
+        if self._zip is not None:
+            self._zip.writestr(name, data)
+        else:
+            (self._dir / name).write_bytes(data)
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render quote images")
+    parser.add_argument('input', help="file with JSON lines or - for stdin")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument('--output', type=Path, help="directory or .zip archive")
+    output.add_argument('--cache', action='store_true',
+                        help="add images to the bot's cache (QUOTE_CACHE_DIR)")
+    parser.add_argument('--workers', type=int, default=RENDER_WORKERS)
+    parser.add_argument('--format', choices=ENCODER_MODES, default=IMAGE_FORMAT)
+    parser.add_argument('--quality', type=int, default=IMAGE_QUALITY)
+    parser.add_argument('--scale', type=float, default=IMAGE_SCALE)
+    args = parser.parse_args()
+
+    encoder = ImageEncoder(args.format, 
+                           quality=args.quality, 
+                           png_level=IMAGE_PNG_LEVEL, 
+                           scale=args.scale)
+    pool = RenderPool(args.workers, max_pending=64 * max(1, args.workers), encoder=encoder)
+    if args.cache:
+        sink = QuoteImageCache(QUOTE_CACHE_DIR, QUOTE_CACHE_BYTES)
+    else:
+        sink = ImageSink(args.output, Path(encoder.filename).suffix)
+
+    if args.input == '-':
+        source = contextlib.nullcontext(sys.stdin)
+    else:
+        source = open(args.input, encoding='utf-8')
+    start = time.perf_counter()
+    count = 0
+    with source as lines:
+        for (author, title, quote, theme), image in pool.render_many(read_items(lines)):
+            # same key as the bot uses
+            key = QuoteImageCache.key(author, title, quote, 
+                                      theme or pool.theme, repr(encoder))
+            sink.put_image(key, image)
+            count += 1
+            if count % REPORT_EVERY == 0:
+                logging.info(f"{count} images, "
+                             f"{count / (time.perf_counter() - start):.1f} images/s")
+    elapsed = time.perf_counter() - start
+    if isinstance(sink, ImageSink):
+        sink.close()
+    pool.shutdown()
+    logging.info(f"Done. {count} images in {elapsed:.1f} s ({count / elapsed:.1f} images/s)")
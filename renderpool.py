@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+from imgen import DEFAULT_THEME, ImageEncoder, QuoteImage
+
+# `QuoteImage` and `ImageEncoder` of the worker process, set by `_init_worker`
+_generator: QuoteImage
+_encoder: ImageEncoder
+
+
+def _init_worker(encoder: ImageEncoder, quote_image_kwargs: dict):
+    global _generator, _encoder
+    _encoder = encoder
+    _generator = QuoteImage(**quote_image_kwargs)
+    # render the template and load glyphs before the first request
+    _generator.make("", "", "")
+
+
+def _render(author: str, title: str, quote: str, theme) -> bytes:
+    generator = _generator if theme is None else _generator.for_theme(theme)
+    return _encoder.encode(generator.make(author, title, quote))
+
+
+def _render_batch(items: list[tuple]) -> list[bytes]:
+    return [_encoder.encode(image) for image in _generator.make_many(items)]
+
+
+def _ready() -> bool:
+    return True
+
+
+class RenderPool:
+    """
+    Renders images of quotes in worker processes,
+    so the event loop is not blocked and images are rendered on all cores.
+
+    Each worker loads its own `QuoteImage(**quote_image_kwargs)` at start,
+    images are converted to bytes by `encoder` (`ImageEncoder()` by default).
+    At most `max_pending` images are rendered or queued at the same time,
+    other `render` calls wait (back-pressure for bursts of requests).
+    `workers=0` renders in one thread of the current process.
+    """
+    theme: tuple
+    encoder: ImageEncoder
+    rendered: int
+    render_time: float
+    waits: int
+    pending: int      # images rendered or waiting for a worker
+
+    def __init__(self, 
+                 workers: int, 
+                 max_pending: int, 
+                 encoder: Optional[ImageEncoder] = None,
+                 **quote_image_kwargs):
+        self.workers = workers
+        self.theme = quote_image_kwargs.get('color_theme', DEFAULT_THEME)
+        encoder = encoder or ImageEncoder()
+        self.encoder = encoder
+        self._max_pending = max_pending
+        self._executor = self._make_executor(workers, (encoder, quote_image_kwargs))
+        self._semaphore = None
+        self.rendered = 0
+        self.render_time = 0.0
+        self.waits = 0
+        self.pending = 0
+
+    @staticmethod
+    def _make_executor(workers: int, initargs: tuple) -> Executor:
+        if workers <= 0:
+            return ThreadPoolExecutor(max_workers=1,
+                                      initializer=_init_worker,
+                                      initargs=initargs)
+        # "spawn": forked copies of the bot's threads and connections are not safe
+        return ProcessPoolExecutor(max_workers=workers,
+                                   mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker,
+                                   initargs=initargs)
+
+    async def start(self) -> None:
+        """Start workers and load fonts in them before the first request"""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _ready)
+                               for _ in range(max(1, self.workers))))
+        logging.info(f"render pool started: {self.workers} workers "
+                     f"in {time.perf_counter() - start:.2f} s")
+
+    async def render(self, author: str, title: str, quote: str, theme=None) -> bytes:
+        """Encoded image of the quote with color `theme` (the default one if `None`)"""
+        if self._semaphore is None:
+            # created here to be bound to the running loop
+            self._semaphore = asyncio.Semaphore(self._max_pending)
+        if self._semaphore.locked():
+            self.waits += 1
+        async with self._semaphore:
+            self.pending += 1
+            start = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            try:
+                image = await loop.run_in_executor(self._executor, _render,
+                                                   author, title, quote, theme)
+            finally:
+                self.pending -= 1
+            self.render_time += time.perf_counter() - start
+            self.rendered += 1
+            return image
+
+    def render_many(self, 
+                    items: Iterable[tuple], 
+                    chunk_size: int = 16) -> Iterator[tuple[tuple, bytes]]:
+        """
+        Pairs `(item, encoded image)` for `(author, title, quote, theme)` items
+        in the same order (for scripts, not for the event loop). Items are sent
+        to workers by chunks of `chunk_size`, at most `max_pending` images are in work
+        """
+        items = iter(items)
+        max_chunks = max(1, self._max_pending // chunk_size, self.workers)
+        chunks = deque()    # (items, future of images)
+        while True:
+            while len(chunks) < max_chunks and (chunk := list(islice(items, chunk_size))):
+                chunks.append((chunk, self._executor.submit(_render_batch, chunk)))
+            if not chunks:
+                return
+            chunk, images = chunks.popleft()
+            images = images.result()
+            self.rendered += len(images)
+            yield from zip(chunk, images)
+
+    def stats(self) -> dict:
+        return {'workers': self.workers,
+                'pending': self.pending,
+                'rendered': self.rendered,
+                'waits': self.waits,
+                'avg_time': round(self.render_time / self.rendered, 4) if self.rendered else None}
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -1,20 +1,35 @@
 import logging
-import io
 import asyncio
 from functools import wraps 
-from datetime import datetime
-from typing import Callable, Set
+from typing import Callable
 
-from telegram import Update
+from telegram import Bot, Update
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardRemove
-from telegram.ext import ApplicationBuilder, ContextTypes, filters
+from telegram.ext import Application, ContextTypes, filters
 from telegram.ext import CommandHandler, ConversationHandler, CallbackQueryHandler, MessageHandler
 from telegram.ext import InvalidCallbackData, Defaults 
-import nltk
-
-from database import Database
-from imgen import QuoteImage
-from config import BOT_TOKEN, DB_CONFIG, BANLIST_UPD_INTERVAL
+from telegram.error import BadRequest
+
+from database import Database, AsyncDatabase, QueryCounter
+from renderpool import RenderPool
+from imgen import ImageEncoder, hex_to_rgb
+from imgcache import QuoteImageCache
+from catalog import BookCatalog
+from banlist import BanList
+from ingress import application_builder, run_application
+from chatorder import ChatOrderedUpdateProcessor
+from sendqueue import SendQueue
+from persistence import SqlitePersistence
+from chatstate import STATE_KEY, ChatState, chat_state, idle_chats
+from config import BOT_TOKEN, DB_CONFIG, BANLIST_UPD_INTERVAL, BANLIST_RELOAD_INTERVAL, WEBHOOK_PORT
+from config import BANLIST_LOG_WINDOW
+from config import DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_STATS_INTERVAL, PAGE_CACHE_BYTES, CHAT_CACHE_SIZE
+from config import CATALOG_REFRESH_INTERVAL, QUOTE_CACHE_DIR, QUOTE_CACHE_BYTES
+from config import RENDER_WORKERS, RENDER_MAX_PENDING, CONCURRENT_UPDATES
+from config import IMAGE_FORMAT, IMAGE_QUALITY, IMAGE_PNG_LEVEL, IMAGE_SCALE
+from config import SEND_GLOBAL_RATE, SEND_CHAT_RATE, SEND_GROUP_RATE, SEND_BURST, SEND_MAX_RETRIES
+from config import SEND_CHAT_QUEUE_SIZE
+from config import PERSISTENCE_FILE, PERSISTENCE_INTERVAL, CHAT_STATE_TTL, CHAT_STATE_EVICT_INTERVAL
 
 
 START_MSG = """
@@ -37,6 +52,7 @@ INFO_MSG = """Этот бот позволяет получить предска
 /start — начало работы с ботом.
 /book — выводит список доступных книг.
 /cancel — отмена предыдущего действия. Например, вы написали команду /book, а потом передумали.
+/color — выбрать цвет рамки картинок.
 /help — показать это сообщение
 """
 ACTIVE_START_MSG = "Предлагаем вам выбрать понравившуюся книгу и получить предсказание! Помощь /help"
@@ -60,15 +76,33 @@ BOOK_IS_NULL = "Для начала выбреите книгу с помощь
 SELECT_BOOK_AGAIN_MSG = "Ой! Мы случайно задели полку и рассыпали все книги! Пожалуйста, выберите книгу заново /book"
 NOTHING_CANCEL = "Сейчас нечего отменять."
 UNKNOWN_COMMAND = "Неизвестная комманда. Помощь /help"
+SELECT_COLOR_MSG = "Выберите цвет рамки для картинок с предсказаниями или отправьте свой цвет командой <code>/color RRGGBB</code>, например <code>/color 3d85c6</code>"
+COLOR_SET_MSG = "Цвет рамки изменён!"
+ERR_COLOR_CHAT_MSG = "Не получилось изменить цвет. Отправьте команду /start и попробуйте снова."
+ERR_COLOR_MSG = "Не получилось разобрать цвет. Отправьте его в виде <code>/color RRGGBB</code>, например <code>/color 3d85c6</code>"
 
 
 LIST_H = 3
 MAX_BUTTON_CHARS = 50
-
-db: Database
-img_generator: QuoteImage 
-banned_chats: Set[int]
-last_bans_update: datetime
+# color themes offered by /color: name -> "RRGGBB" (`None` - default theme)
+COLOR_THEMES = {
+    "Серый": None,
+    "Бежевый": "c7a38f",
+    "Синий": "3d85c6",
+    "Зелёный": "6aa84f",
+    "Бордовый": "990000",
+    "Фиолетовый": "674ea7",
+}
+
+db: AsyncDatabase
+render_pool: RenderPool
+quote_cache: QuoteImageCache
+catalog: BookCatalog
+banned_chats: BanList
+send_queue: SendQueue
+# handled updates and database queries made by them
+updates_count = 0
+update_queries_count = 0
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -76,13 +110,11 @@ logging.basicConfig(
 )
 
 
-def _update_bans():
-    """Lazy evaluated ban list update"""
-    global banned_chats, last_bans_update
-    cur_time = datetime.now()
-    if cur_time - last_bans_update > BANLIST_UPD_INTERVAL:
-        banned_chats = db.get_banned_users()
-        last_bans_update = cur_time
+def _count_queries(chat_id: int, handler_name: str, queries: int):
+    global updates_count, update_queries_count
+    updates_count += 1
+    update_queries_count += queries
+    logging.info(f"chat {chat_id} `{handler_name}`: {queries} database queries")
 
 def check_banned(func: Callable) -> Callable:
     @wraps(func)
@@ -90,14 +122,17 @@ def check_banned(func: Callable) -> Callable:
                       context: ContextTypes.DEFAULT_TYPE,
                       *args, **kwargs):
         """Checks if user's chat is banned and permits actions or not"""
-        _update_bans()
-        chat_id = update.effective_chat.id
-        if chat_id not in banned_chats:
-            logging.info(f"chat {chat_id} invokes `{func.__name__}`")
-            return await func(update, context, *args, **kwargs)
-        else:
-            logging.info(f"BANNED chat {chat_id} tried to send message")
-            return ConversationHandler.END
+        with QueryCounter() as queries:
+            chat_id = update.effective_chat.id
+            if chat_id not in banned_chats:
+                logging.info(f"chat {chat_id} invokes `{func.__name__}`")
+                try:
+                    return await func(update, context, *args, **kwargs)
+                finally:
+                    _count_queries(chat_id, func.__name__, queries.count)
+            else:
+                logging.info(f"BANNED chat {chat_id} tried to send message")
+                return ConversationHandler.END
     return wrapper
 
 
@@ -106,17 +141,17 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Initiates dialogue with bot (/start)"""
     chat_id = update.effective_chat.id
     remove_keyboard = ReplyKeyboardRemove()
-    if db.check_user_exist(chat_id):
-        await context.bot.send_message(chat_id, text=ACTIVE_START_MSG, reply_markup=remove_keyboard)
+    if await db.check_user_exist(chat_id):
+        send_queue.send_message(chat_id, text=ACTIVE_START_MSG, reply_markup=remove_keyboard)
     else:
-        db.record_new_chat(chat_id)
-        await context.bot.send_message(chat_id, text=START_MSG, reply_markup=remove_keyboard)
+        await db.record_new_chat(chat_id)
+        send_queue.send_message(chat_id, text=START_MSG, reply_markup=remove_keyboard)
 
 @check_banned
 async def help(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Send help message to user"""
     chat_id = update.effective_chat.id
-    await context.bot.send_message(chat_id, text=INFO_MSG)
+    send_queue.send_message(chat_id, text=INFO_MSG)
 
 def add_switch_page_buttons(rows: int, desired_rows: int, page_num: int):
     if rows <= desired_rows and page_num == 1:
@@ -145,18 +180,19 @@ def build_books_menu(book_rows: list, desired_rows: int, page_num: int):
     buttons += add_switch_page_buttons(len(book_rows), desired_rows, page_num)
     return InlineKeyboardMarkup(buttons)
 
-def make_books_page(max_rows: int, num: int):
+def make_books_page(book_rows: list, num: int):
     # last row - indicator of additional data for page switch buttons
-    books = db.search_book(rows_count=max_rows+1, 
-                           offset=max_rows*(num-1))
-    return build_books_menu(books, desired_rows=max_rows, page_num=num)
+    return build_books_menu(book_rows, desired_rows=LIST_H, page_num=num)
 
 @check_banned
 async def show_first_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show first page of available books in the menu"""
     chat_id = update.effective_chat.id
-    choice_menu = make_books_page(LIST_H, num=1)
-    await context.bot.send_message(chat_id, "Выберите книгу", reply_markup=choice_menu)
+    if chat_state(context.chat_data) is None:
+        # the menu is kept with the state and evicted together with it
+        context.chat_data[STATE_KEY] = ChatState(None)
+    choice_menu = catalog.menu(1)
+    send_queue.send_message(chat_id, "Выберите книгу", reply_markup=choice_menu)
     return "browse"
 
 @check_banned
@@ -167,8 +203,10 @@ async def switch_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.callback_query.answer()
         return "browse"
     page_num = int(choice[5:])
-    choice_menu = make_books_page(LIST_H, num=page_num)
-    await update.effective_message.edit_reply_markup(choice_menu)
+    choice_menu = catalog.menu(page_num)
+    send_queue.edit_message_reply_markup(update.effective_chat.id,
+                                         update.effective_message.message_id,
+                                         choice_menu)
     await update.callback_query.answer()
     return "browse"
 
@@ -179,8 +217,8 @@ def gather_summary_message(title: str, author: str, info: str):
     message = message.format(title, author, 'нет описания')
     return message
 
-def gather_maxpage_message(chat_id: int):
-    max_page = db.search_max_page(chat_id)
+async def gather_maxpage_message(chat_id: int):
+    max_page = await db.search_max_page(chat_id)
     if max_page == None:
         return SELECT_PAGE_MSG
     return SELECT_PAGE_MSG + MAX_PAGE_PHRASE % max_page
@@ -190,18 +228,18 @@ async def set_book(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Set book for active chat"""
     choice = update.callback_query.data
     chat_id = update.effective_chat.id
+    message_id = update.effective_message.message_id
     await update.callback_query.answer()
     try:
         book_id = int(choice[5:])
     except ValueError:                      # prevent possible sql injection
-        await update.effective_message.edit_text(ERR_VALUE_MSG)
+        send_queue.edit_message_text(chat_id, message_id, ERR_VALUE_MSG)
     else:
-        db.update_chat_book(chat_id, book_id)
-        book_info = db.book_metadata(book_id)
-        await update.effective_message.edit_text(gather_summary_message(*book_info))
-        context.chat_data[chat_id] = {"author": book_info[0], "title": book_info[1]}
-        await asyncio.sleep(0.5)
-        await context.bot.send_message(chat_id, text=gather_maxpage_message(chat_id))
+        await db.update_chat_book(chat_id, book_id)
+        book_info = await db.book_metadata(book_id)
+        send_queue.edit_message_text(chat_id, message_id, gather_summary_message(*book_info))
+        context.chat_data[STATE_KEY] = ChatState(book_id)
+        send_queue.send_message(chat_id, text=await gather_maxpage_message(chat_id))
     return ConversationHandler.END
 
 @check_banned
@@ -211,38 +249,71 @@ async def select_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
     for further quote generation
     """
     chat_id = update.effective_chat.id
-    if chat_id not in context.chat_data:
-        await context.bot.send_message(chat_id, SELECT_BOOK_AGAIN_MSG)
-        return ConversationHandler.END
+    state = chat_state(context.chat_data)
+    if state is None or state.book_id is None:
+        # state is evicted after `CHAT_STATE_TTL`, the book is kept in database
+        book_id = await db.chat_book(chat_id)
+        if book_id == None:
+            send_queue.send_message(chat_id, SELECT_BOOK_AGAIN_MSG)
+            return ConversationHandler.END
+        state = context.chat_data[STATE_KEY] = ChatState(book_id)
     selected_page = int(update.message.text)
-    max_page = db.search_max_page(chat_id)
+    max_page = await db.book_max_page(state.book_id)
     if max_page == None:
-        await context.bot.send_message(chat_id, ERR_SELECT_PAGE_MSG)
+        send_queue.send_message(chat_id, ERR_SELECT_PAGE_MSG)
         return ConversationHandler.END 
     if selected_page < 1 or selected_page > max_page:
         message = ERR_SELECT_PAGE_MSG + MAX_PAGE_PHRASE % max_page
-        await context.bot.send_message(chat_id, message)
+        send_queue.send_message(chat_id, message)
+        return ConversationHandler.END
+    sentences = await db.book_sentences(state.book_id, selected_page)
+    if sentences == None:
+        send_queue.send_message(chat_id, ERR_SELECT_PAGE_MSG)
         return ConversationHandler.END
-    page_text = db.page_content(chat_id, selected_page)
-    sentences = nltk.tokenize.sent_tokenize(page_text, language='russian')
-    context.chat_data[chat_id].update({"sentences": sentences, "page": selected_page})
+    state.select_page(selected_page, len(sentences))
     message = SELECT_SENT_MSG + MAX_SENT_PHRASE % len(sentences)
-    await context.bot.send_message(chat_id, message)
+    send_queue.send_message(chat_id, message)
     return "browse"
 
-async def send_quote_image(chat_id: int, 
-                             quote: str, 
-                             context: ContextTypes.DEFAULT_TYPE):
-    """Generate and send image of text quote"""
-    temp_memory = io.BytesIO()
-    img_generator.make(
-        context.chat_data[chat_id]["author"], 
-        context.chat_data[chat_id]["title"], 
-        quote).save(temp_memory, format='png')
-    temp_memory.seek(0)
-    temp_memory.name = "image.png"
-    await context.bot.send_photo(chat_id, temp_memory)
-    temp_memory.close() 
+async def quote_image(key: str, author: str, title: str, quote: str, theme) -> bytes:
+    """Image from `quote_cache` or rendered by `render_pool`"""
+    image = await asyncio.to_thread(quote_cache.image, key)
+    if image is None:
+        image = await render_pool.render(author, title, quote, theme)
+        await asyncio.to_thread(quote_cache.put_image, key, image)
+    return image
+
+async def send_quote_image(chat_id: int, author: str, title: str, quote: str):
+    """
+    Enqueue image of text quote from the book. 
+    Image sent before is sent again by `file_id`, 
+    image rendered before is taken from `quote_cache`
+    """
+    hex_color = await db.chat_color(chat_id)
+    theme = hex_to_rgb(hex_color) if hex_color else None
+    key = quote_cache.key(author, title, quote, 
+                          theme or render_pool.theme, repr(render_pool.encoder))
+    file_id = await asyncio.to_thread(quote_cache.file_id, key)
+    image = None
+    if file_id is None:
+        image = await quote_image(key, author, title, quote, theme)
+
+    async def send(bot: Bot):
+        nonlocal file_id, image
+        if file_id is not None:
+            try:
+                return await bot.send_photo(chat_id, file_id)
+            except BadRequest as err:
+                logging.warning(f"cached file_id is not accepted: {err}")
+                await asyncio.to_thread(quote_cache.forget_file_id, key)
+                file_id = None
+                image = await quote_image(key, author, title, quote, theme)
+        message = await bot.send_photo(chat_id, image, filename=render_pool.encoder.filename)
+        if message.photo:
+            await asyncio.to_thread(quote_cache.put_file_id, key, message.photo[-1].file_id)
+        return message
+
+    send_queue.enqueue(chat_id, send)
 
 @check_banned
 async def page_line(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -251,33 +322,78 @@ async def page_line(update: Update, context: ContextTypes.DEFAULT_TYPE):
     for further quote generation
     """
     chat_id = update.effective_chat.id
-    try:
-        page_num = context.chat_data[chat_id]["page"]
-        sentences = context.chat_data[chat_id]["sentences"]
-        sent_num = int(update.message.text)
-        if sent_num < 1 or sent_num > len(sentences):
-            raise ValueError
-    except KeyError:
-        await context.bot.send_message(chat_id, ERR_NO_PAGE)
-    except ValueError:
+    state = chat_state(context.chat_data)
+    if state is None or state.page is None:
+        send_queue.send_message(chat_id, ERR_NO_PAGE)
+        return ConversationHandler.END
+    sent_num = int(update.message.text)
+    if sent_num < 1 or sent_num > state.sentences:
+        message = ERR_SELECT_SENT_MSG + MAX_SENT_PHRASE % state.sentences
+        send_queue.send_message(chat_id, message)
+        return "browse"
+    # sentences are cut from the cached page again instead of keeping them per chat
+    sentences = await db.book_sentences(state.book_id, state.page)
+    metadata = await db.book_metadata(state.book_id)
+    if sentences == None or metadata == None:
+        # the book is deleted or database is not available
+        state.reset_page()
+        send_queue.send_message(chat_id, ERR_NO_PAGE)
+        return ConversationHandler.END
+    if sent_num > len(sentences):
+        # the page is changed since it was selected
+        state.select_page(state.page, len(sentences))
         message = ERR_SELECT_SENT_MSG + MAX_SENT_PHRASE % len(sentences)
-        await context.bot.send_message(chat_id, message)
+        send_queue.send_message(chat_id, message)
         return "browse"
-    else:
-        await context.bot.send_message(chat_id, VERIFY_MSG % (sent_num, page_num))
-        await asyncio.sleep(1)
-        await context.bot.send_message(chat_id, DIVINATION_MSG % sentences[sent_num - 1])
-        await send_quote_image(chat_id, sentences[sent_num - 1], context)
-        context.chat_data[chat_id].pop("sentences")
+    author, title, _ = metadata
+    quote = sentences[sent_num - 1]
+    send_queue.send_message(chat_id, VERIFY_MSG % (sent_num, state.page))
+    send_queue.send_message(chat_id, DIVINATION_MSG % quote)
+    await send_quote_image(chat_id, author, title, quote)
+    state.reset_page()
 
     return ConversationHandler.END
 
+@check_banned
+async def select_color(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Set color theme of pictures (/color [RRGGBB]) or show menu of themes"""
+    chat_id = update.effective_chat.id
+    if not context.args:
+        buttons = [[InlineKeyboardButton(name, callback_data=f"color_{color or 'default'}")]
+                   for name, color in COLOR_THEMES.items()]
+        send_queue.send_message(chat_id, SELECT_COLOR_MSG, 
+                                reply_markup=InlineKeyboardMarkup(buttons))
+        return
+    hex_color = context.args[0].lstrip('#').lower()
+    if hex_to_rgb(hex_color) is None:
+        send_queue.send_message(chat_id, ERR_COLOR_MSG)
+        return
+    if not await db.update_chat_color(chat_id, hex_color):
+        # the chat is not recorded by /start or database is not available
+        send_queue.send_message(chat_id, ERR_COLOR_CHAT_MSG)
+        return
+    send_queue.send_message(chat_id, COLOR_SET_MSG)
+
+@check_banned
+async def set_color(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Set color theme selected in the menu of /color"""
+    chat_id = update.effective_chat.id
+    await update.callback_query.answer()
+    hex_color = update.callback_query.data[6:]
+    if hex_color == 'default':
+        hex_color = None
+    message = COLOR_SET_MSG
+    if not await db.update_chat_color(chat_id, hex_color):
+        message = ERR_COLOR_CHAT_MSG
+    send_queue.edit_message_text(chat_id, update.effective_message.message_id, message)
+
 @check_banned
 async def cancel_action(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
-    await context.bot.send_message(chat_id, CANCEL_ACTION_MSG)
-    if chat_id in context.chat_data:
-        context.chat_data[chat_id].pop("sentences", None)
+    send_queue.send_message(chat_id, CANCEL_ACTION_MSG)
+    state = chat_state(context.chat_data)
+    if state is not None:
+        state.reset_page()
     return ConversationHandler.END
 
 @check_banned
@@ -287,34 +403,89 @@ async def nothing_to_cancel(update: Update, сontext: ContextTypes.DEFAULT_TYPE)
     (Example: cancel selecting page line after page itself has been selected)
     """
     chat_id = update.effective_chat.id
-    await сontext.bot.send_message(chat_id, NOTHING_CANCEL)
+    send_queue.send_message(chat_id, NOTHING_CANCEL)
 
 @check_banned
 async def default_error(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
-    await context.bot.send_message(chat_id, INACCESSIBLE_COMMAND)
+    send_queue.send_message(chat_id, INACCESSIBLE_COMMAND)
     return "browse"
 
 @check_banned
 async def command_not_found(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
-    await context.bot.send_message(chat_id, UNKNOWN_COMMAND)
+    send_queue.send_message(chat_id, UNKNOWN_COMMAND)
 
 async def handle_invalid_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Informs that button is not available now"""
     await update.callback_query.answer()
-    await update.effective_message.edit_text(INVALID_BUTTON_MSG)
+    send_queue.edit_message_text(update.effective_chat.id, 
+                                 update.effective_message.message_id, 
+                                 INVALID_BUTTON_MSG)
+
+async def log_db_stats(context: ContextTypes.DEFAULT_TYPE):
+    logging.info(f"updates: {context.application.update_processor.stats()}")
+    logging.info(f"database pool: {db.sync.pool_stats()}")
+    logging.info(f"database caches: {db.sync.cache_stats()}")
+    logging.info(f"ban list: {banned_chats.stats()}")
+    logging.info(f"quote image cache: {quote_cache.stats()}")
+    logging.info(f"render pool: {render_pool.stats()}")
+    logging.info(f"send queue: {send_queue.stats()}")
+    if updates_count:
+        logging.info(f"database queries per update: "
+                     f"{update_queries_count / updates_count:.2f} ({updates_count} updates)")
+
+async def evict_idle_chats(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Drop state of chats which didn't use it for `CHAT_STATE_TTL`
+    (their conversations are ended by `conversation_timeout`)
+    """
+    application = context.application
+    idle = idle_chats(application.chat_data, CHAT_STATE_TTL.total_seconds())
+    for chat_id in idle:
+        application.drop_chat_data(chat_id)
+    logging.info(f"chat states: {len(idle)} idle dropped, "
+                 f"{len(application.chat_data)} kept")
+
+async def refresh_catalog(context: ContextTypes.DEFAULT_TYPE):
+    await catalog.refresh(db)
+
+async def refresh_bans(context: ContextTypes.DEFAULT_TYPE):
+    await banned_chats.refresh(db)
+
+async def load_data(application: Application):
+    await banned_chats.refresh(db)
+    await catalog.load(db)
+    await render_pool.start()
+    send_queue.start(application.bot)
+
+async def flush_messages(application: Application):
+    await send_queue.stop()
+
+async def release_resources(application: Application):
+    render_pool.shutdown()
+    db.shutdown()
 
 def run_bot():
     defaults = Defaults(parse_mode='HTML')
-    application = ApplicationBuilder().defaults(defaults)\
-                                      .token(BOT_TOKEN)  \
-                                      .build()
+    update_processor = ChatOrderedUpdateProcessor(CONCURRENT_UPDATES)
+    persistence = SqlitePersistence(PERSISTENCE_FILE, 
+                                    update_interval=PERSISTENCE_INTERVAL.total_seconds())
+    application = application_builder(BOT_TOKEN).defaults(defaults)\
+                                                .concurrent_updates(update_processor) \
+                                                .persistence(persistence) \
+                                                .post_init(load_data) \
+                                                .post_stop(flush_messages) \
+                                                .post_shutdown(release_resources) \
+                                                .build()
 
     start_handler = CommandHandler('start', start)
 
     help_handler = CommandHandler('help', help)
 
+    color_handler = CommandHandler('color', select_color)
+    set_color_handler = CallbackQueryHandler(set_color, pattern=r'^color_(default|[0-9a-f]{6})$')
+
     select_book_handler = ConversationHandler(
         entry_points=[CommandHandler('book', show_first_page)],
         states={
@@ -323,7 +494,10 @@ def run_bot():
                 },
         fallbacks=[CommandHandler('cancel', cancel_action),
                    MessageHandler(filters.TEXT | filters.COMMAND, default_error)], 
-        per_message=False)
+        per_message=False,
+        conversation_timeout=CHAT_STATE_TTL,
+        name="select_book",
+        persistent=True)
     
     make_divitaion_handler = ConversationHandler(
         entry_points=[MessageHandler(filters.Regex(r'^\s*\d+\s*$'), select_page)],
@@ -332,7 +506,10 @@ def run_bot():
                 },
         fallbacks=[CommandHandler('cancel', cancel_action), 
                    MessageHandler(filters.TEXT | filters.COMMAND, default_error)],
-        per_message=False)
+        per_message=False,
+        conversation_timeout=CHAT_STATE_TTL,
+        name="divination",
+        persistent=True)
     
     useless_cancel_handler = CommandHandler('cancel', nothing_to_cancel)
     
@@ -340,6 +517,8 @@ def run_bot():
 
     application.add_handler(start_handler)
     application.add_handler(help_handler)
+    application.add_handler(color_handler)
+    application.add_handler(set_color_handler)
     application.add_handler(select_book_handler)
     application.add_handler(make_divitaion_handler)
     application.add_handler(useless_cancel_handler)
@@ -347,13 +526,33 @@ def run_bot():
 
     application.add_handler(CallbackQueryHandler(handle_invalid_button))
 
+    application.job_queue.run_repeating(log_db_stats, interval=DB_STATS_INTERVAL)
+    application.job_queue.run_repeating(evict_idle_chats, interval=CHAT_STATE_EVICT_INTERVAL)
+    application.job_queue.run_repeating(refresh_catalog, interval=CATALOG_REFRESH_INTERVAL)
+    application.job_queue.run_repeating(refresh_bans, interval=BANLIST_UPD_INTERVAL)
+
     logging.getLogger("httpx").setLevel(logging.WARNING)
 
-    application.run_polling()
+    run_application(application, url_path="bot", port=WEBHOOK_PORT)
 
 if __name__ == '__main__':
-    db = Database(DB_CONFIG)
-    img_generator = QuoteImage()
-    banned_chats = set(db.get_banned_users())
-    last_bans_update = datetime.now()
+    db = AsyncDatabase(Database(DB_CONFIG, 
+                                pool_size=DB_POOL_SIZE,
+                                pool_timeout=DB_POOL_TIMEOUT,
+                                page_cache_bytes=PAGE_CACHE_BYTES,
+                                chat_cache_size=CHAT_CACHE_SIZE))
+    encoder = ImageEncoder(IMAGE_FORMAT, 
+                           quality=IMAGE_QUALITY, 
+                           png_level=IMAGE_PNG_LEVEL, 
+                           scale=IMAGE_SCALE)
+    render_pool = RenderPool(RENDER_WORKERS, RENDER_MAX_PENDING, encoder)
+    quote_cache = QuoteImageCache(QUOTE_CACHE_DIR, QUOTE_CACHE_BYTES)
+    catalog = BookCatalog(LIST_H, make_books_page)
+    banned_chats = BanList(BANLIST_UPD_INTERVAL, BANLIST_RELOAD_INTERVAL, BANLIST_LOG_WINDOW)
+    send_queue = SendQueue(SEND_GLOBAL_RATE, 
+                           SEND_CHAT_RATE, 
+                           SEND_GROUP_RATE, 
+                           burst=SEND_BURST, 
+                           max_retries=SEND_MAX_RETRIES,
+                           max_chat_pending=SEND_CHAT_QUEUE_SIZE)
     run_bot()
@@ -9,6 +9,8 @@ your Python version is %s.%s.%s. It means the table creation order may be incorr
 TABLES_CREATION = {}
 ROLE_INSERTIONS = {}
 ADMIN_INSERTION = {}
+# changes for databases created by previous versions (`db_setup.py --migrate`)
+MIGRATIONS = {}
 
 TABLES_CREATION['schema'] = f"""
 CREATE SCHEMA `{DB_CONFIG["database"]}` DEFAULT CHARACTER SET utf8 ;
@@ -20,7 +22,7 @@ USE `{DB_CONFIG["database"]}`;
 
 TABLES_CREATION['table book'] = """
 CREATE TABLE IF NOT EXISTS `book` (
-    `id` SMALLINT UNSIGNED NOT NULL,
+    `id` SMALLINT UNSIGNED NOT NULL AUTO_INCREMENT,
     `title` VARCHAR(1024) NULL,
     `author` VARCHAR(1024) NULL,
     `info` VARCHAR(2048) NULL,
@@ -46,6 +48,7 @@ CREATE TABLE IF NOT EXISTS `page` (
     `book_id` SMALLINT UNSIGNED NOT NULL,
     `num` MEDIUMINT NOT NULL,
     `content` VARCHAR(4096) NULL,
+    `sentences` TEXT NULL,
     PRIMARY KEY (`book_id`, `num`),
     CONSTRAINT `fk_page_book_id`
         FOREIGN KEY (`book_id`)
@@ -82,6 +85,50 @@ CREATE TABLE IF NOT EXISTS `chat_role` (
 ) ENGINE = InnoDB;
 """
 
+TABLES_CREATION['table chat_role_log'] = """
+CREATE TABLE IF NOT EXISTS `chat_role_log` (
+    `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+    `chat_id` BIGINT UNSIGNED NOT NULL,
+    `role_id` INT UNSIGNED NOT NULL,
+    `action` ENUM('grant', 'revoke') NOT NULL,
+    `changed_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (`id`),
+    INDEX `chat_role_log_role_id_idx` (`role_id` ASC, `id` ASC) VISIBLE
+) ENGINE = InnoDB;
+"""
+
+# triggers are dropped and created again
+#  (`CREATE TRIGGER IF NOT EXISTS` needs MySQL 8.0.29)
+TABLES_CREATION['drop trigger chat_role_AFTER_INSERT'] = """
+DROP TRIGGER IF EXISTS `chat_role_AFTER_INSERT`;
+"""
+
+TABLES_CREATION['trigger chat_role_AFTER_INSERT'] = """
+CREATE TRIGGER `chat_role_AFTER_INSERT` AFTER INSERT ON `chat_role`
+FOR EACH ROW
+BEGIN
+	IF NEW.role_id = (SELECT id FROM role WHERE name = 'banned') THEN
+		INSERT INTO chat_role_log (chat_id, role_id, action) 
+			VALUES (NEW.chat_id, NEW.role_id, 'grant');
+	END IF;
+END
+"""
+
+TABLES_CREATION['drop trigger chat_role_AFTER_DELETE'] = """
+DROP TRIGGER IF EXISTS `chat_role_AFTER_DELETE`;
+"""
+
+TABLES_CREATION['trigger chat_role_AFTER_DELETE'] = """
+CREATE TRIGGER `chat_role_AFTER_DELETE` AFTER DELETE ON `chat_role`
+FOR EACH ROW
+BEGIN
+	IF OLD.role_id = (SELECT id FROM role WHERE name = 'banned') THEN
+		INSERT INTO chat_role_log (chat_id, role_id, action) 
+			VALUES (OLD.chat_id, OLD.role_id, 'revoke');
+	END IF;
+END
+"""
+
 TABLES_CREATION['trigger chat_role_BEFORE_INSERT'] = """
 CREATE TRIGGER `chat_role_BEFORE_INSERT` BEFORE INSERT ON `chat_role`
 FOR EACH ROW
@@ -111,6 +158,36 @@ CREATE EVENT role_expiration
 """
 
 
+MIGRATIONS['use schema'] = TABLES_CREATION['use schema']
+# ids of new books are given by AUTO_INCREMENT (`chat` and `page` refer to `book.id`)
+MIGRATIONS['disable foreign keys'] = """
+SET FOREIGN_KEY_CHECKS = 0;
+"""
+MIGRATIONS['book id auto increment'] = """
+ALTER TABLE `book` MODIFY `id` SMALLINT UNSIGNED NOT NULL AUTO_INCREMENT;
+"""
+MIGRATIONS['enable foreign keys'] = """
+SET FOREIGN_KEY_CHECKS = 1;
+"""
+# columns of newer versions (already existing columns are skipped by `db_setup.py`)
+MIGRATIONS['column page.sentences'] = """
+ALTER TABLE `page` ADD COLUMN `sentences` TEXT NULL;
+"""
+MIGRATIONS['column chat.hex_color'] = """
+ALTER TABLE `chat` ADD COLUMN `hex_color` CHAR(6) NULL;
+"""
+for alias in ('table chat_role_log',
+              'drop trigger chat_role_AFTER_INSERT',
+              'trigger chat_role_AFTER_INSERT',
+              'drop trigger chat_role_AFTER_DELETE',
+              'trigger chat_role_AFTER_DELETE'):
+    MIGRATIONS[alias] = TABLES_CREATION[alias]
+# records of roles other than 'banned' written by earlier triggers
+MIGRATIONS['clean chat_role_log'] = """
+DELETE FROM chat_role_log WHERE role_id <> (SELECT id FROM role WHERE name = 'banned');
+"""
+
+
 ROLE_INSERTIONS['use schema'] = f"""
 USE `{DB_CONFIG["database"]}`;
 """
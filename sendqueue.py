@@ -0,0 +1,287 @@
+import asyncio
+import logging
+import time
+import warnings
+from collections import deque
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from telegram import Bot
+from telegram.error import RetryAfter
+from telegram.warnings import PTBDeprecationWarning
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second, at most `capacity` tokens are saved for bursts.
+    Waiters of `acquire` get tokens in FIFO order
+    """
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def delay(self, now: Optional[float] = None) -> float:
+        """Seconds before a token is available"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        return max((1 - self._tokens) / self.rate, self._paused_until - now, 0.0)
+
+    def take(self) -> None:
+        self._refill(time.monotonic())
+        self._tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """No tokens for `seconds` (e.g. after "429 Too Many Requests")"""
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens = min(self._tokens, 0.0)
+        self._paused_until = max(self._paused_until, now + seconds)
+
+    def time_to_full(self) -> float:
+        """Seconds before the bucket is full (the same as a new one)"""
+        now = time.monotonic()
+        self._refill(now)
+        return max((self.capacity - self._tokens) / self.rate, self._paused_until - now, 0.0)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while (delay := self.delay()) > 0:
+                await asyncio.sleep(delay)
+            self.take()
+
+    def _refill(self, now: float):
+        if now > self._updated:
+            self._tokens = min(self.capacity,
+                               self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+
+def _seconds(exc: RetryAfter) -> float:
+    with warnings.catch_warnings():
+        # `int` value of `retry_after` is deprecated, `timedelta` is opt-in for now
+        warnings.simplefilter('ignore', PTBDeprecationWarning)
+        retry_after = exc.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+def _retrieve_exception(future: asyncio.Future):
+    # failures are logged by `SendQueue`, callers don't have to await results
+    if not future.cancelled():
+        future.exception()
+
+
+class SendQueue:
+    """
+    Outgoing messages of the bot, sent in background within Telegram limits.
+
+    Handlers enqueue messages (`send_message`, `send_photo` or any `enqueue`d
+    call of the bot) and don't wait until they are sent. Messages of a chat
+    are sent one by one in the order of enqueueing. Every message takes a token
+    of the global bucket (`global_rate` messages per second) and of the bucket
+    of its chat (`chat_rate` per second for private chats, `group_rate` for
+    groups, `burst` messages can be sent at once). After "429 Too Many Requests"
+    all chats wait `retry_after` seconds and the message is sent again
+    (at most `max_retries` times).
+
+    A waiting message enqueued with the same `key` as a new one (e.g. edit
+    of the same message) is replaced by it. If more than `max_chat_pending`
+    messages of a chat wait (0 - no limit), the oldest waiting message with
+    a key is dropped. Messages without key are never dropped, callers which
+    send many of them can await their futures.
+    """
+    pending: int        # enqueued messages which are not sent yet
+    sent: int
+    failed: int
+    retries: int
+    dropped: int        # messages with key dropped by `max_chat_pending`
+    merged: int         # messages replaced by a newer one with the same key
+    _queues: dict       # chat_id -> deque of (call, future, enqueue time, key)
+    _buckets: dict      # chat_id -> TokenBucket
+
+    def __init__(self,
+                 global_rate: float = 30,
+                 chat_rate: float = 1,
+                 group_rate: float = 20 / 60,
+                 burst: int = 3,
+                 max_retries: int = 3,
+                 max_chat_pending: int = 0):
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.max_chat_pending = max_chat_pending
+        self._global_rate = global_rate
+        self._global = None
+        self._bot = None
+        self._queues = {}
+        self._buckets = {}
+        self._tasks = set()
+        self.pending = 0
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.dropped = 0
+        self.merged = 0
+        self.send_time = 0.0
+        self.max_latency = 0.0
+
+    def start(self, bot: Bot) -> None:
+        self._bot = bot
+        # created here to be bound to the running loop
+        self._global = TokenBucket(self._global_rate, self._global_rate)
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Wait at most `timeout` seconds for enqueued messages, drop the rest"""
+        if self._tasks:
+            _, not_done = await asyncio.wait(list(self._tasks), timeout=timeout)
+            for task in not_done:
+                task.cancel()
+            if not_done:
+                logging.warning(f"send queue stopped, {self.pending} messages dropped")
+                await asyncio.gather(*not_done, return_exceptions=True)
+
+    def enqueue(self,
+                chat_id: int,
+                call: Callable[[Bot], Awaitable[Any]],
+                key: Optional[Hashable] = None) -> asyncio.Future:
+        """
+        Schedule `await call(bot)` sending one message to `chat_id`.
+        A waiting call of the chat with the same `key` is replaced.
+        Returns future of its result (awaiting it is not required,
+        the future is cancelled if the call is dropped or replaced)
+        """
+        if self._bot is None:
+            raise RuntimeError("send queue is not started")
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_retrieve_exception)
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = deque()
+            task = asyncio.create_task(self._drain(chat_id, queue))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if key is not None:
+            # the first call can be in progress already
+            for index in range(1, len(queue)):
+                if queue[index][3] == key:
+                    self._cancel(queue, index)
+                    self.merged += 1
+                    break
+        queue.append((call, future, time.monotonic(), key))
+        self.pending += 1
+        if self.max_chat_pending and len(queue) - 1 > self.max_chat_pending:
+            for index in range(1, len(queue)):
+                if queue[index][3] is not None:
+                    self._cancel(queue, index)
+                    self.dropped += 1
+                    break
+        return future
+
+    def send_message(self, chat_id: int, text: str, **kwargs) -> asyncio.Future:
+        return self.enqueue(chat_id, lambda bot: bot.send_message(chat_id, text, **kwargs))
+
+    def send_photo(self, chat_id: int, photo, **kwargs) -> asyncio.Future:
+        return self.enqueue(chat_id, lambda bot: bot.send_photo(chat_id, photo, **kwargs))
+
+    def edit_message_text(self, chat_id: int, message_id: int, text: str,
+                          **kwargs) -> asyncio.Future:
+        return self.enqueue(chat_id,
+                            lambda bot: bot.edit_message_text(text, chat_id, message_id,
+                                                              **kwargs),
+                            key=('text', message_id))
+
+    def edit_message_reply_markup(self, chat_id: int, message_id: int,
+                                  reply_markup) -> asyncio.Future:
+        return self.enqueue(chat_id,
+                            lambda bot: bot.edit_message_reply_markup(chat_id, message_id,
+                                                                      reply_markup=reply_markup),
+                            key=('markup', message_id))
+
+    def stats(self) -> dict:
+        return {'pending': self.pending,
+                'chats': len(self._queues),
+                'sent': self.sent,
+                'failed': self.failed,
+                'retries': self.retries,
+                'dropped': self.dropped,
+                'merged': self.merged,
+                'avg_latency': round(self.send_time / self.sent, 4) if self.sent else None,
+                'max_latency': round(self.max_latency, 4)}
+
+    def _cancel(self, queue: deque, index: int):
+        _, future, _, _ = queue[index]
+        del queue[index]
+        future.cancel()
+        self.pending -= 1
+
+    def _bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            # ids of groups and channels are negative
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            bucket = self._buckets[chat_id] = TokenBucket(rate, self.burst)
+        return bucket
+
+    def _forget_bucket(self, chat_id: int):
+        # full bucket is the same as a new one
+        bucket = self._buckets.get(chat_id)
+        if bucket is None or chat_id in self._queues:
+            return
+        delay = bucket.time_to_full()
+        if delay == 0:
+            del self._buckets[chat_id]
+        else:
+            asyncio.get_running_loop().call_later(delay, self._forget_bucket, chat_id)
+
+    async def _drain(self, chat_id: int, queue: deque):
+        bucket = self._bucket(chat_id)
+        try:
+            while queue:
+                call, future, enqueued, _ = queue[0]
+                await self._send(chat_id, bucket, call, future, enqueued)
+                queue.popleft()
+                self.pending -= 1
+        finally:
+            del self._queues[chat_id]
+            for _, future, _, _ in queue:
+                future.cancel()
+            self.pending -= len(queue)
+            self._forget_bucket(chat_id)
+
+    async def _send(self, chat_id: int, bucket: TokenBucket,
+                    call: Callable, future: asyncio.Future, enqueued: float):
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            await self._global.acquire()
+            try:
+                result = await call(self._bot)
+            except RetryAfter as exc:
+                if attempt == self.max_retries:
+                    error = exc
+                    break
+                self.retries += 1
+                # the limit can be global, other chats wait too
+                bucket.pause(_seconds(exc))
+                self._global.pause(_seconds(exc))
+                logging.warning(f"chat {chat_id}: {exc}")
+            except Exception as exc:
+                error = exc
+                break
+            else:
+                latency = time.monotonic() - enqueued
+                self.sent += 1
+                self.send_time += latency
+                self.max_latency = max(self.max_latency, latency)
+                if not future.done():
+                    future.set_result(result)
+                return
+        self.failed += 1
+        logging.error(f"message to chat {chat_id} is not sent: {error!r}")
+        if not future.done():
+            future.set_exception(error)
@@ -0,0 +1,134 @@
+import logging
+import re
+from typing import List, Optional, Tuple
+
+from config import SENT_TOKENIZER
+
+SENT_LANGUAGE = 'russian'
+
+spanT = Tuple[int, int]
+
+# Abbreviations which are never at the end of a sentence
+ABBREVIATIONS = frozenset("""
+    в вв ул пр-т пл кв корп стр с см ср им напр рис табл гл ч тыс млн млрд
+    руб коп изд обл р-н проф доц акад ген полк кап лейт св т тт т.е т.к т.н т.о
+    и.о н.э англ лат франц нем греч рус ок букв
+""".split())
+# Abbreviations which can finish a sentence ("...и т. д. Потом")
+FINAL_ABBREVIATIONS = frozenset("""
+    т.д т.п др пр проч etc д п
+""".split())
+# "год"/"годы" can finish a sentence after a number ("в 1812 г. Потом"),
+#  otherwise "г." is "город" ("в г. Москве")
+YEAR_ABBREVIATIONS = frozenset(("г", "гг"))
+
+# sentence end candidate: punctuation or new line followed by spaces
+_TERMINATOR = re.compile(
+    r'(?P<end>[.!?…\n][.!?…]*)(?P<close>[»"”’\')\]]*)(?P<space>\s+)(?=(?P<next>\S))'
+)
+_DASHES = '—–-'
+_OPEN_QUOTES = '«"„“(['
+_WORD_AFTER = re.compile(r'[\s' + _DASHES + r']*(\S)')
+
+
+def _is_boundary(text: str, match: re.Match) -> bool:
+    """Decides if sentence ends at the punctuation found by `_TERMINATOR`"""
+    end, next_char = match['end'], match['next']
+    if end[0] == '\n':
+        # empty line between paragraphs
+        return '\n' in match['space']
+    if match['space'].count('\n') > 1:
+        return True
+    if next_char in _DASHES:
+        # dialogue: "— Привет! — сказал он." continues with author's words
+        after_dash = _WORD_AFTER.match(text, match.end())
+        return after_dash is not None and not after_dash[1].islower()
+    if next_char.islower():
+        return False
+    if end != '.' or match['close']:
+        return True
+    word_end = match.start()
+    word_start = max(text.rfind(' ', 0, word_end), text.rfind('\n', 0, word_end)) + 1
+    word = text[word_start:word_end].lstrip(_OPEN_QUOTES + _DASHES)
+    if len(word) == 1 and word.isupper():
+        # initials: "А. С. Пушкин"
+        return False
+    word = word.lower()
+    if word in ABBREVIATIONS:
+        return False
+    if word in FINAL_ABBREVIATIONS:
+        return next_char.isupper() or next_char in _OPEN_QUOTES
+    if word in YEAR_ABBREVIATIONS:
+        previous = text[max(0, word_start - 16):word_start].split()
+        after_number = bool(previous) and any(c.isdigit() for c in previous[-1])
+        return after_number and (next_char.isupper() or next_char in _OPEN_QUOTES)
+    return True
+
+
+def _builtin_spans(text: str) -> List[spanT]:
+    spans = []
+    start = len(text) - len(text.lstrip())
+    for match in _TERMINATOR.finditer(text, start):
+        if not _is_boundary(text, match):
+            continue
+        if match['end'][0] == '\n':
+            end = match.start()
+            while text[end - 1].isspace():
+                end -= 1
+        else:
+            end = match.end('close')
+        spans.append((start, end))
+        start = match.end()
+    end = len(text.rstrip())
+    if start < end:
+        spans.append((start, end))
+    return spans
+
+
+def _nltk_split(text: str) -> List[str]:
+    import nltk  # loading of nltk takes time, import it only when it's needed
+    return nltk.tokenize.sent_tokenize(text, language=SENT_LANGUAGE)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split `text` into sentences with tokenizer selected by `SENT_TOKENIZER`"""
+    if SENT_TOKENIZER == 'builtin':
+        return [text[start:end] for start, end in _builtin_spans(text)]
+    return _nltk_split(text)
+
+
+def sentence_spans(text: str) -> List[spanT]:
+    """Positions `(start, end)` of the sentences in `text`"""
+    if SENT_TOKENIZER == 'builtin':
+        return _builtin_spans(text)
+    spans = []
+    pos = 0
+    for sent in split_sentences(text):
+        start = text.find(sent, pos)
+        if start == -1:
+            logging.warning(f'sentence is not found in the text: {sent[:50]}')
+            continue
+        pos = start + len(sent)
+        spans.append((start, pos))
+    return spans
+
+
+def encode_spans(spans: List[spanT]) -> str:
+    """Spans to compact string for `page.sentences` column: "0 15 16 40 ..." """
+    return " ".join(f"{start} {end}" for start, end in spans)
+
+
+def decode_spans(encoded: str) -> List[spanT]:
+    """Opposite operation of `encode_spans`"""
+    offsets = [int(i) for i in encoded.split()]
+    return list(zip(offsets[::2], offsets[1::2]))
+
+
+def sentences_from_index(text: str, encoded: Optional[str]) -> List[str]:
+    """
+    Sentences of `text` by precomputed index `encoded`.
+    Text is tokenized if there is no index.
+    """
+    if encoded is None:
+        return split_sentences(text)
+    return [text[start:end] for start, end in decode_spans(encoded)]
@@ -0,0 +1,23 @@
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+FONT = Path("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+
+
+@pytest.fixture
+def font_path() -> str:
+    """Font for tests which draw text (DejaVu Sans from the system)"""
+    if not FONT.exists():
+        pytest.skip("font for tests is not found")
+    return str(FONT)
+
+
+@pytest.fixture
+def quote_image_kwargs(font_path) -> dict:
+    """Arguments of `QuoteImage` with the logo of the bot and the test font"""
+    return dict(logo_path=str(ROOT / "images" / "logo_qr.png"),
+                author_font_path=font_path,
+                title_font_path=font_path,
+                quote_font_path=font_path)
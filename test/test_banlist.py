@@ -0,0 +1,125 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from banlist import BanList, ChatIdSet
+
+
+class FakeDatabase:
+
+    def __init__(self, banned):
+        self.banned = list(banned)
+        self.log = []
+        self.full_loads = 0
+
+    def change(self, chat_id, action, log_id=None):
+        # `log_id` - id of a record committed after records with higher ids
+        self.log.append((log_id or len(self.log) + 1, chat_id, action))
+
+    async def ban_log_watermark(self):
+        return max((log_id for log_id, _, _ in self.log), default=0)
+
+    async def get_banned_users(self):
+        self.full_loads += 1
+        return self.banned
+
+    async def get_ban_changes(self, after_id):
+        return sorted(change for change in self.log if change[0] > after_id)
+
+
+class TestBanList:
+
+    def make_list(self):
+        return BanList(timedelta(minutes=2), timedelta(hours=1))
+
+    def test_refresh_00(self):
+        db = FakeDatabase([1, 2])
+        bans = self.make_list()
+
+        asyncio.run(bans.refresh(db))
+
+        assert 1 in bans and 2 in bans and 3 not in bans
+        assert bans.watermark == 0
+        assert bans.last_duration is not None
+
+    def test_refresh_01(self):
+        db = FakeDatabase([1, 2])
+        bans = self.make_list()
+        asyncio.run(bans.refresh(db))
+
+        db.change(3, 'grant')
+        db.change(1, 'revoke')
+        db.change(3, 'revoke')
+        db.change(3, 'grant')
+        asyncio.run(bans.refresh(db))
+
+        assert 1 not in bans and 2 in bans and 3 in bans
+        assert bans.watermark == 4
+        assert db.full_loads == 1
+
+    def test_refresh_03(self):
+        db = FakeDatabase([1, 2])
+        bans = self.make_list()
+        asyncio.run(bans.refresh(db))
+        db.change(3, 'grant')       # id 1
+        db.change(4, 'grant', 3)    # id 2 is not committed yet
+        asyncio.run(bans.refresh(db))
+        assert 3 in bans and 4 in bans
+
+        db.change(5, 'grant', 2)
+        db.change(1, 'revoke', 4)
+        asyncio.run(bans.refresh(db))
+
+        assert 5 in bans and 1 not in bans and 2 in bans and 3 in bans
+        assert bans.watermark == 4
+        assert db.full_loads == 1
+
+    def test_refresh_02(self):
+        db = FakeDatabase([1])
+        bans = BanList(timedelta(minutes=2), timedelta(0))
+        asyncio.run(bans.refresh(db))
+        db.banned = [5]
+
+        asyncio.run(bans.refresh(db))
+
+        assert 5 in bans and 1 not in bans
+        assert db.full_loads == 2
+
+
+class TestChatIdSet:
+
+    def test_contains_00(self):
+        chats = ChatIdSet([5, 1, 3, 3, -7])
+
+        assert len(chats) == 3
+        assert list(chats) == [1, 3, 5]
+        assert 3 in chats
+        assert 2 not in chats and 6 not in chats
+        assert -7 not in chats and 2 ** 70 not in chats
+
+    def test_contains_01(self):
+        # ordered ids as returned by `get_banned_users`
+        chats = ChatIdSet([-1, 1, 1, 2, 5, 5, 5, 9])
+
+        assert list(chats) == [1, 2, 5, 9]
+        assert 5 in chats and 4 not in chats
+
+    def test_updated_00(self):
+        chats = ChatIdSet(range(0, 1000, 2))
+
+        new_chats = chats.updated(added=[1, 4], removed=[2, 3])
+
+        assert 1 in new_chats and 4 in new_chats
+        assert 2 not in new_chats and 3 not in new_chats
+        assert 2 in chats and 1 not in chats
+        assert len(new_chats) == 500
+        assert list(new_chats) == sorted(set(range(0, 1000, 2)) - {2} | {1})
+
+    def test_updated_01(self):
+        chats = ChatIdSet(range(100), overlay_ratio=10)
+
+        chats = chats.updated(added=[], removed=range(20))
+
+        assert chats._added == chats._removed == frozenset()
+        assert list(chats) == list(range(20, 100))
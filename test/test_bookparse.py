@@ -1,7 +1,7 @@
 import pytest
 
 import bookparse
-from bookparse import Book, BookReader
+from bookparse import Book, BookReader, Paginator, SpilledPages, paginate
 
 class TestBook:
 
@@ -74,6 +74,40 @@ class TestBook:
         
         assert lines == desired_lines
 
+class TestPaginator:
+
+    story = TestBook.story
+
+    def test_paginate_00(self, monkeypatch):
+        monkeypatch.setattr("bookparse.LINE_SYMBOLS", 20)
+        monkeypatch.setattr("bookparse.PAGE_SYMBOLS", 6)
+
+        book = Book(text=self.story)
+        chunks = [self.story[i:i+7] for i in range(0, len(self.story), 7)]
+
+        assert list(paginate(chunks)) == book.pages
+
+    def test_paginate_01(self, monkeypatch):
+        monkeypatch.setattr("bookparse.LINE_SYMBOLS", 13)
+        monkeypatch.setattr("bookparse.PAGE_SYMBOLS", 2)
+
+        text = "abra cadabra, rumble\n\n   \nverylongwordhere table,"
+        desired_pages = ["abra cadabra,\nrumble", "\n", 
+                         "verylongwordhere\ntable,", ""]
+
+        assert list(paginate(text)) == desired_pages
+
+    def test_feed_00(self, monkeypatch):
+        monkeypatch.setattr("bookparse.LINE_SYMBOLS", 20)
+        monkeypatch.setattr("bookparse.PAGE_SYMBOLS", 2)
+
+        paginator = Paginator()
+        
+        assert paginator.feed("Медведи живут в тай") == []
+        assert paginator.feed("ге.\nОни едят ягоды") == ["Медведи живут в\nтайге."]
+        assert paginator.close() == ["Они едят ягоды\n", ""]
+
+
 class TestBookReader:
 
     # LLM generated text:
@@ -111,3 +145,41 @@ But I couldn't get distracted by anything, or even sleep, because I didn't have
         assert desired_book.title == book.title
         assert desired_book.info == book.info
 
+
+    def test_read_book_01(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("bookparse.READ_CHUNK_SIZE", 10)
+        path = tmp_path / 'book_file'
+        with open(path, 'w') as f:
+            f.write(self.book_corp)
+
+        book = BookReader.read_book(path)
+        lazy_book = BookReader.read_book(path, lazy=True)
+
+        assert isinstance(lazy_book.pages, SpilledPages)
+        assert lazy_book.author == book.author
+        assert lazy_book.title == book.title
+        assert lazy_book.info == book.info
+        assert list(lazy_book.pages) == book.pages
+
+    def test_read_book_02(self, tmp_path):
+        path = tmp_path / 'book_file'
+        with open(path, 'w') as f:
+            f.write("Author\nThe Title\n\nInfo\n")
+
+        assert BookReader.read_book(path).pages is None
+        assert BookReader.read_book(path, lazy=True).pages is None
+
+
+class TestSpilledPages:
+
+    def test_getitem_00(self):
+        pages = ["первая страница", "", "page 3"]
+        spilled = SpilledPages(pages)
+
+        assert len(spilled) == 3
+        assert spilled[0] == pages[0]
+        assert spilled[-1] == pages[-1]
+        assert spilled[1:] == pages[1:]
+        assert list(spilled) == pages
+        with pytest.raises(IndexError):
+            spilled[3]
@@ -0,0 +1,73 @@
+import pytest
+
+from cache import LRUCache
+
+
+class TestLRUCache:
+
+    def test_put_00(self):
+        cache = LRUCache(max_bytes=10, sizeof=len)
+        cache.put("a", "12345")
+        cache.put("b", "1234")
+
+        assert cache.get("a") == "12345"
+        cache.put("c", "12")        # "b" is the least recently used
+
+        assert "b" not in cache
+        assert cache.get("a") == "12345"
+        assert cache.get("c") == "12"
+        assert cache.size == 7
+        assert cache.evictions == 1
+
+    def test_put_01(self):
+        cache = LRUCache(max_bytes=10, sizeof=len)
+        cache.put("a", "12345")
+        cache.put("a", "1")
+        cache.put("big", "12345678901")
+
+        assert cache.size == 1
+        assert "big" not in cache
+
+    def test_get_00(self):
+        cache = LRUCache(max_bytes=10, sizeof=len)
+        cache.put("a", "1")
+
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert cache.get("b", "default") == "default"
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 2
+
+    def test_invalidate_00(self):
+        cache = LRUCache(max_bytes=100, sizeof=len)
+        for book_id in (1, 2):
+            for num in (1, 2, 3):
+                cache.put((book_id, num), "page")
+
+        assert cache.invalidate(lambda key: key[0] == 1) == 3
+        assert len(cache) == 3
+        assert cache.size == 12
+        assert (2, 1) in cache and (1, 1) not in cache
+
+    def test_load_00(self):
+        cache = LRUCache(max_bytes=100, sizeof=len)
+        generation = cache.start_load("a")
+
+        assert cache.finish_load("a", "loaded", generation)
+        assert cache.get("a") == "loaded"
+        assert not cache.finish_load("b", None, cache.start_load("b"))
+        assert cache._loads == {}
+
+    def test_load_01(self):
+        cache = LRUCache(max_bytes=100, sizeof=len)
+        # the key is changed while its old value is loaded
+        for change in (lambda: cache.put("a", "new"),
+                       lambda: cache.discard("a"),
+                       lambda: cache.invalidate(lambda key: key == "a")):
+            cache.put("a", "new")
+            generation = cache.start_load("a")
+            change()
+
+            assert not cache.finish_load("a", "old", generation)
+            assert cache.get("a") != "old"
+        assert cache._loads == {}
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+import catalog
+from catalog import BookCatalog
+
+
+class FakeDatabase:
+
+    def __init__(self, count):
+        self.books = [(i, f"Title {i}", f"Author {i}") for i in range(1, count + 1)]
+        self.queries = 0
+
+    async def search_book(self, rows_count, after_id=0):
+        self.queries += 1
+        return [b for b in self.books if b[0] > after_id][:rows_count]
+
+    async def book_catalog_version(self):
+        self.queries += 1
+        return (len(self.books), self.books[-1][0] if self.books else None)
+
+
+def build_menu(book_rows, page_num):
+    return (page_num, [row[0] for row in book_rows])
+
+
+class TestBookCatalog:
+
+    def test_load_00(self, monkeypatch):
+        monkeypatch.setattr("catalog.LOAD_CHUNK", 3)
+        db = FakeDatabase(7)
+        books = BookCatalog(3, build_menu)
+
+        asyncio.run(books.load(db))
+
+        assert len(books) == 7
+        assert books.pages_count == 3
+        assert db.queries == 3
+
+    def test_load_01(self, monkeypatch):
+        monkeypatch.setattr("catalog.LOAD_CHUNK", 3)
+        db = FakeDatabase(7)
+        books = BookCatalog(3, build_menu)
+        asyncio.run(books.load(db))
+        first_menu = books.menu(1)
+
+        async def failing_search(rows_count, after_id=0):
+            # `handle_mysql_errors` returns `None` on errors
+            return None if after_id >= 3 else db.books[after_id:after_id + rows_count]
+        db.search_book = failing_search
+        db.books.append((8, "New", "Book"))
+        asyncio.run(books.load(db))
+
+        assert len(books) == 7
+        assert books.menu(1) is first_menu
+
+    def test_menu_00(self):
+        db = FakeDatabase(7)
+        books = BookCatalog(3, build_menu)
+        asyncio.run(books.load(db))
+
+        assert books.menu(1) == (1, [1, 2, 3, 4])
+        assert books.menu(3) == (3, [7])
+        assert books.menu(1) is books.menu(1)
+        assert books.menu(4) == (4, [])
+
+    def test_refresh_00(self):
+        db = FakeDatabase(3)
+        books = BookCatalog(3, build_menu)
+        asyncio.run(books.load(db))
+        first_menu = books.menu(1)
+
+        asyncio.run(books.refresh(db))
+        assert books.menu(1) is first_menu
+
+        db.books.append((4, "New", "Book"))
+        asyncio.run(books.refresh(db))
+        assert books.menu(1) == (1, [1, 2, 3, 4])
@@ -0,0 +1,79 @@
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from chatorder import ChatOrderedUpdateProcessor
+
+
+def make_update(chat_id, num):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id), num=num)
+
+
+class Recorder:
+
+    def __init__(self):
+        self.started = []
+        self.finished = []
+        self.events = []        # ("start" or "finish", chat_id, num) in order of events
+        self.running = 0
+        self.max_running = 0
+
+    async def handle(self, update, delay):
+        self.started.append((update.effective_chat.id, update.num))
+        self.events.append(("start", update.effective_chat.id, update.num))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(delay)
+        self.running -= 1
+        self.finished.append((update.effective_chat.id, update.num, time.perf_counter()))
+        self.events.append(("finish", update.effective_chat.id, update.num))
+
+
+async def process_all(processor, recorder, updates):
+    # tasks are created in order of arrival as in `Application`
+    tasks = [asyncio.create_task(processor.process_update(update, recorder.handle(update, delay)))
+             for update, delay in updates]
+    await asyncio.gather(*tasks)
+
+
+class TestChatOrderedUpdateProcessor:
+
+    def test_order_00(self):
+        random.seed(5)
+        processor = ChatOrderedUpdateProcessor(4)
+        recorder = Recorder()
+        # interleaved updates of 6 chats with random handling time
+        updates = [(make_update(chat_id, num), random.uniform(0, 0.01))
+                   for num in range(10) for chat_id in random.sample(range(6), 6)]
+
+        asyncio.run(process_all(processor, recorder, updates))
+
+        for chat_id in range(6):
+            started = [num for chat, num in recorder.started if chat == chat_id]
+            finished = [num for chat, num, _ in recorder.finished if chat == chat_id]
+            assert started == finished == list(range(10))
+        assert 1 < recorder.max_running <= 4
+        assert processor.stats()['active_chats'] == 0
+
+    def test_order_01(self):
+        processor = ChatOrderedUpdateProcessor(2)
+        recorder = Recorder()
+        updates = [(make_update(1, num), 0.05) for num in range(5)]
+        updates.append((make_update(2, 0), 0))
+
+        asyncio.run(process_all(processor, recorder, updates))
+
+        # the busy chat takes only one slot, the other chat isn't blocked by it
+        events = recorder.events
+        assert events.index(("finish", 2, 0)) < events.index(("start", 1, 1))
+        assert recorder.max_running == 2
+
+    def test_no_chat_00(self):
+        processor = ChatOrderedUpdateProcessor(2)
+        recorder = Recorder()
+        update = SimpleNamespace(effective_chat=None, num=0)
+
+        asyncio.run(processor.process_update(update, asyncio.sleep(0)))
+
+        assert processor.stats()['active_chats'] == 0
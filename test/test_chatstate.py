@@ -0,0 +1,50 @@
+import pickle
+import time
+
+from chatstate import STATE_KEY, ChatState, chat_state, idle_chats
+
+
+class TestChatState:
+
+    def test_chat_state_00(self):
+        state = ChatState(7)
+        state.last_used = 0
+        chat_data = {STATE_KEY: state}
+
+        assert chat_state(chat_data) is state
+        assert state.last_used > 0
+        assert chat_state({}) is None
+        # data which is not a `ChatState`
+        assert chat_state({STATE_KEY: {"author": "A"}}) is None
+
+    def test_page_00(self):
+        state = ChatState(7)
+        state.select_page(12, 30)
+        assert (state.book_id, state.page, state.sentences) == (7, 12, 30)
+        state.reset_page()
+        assert (state.page, state.sentences) == (None, 0)
+
+    def test_pickle_00(self):
+        state = ChatState(7)
+        state.select_page(12, 30)
+
+        restored = pickle.loads(pickle.dumps({STATE_KEY: state}))[STATE_KEY]
+
+        assert (restored.book_id, restored.page, restored.sentences, restored.last_used) \
+               == (7, 12, 30, state.last_used)
+        assert not hasattr(restored, '__dict__')
+
+    def test_idle_chats_00(self):
+        now = time.time()
+        chat_data = {}
+        for chat_id, idle_time in enumerate((10, 100, 1000)):
+            state = ChatState(1)
+            state.last_used = now - idle_time
+            chat_data[chat_id] = {STATE_KEY: state}
+        chat_data[3] = {}
+        # data which is not a `ChatState` is never dropped
+        chat_data[4] = {STATE_KEY: {"author": "A", "title": "T"}}
+        chat_data[5] = {"other": 1}
+
+        assert idle_chats(chat_data, ttl=60, now=now) == [1, 2, 3]
+        assert idle_chats(chat_data, ttl=5000, now=now) == [3]
@@ -0,0 +1,363 @@
+import asyncio
+import datetime
+import threading
+import time
+
+import pytest
+
+import database
+from bookparse import Book
+from database import AsyncDatabase, ConnectionPool, Database, PoolError, QueryCounter
+
+
+class FakeCursor:
+
+    def __init__(self, connection):
+        self._connection = connection
+        self.rowcount = connection.rowcount
+        self.lastrowid = connection.lastrowid
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, statement, params=None):
+        self._connection.statements.append(" ".join(statement.split()))
+        self._connection.params.append(params)
+
+    def executemany(self, statement, seq_params):
+        self.execute(statement, list(seq_params))
+
+    def fetchone(self):
+        return self._connection.results.pop(0)
+
+    def fetchall(self):
+        return self._connection.results.pop(0)
+
+
+class FakeConnection:
+
+    def __init__(self, **config):
+        self.connected = True
+        self.reconnects = 0
+        self.statements = []
+        self.params = []
+        self.results = []
+        self.rowcount = 1
+        self.lastrowid = None
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def start_transaction(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def is_connected(self):
+        return self.connected
+
+    def reconnect(self):
+        self.reconnects += 1
+        self.connected = True
+
+    def close(self):
+        self.connected = False
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fake_connect(monkeypatch):
+    monkeypatch.setattr("mysql.connector.connect", FakeConnection)
+
+
+class TestConnectionPool:
+
+    def test_get_00(self):
+        pool = ConnectionPool({}, size=2)
+
+        first = pool.get()
+        second = pool.get()
+
+        assert first is not second
+        assert pool.stats()['in_use'] == 2
+        pool.put(first)
+        assert pool.get() is first
+        assert pool.stats()['checkouts'] == 3
+
+    def test_get_01(self):
+        pool = ConnectionPool({}, size=1, timeout=0.01)
+
+        pool.get()
+
+        with pytest.raises(PoolError):
+            pool.get()
+        assert pool.stats()['waits'] == 1
+
+    def test_get_02(self):
+        pool = ConnectionPool({}, size=1, ping_interval=0)
+        cnx = pool.get()
+        cnx.connected = False
+        pool.put(cnx)
+
+        assert pool.get() is cnx
+        assert cnx.reconnects == 1
+
+
+class TestDatabasePool:
+
+    def test_checkout_00(self):
+        db = Database({}, pool_size=2)
+        seen = []
+
+        @database.handle_mysql_errors
+        def inner(db_obj):
+            return db_obj._connection
+
+        @database.handle_mysql_errors
+        def outer(db_obj):
+            seen.append(db_obj._connection)
+            seen.append(inner(db_obj))
+
+        outer(db)
+
+        assert seen[0] is not None and seen[0] is seen[1]
+        assert db._connection is None
+        assert db.pool_stats()['in_use'] == 0
+
+    def test_checkout_01(self):
+        db = Database({}, pool_size=2)
+        barrier = threading.Barrier(2)
+        seen = []
+
+        @database.handle_mysql_errors
+        def query(db_obj):
+            seen.append(db_obj._connection)
+            barrier.wait(timeout=1)
+
+        threads = [threading.Thread(target=query, args=(db,)) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(set(map(id, seen))) == 2
+
+    def test_checkout_02(self):
+        db = Database({}, pool_size=1, pool_timeout=datetime.timedelta(milliseconds=10))
+
+        @database.handle_mysql_errors
+        def query(db_obj):
+            return "result"
+
+        db._pool.get()
+
+        # the query doesn't wait forever for a connection held by someone else
+        assert query(db) is None
+        assert db.pool_stats()['waits'] == 1
+
+
+class SlowDatabase(Database):
+
+    @database.handle_mysql_errors
+    def slow_query(self, value):
+        time.sleep(0.1)
+        return value
+
+
+class TestAsyncDatabase:
+
+    def test_methods_00(self):
+        db = AsyncDatabase(SlowDatabase({}, pool_size=4))
+
+        async def queries():
+            return await asyncio.gather(*[db.slow_query(i) for i in range(4)])
+
+        start = time.perf_counter()
+        results = asyncio.run(queries())
+        elapsed = time.perf_counter() - start
+        db.shutdown()
+
+        assert results == [0, 1, 2, 3]
+        # queries are executed at the same time
+        assert elapsed < 0.3
+
+
+class TestDatabaseCaches:
+
+    def test_chat_book_00(self):
+        db = Database({}, chat_cache_size=10)
+        db._connection.results = [(7, "ff0000")]
+
+        with QueryCounter() as queries:
+            assert db.chat_book(1) == 7
+            assert db.chat_book(1) == 7
+            assert db.check_user_exist(1)
+
+        assert queries.count == 1
+        db.update_chat_book(1, 8)
+        assert db.chat_book(1) == 8
+        assert db.chat_color(1) == "ff0000"
+        db.update_chat_color(1, "00ff00")
+        assert db.chat_color(1) == "00ff00"
+        assert db.chat_book(1) == 8
+        assert len(db._connection.statements) == 3
+
+    def test_chat_book_01(self, monkeypatch):
+        db = Database({}, chat_cache_size=10)
+        select_chat = db._select_chat
+
+        def select_during_update(chat_id):
+            row = select_chat(chat_id)
+            db.update_chat_book(chat_id, 8)
+            return row
+
+        monkeypatch.setattr(db, '_select_chat', select_during_update)
+        db._connection.results = [(7, None), (8, None)]
+
+        assert db.chat_book(1) == 7
+        monkeypatch.undo()
+        # the row selected before the update is not cached
+        assert db.chat_book(1) == 8
+
+    def test_update_chat_color_00(self):
+        db = Database({}, chat_cache_size=10)
+        db._connection.rowcount = 0
+        # the first chat has this color already, the second one is not recorded
+        db._connection.results = [(1,), None]
+
+        assert db.update_chat_color(1, "ff0000") is True
+        assert db.update_chat_color(2, "ff0000") is False
+        assert len(db._connection.statements) == 4
+
+    def test_search_max_page_00(self):
+        db = Database({}, chat_cache_size=10)
+        db._connection.results = [(3, None), ("Title", "Author", "Info", 120)]
+
+        with QueryCounter() as queries:
+            assert db.search_max_page(1) == 120
+            assert db.book_metadata(3) == ("Title", "Author", "Info")
+            assert db.search_max_page(1) == 120
+
+        assert queries.count == 2
+
+    def test_book_page_00(self):
+        db = Database({}, page_cache_bytes=10_000)
+        db._connection.results = [("Text.", "0 5"), None]
+
+        assert db.book_page(1, 1) == ("Text.", "0 5")
+        assert db.book_page(1, 1) == ("Text.", "0 5")
+        assert db.book_page(1, 2) is None
+        assert db.cache_stats()['pages']['hits'] == 1
+
+    def test_book_sentences_00(self):
+        db = Database({}, page_cache_bytes=10_000)
+        db._connection.results = [("One. Two.", "0 4 5 9"), None]
+
+        with QueryCounter() as queries:
+            assert db.book_sentences(1, 1) == ["One.", "Two."]
+            assert db.book_sentences(1, 1) == ["One.", "Two."]
+            assert db.book_sentences(1, 2) is None
+
+        assert queries.count == 2
+
+    def test_insert_book_00(self, monkeypatch):
+        monkeypatch.setattr("database.sentence_spans", lambda text: [(0, len(text))])
+        db = Database({}, page_cache_bytes=10_000)
+        db._page_cache.put((4, 1), ("Old page", ""))
+        book = Book(author="Author", title="Title")
+        book.pages = ["page 1", "page 2", "page 3"]
+        db._connection.lastrowid = 4
+        db._connection.results = [("sentences", "text")]
+
+        assert db.insert_book(book, batch_size=2) == 4
+        assert (4, 1) not in db._page_cache
+        # INSERT book, SHOW COLUMNS, 2 INSERT page
+        assert len(db._connection.statements) == 4
+        assert db._connection.params[0] == ("Title", "Author", "NULL")
+        assert db._connection.params[2] == [4, 1, "page 1", "0 6", 4, 2, "page 2", "0 6"]
+        assert db._connection.params[3] == [4, 3, "page 3", "0 6"]
+
+    def test_insert_book_01(self, monkeypatch):
+        monkeypatch.setattr("database.sentence_spans", lambda text: [(0, len(text))])
+        db = Database({})
+        book = Book(author="Author", title="Title")
+        # 2 bytes per cyrillic character
+        book.pages = ["страница", "п" * 40, "стр", "стр"]
+        db._connection.lastrowid = 1
+        db._connection.results = [("sentences", "text")]
+
+        db.insert_book(book, batch_size=10, batch_bytes=30)
+
+        assert [len(params) // 4 for params in db._connection.params[2:]] == [1, 1, 2]
+
+    def test_insert_book_02(self):
+        db = Database({})
+        book = Book(author="Author", title="Title")
+        book.pages = ["page 1", "page 2"]
+        db._connection.lastrowid = 2
+        # database without `page.sentences`
+        db._connection.results = [None]
+
+        assert db.insert_book(book) == 2
+        assert db._connection.statements[-1] == \
+            "INSERT INTO page (book_id, num, content) VALUES (%s, %s, %s), (%s, %s, %s)"
+        assert db._connection.params[-1] == [2, 1, "page 1", 2, 2, "page 2"]
+        # the column is checked once
+        assert db.insert_book(book) == 2
+        assert len(db._connection.statements) == 5
+
+    def test_check_for_admin_00(self):
+        db = Database({}, role_cache_size=10)
+        yesterday = datetime.date.today() - datetime.timedelta(days=1)
+        db._connection.results = [[("admin", None), ("user", None)],
+                                  [("admin", yesterday)]]
+
+        with QueryCounter() as queries:
+            assert db.check_for_admin(1)
+            assert db.check_for_admin(1)
+            assert db.has_role(1, 'user')
+            assert not db.has_role(1, 'banned')
+            # expired role is not deleted by `role_expiration` event yet
+            assert not db.check_for_admin(2)
+            assert not db.check_for_admin(2)
+
+        assert queries.count == 2
+
+    def test_check_for_admin_01(self):
+        db = Database({}, role_cache_size=10)
+        db._connection.results = [[("user", None)], [("user", None), ("banned", None)]]
+
+        assert not db.has_role(1, 'banned')
+        assert db.ban_users([1, 2])
+        assert db.has_role(1, 'banned')
+
+    def test_check_for_admin_02(self):
+        db = Database({}, role_cache_size=10, role_cache_ttl=datetime.timedelta(0))
+        db._connection.results = [[], [("admin", None)]]
+
+        assert not db.check_for_admin(1)
+        # changed by another process
+        assert db.check_for_admin(1)
+
+    def test_check_for_admin_03(self, monkeypatch):
+        db = Database({}, role_cache_size=10)
+        select_roles = db._select_roles
+
+        def select_during_ban(chat_id):
+            roles = select_roles(chat_id)
+            db.ban_users([chat_id])
+            return roles
+
+        monkeypatch.setattr(db, '_select_roles', select_during_ban)
+        db._connection.results = [[("user", None)], [("user", None), ("banned", None)]]
+
+        assert not db.has_role(1, 'banned')
+        monkeypatch.undo()
+        # roles selected before the ban are not cached
+        assert db.has_role(1, 'banned')
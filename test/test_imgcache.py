@@ -0,0 +1,54 @@
+import os
+
+from imgcache import QuoteImageCache
+
+
+class TestQuoteImageCache:
+
+    def test_key_00(self):
+        key = QuoteImageCache.key("Author", "Title", "Quote", (1, 2, 3))
+
+        assert key == QuoteImageCache.key("Author", "Title", "Quote", (1, 2, 3))
+        assert key != QuoteImageCache.key("Author", "Title", "Quote", "red")
+        assert key != QuoteImageCache.key("Author", "TitleQuote", "", (1, 2, 3))
+        assert key != QuoteImageCache.key("Author", "Title", "Quote", (1, 2, 3), "jpeg")
+
+    def test_image_00(self, tmp_path):
+        cache = QuoteImageCache(tmp_path, max_bytes=1000)
+
+        assert cache.image("a") is None
+        cache.put_image("a", b"png data")
+        cache.put_file_id("a", "file-a")
+
+        assert cache.image("a") == b"png data"
+        assert cache.file_id("a") == "file-a"
+        assert cache.size == len(b"png data") + len(b"file-a")
+        cache.forget_file_id("a")
+        assert cache.file_id("a") is None
+        assert cache.size == len(b"png data")
+
+    def test_evict_00(self, tmp_path):
+        cache = QuoteImageCache(tmp_path, max_bytes=250)
+        for key in "abc":
+            cache.put_image(key, b"x" * 100)
+        
+        assert cache.image("a") is None
+        assert cache.image("b") is not None
+        cache.put_image("d", b"x" * 100)
+
+        # "b" was used after "c"
+        assert cache.image("c") is None
+        assert cache.image("b") is not None
+        assert cache.size == 200
+        assert sorted(os.listdir(tmp_path)) == ["b.img", "d.img"]
+
+    def test_load_00(self, tmp_path):
+        cache = QuoteImageCache(tmp_path, max_bytes=1000)
+        cache.put_image("a", b"png data")
+        cache.put_file_id("a", "file-a")
+
+        cache = QuoteImageCache(tmp_path, max_bytes=1000)
+
+        assert cache.file_id("a") == "file-a"
+        assert cache.image("a") == b"png data"
+        assert cache.size == len(b"png data") + len(b"file-a")
@@ -0,0 +1,82 @@
+import io
+
+import pytest
+from PIL import Image, ImageChops, ImageDraw
+
+import imgen
+from imgen import ENCODER_MODES, ImageEncoder, QuoteImage, hex_to_rgb
+
+
+@pytest.fixture
+def generator(quote_image_kwargs):
+    return QuoteImage(**quote_image_kwargs)
+
+
+class TestQuoteImage:
+
+    def test_make_00(self, generator):
+        quote = "Все счастливые семьи похожи друг на друга. " * 5
+        image = generator.make("Лев Толстой", "Анна Каренина", quote)
+
+        expected = Image.new('RGB', image.size, 'white')
+        drawing = ImageDraw.Draw(expected)
+        generator._draw_author("Лев Толстой", drawing)
+        generator._draw_title("Анна Каренина", drawing)
+        generator._draw_wrapped_quote(quote, drawing)
+        generator._draw_borders(drawing)
+        generator._paste_logo(expected)
+
+        assert ImageChops.difference(image, expected).getbbox() is None
+
+    def test_make_01(self, generator):
+        first = generator.make("Author", "Title", "First quote")
+        generator.make("Author", "Title", "Second quote")
+
+        # the template is not changed by drawing
+        assert generator._template.getpixel((640, 360)) == (255, 255, 255)
+        assert first.getpixel((0, 0)) == (143, 143, 143)
+
+    def test_for_theme_00(self, generator, monkeypatch):
+        monkeypatch.setattr(imgen, "THEME_CACHE_SIZE", 2)
+        red = generator.for_theme((255, 0, 0))
+
+        assert generator.for_theme((143, 143, 143)) is generator
+        assert generator.for_theme((255, 0, 0)) is red
+        assert red._quote_font is generator._quote_font
+        assert red._quote_layout is generator._quote_layout
+        assert red.make("", "", "").getpixel((0, 0)) == (255, 0, 0)
+        assert generator.make("", "", "").getpixel((0, 0)) == (143, 143, 143)
+        generator.for_theme((0, 255, 0))
+        generator.for_theme((0, 0, 255))
+        assert generator.for_theme((255, 0, 0)) is not red
+
+    def test_hex_to_rgb_00(self):
+        assert hex_to_rgb("3d85c6") == (0x3d, 0x85, 0xc6)
+        assert hex_to_rgb("3D85C6") == (0x3d, 0x85, 0xc6)
+        assert hex_to_rgb("3d85c") is None
+        assert hex_to_rgb("zz85c6") is None
+        assert hex_to_rgb("-85c61") is None
+
+
+class TestImageEncoder:
+
+    image = Image.new('RGB', (1280, 720), 'white')
+
+    @pytest.mark.parametrize("mode", ENCODER_MODES)
+    def test_encode_00(self, mode):
+        data = ImageEncoder(mode).encode(self.image)
+
+        decoded = Image.open(io.BytesIO(data))
+        assert decoded.size == (1280, 720)
+        assert decoded.convert('RGB').getpixel((10, 10)) == (255, 255, 255)
+
+    def test_encode_01(self):
+        data = ImageEncoder('jpeg', scale=0.5).encode(self.image)
+
+        decoded = Image.open(io.BytesIO(data))
+        assert decoded.format == 'JPEG'
+        assert decoded.size == (640, 360)
+
+    def test_init_00(self):
+        with pytest.raises(ValueError):
+            ImageEncoder('gif')
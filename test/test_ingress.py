@@ -0,0 +1,48 @@
+import pytest
+
+import ingress
+
+
+class FakeApplication:
+
+    def __init__(self):
+        self.calls = []
+
+    def run_polling(self, **kwargs):
+        self.calls.append(("polling", kwargs))
+
+    def run_webhook(self, **kwargs):
+        self.calls.append(("webhook", kwargs))
+
+
+class TestRunApplication:
+
+    def test_polling_00(self, monkeypatch):
+        monkeypatch.setattr(ingress, "UPDATE_MODE", "polling")
+        application = FakeApplication()
+
+        ingress.run_application(application, url_path="bot", port=8443)
+
+        assert application.calls == [("polling", {})]
+
+    def test_webhook_00(self, monkeypatch):
+        monkeypatch.setattr(ingress, "UPDATE_MODE", "webhook")
+        monkeypatch.setattr(ingress, "WEBHOOK_URL", "https://example.com/")
+        monkeypatch.setattr(ingress, "WEBHOOK_SECRET", "secret")
+        application = FakeApplication()
+
+        ingress.run_application(application, url_path="adminbot", port=8444)
+
+        mode, kwargs = application.calls[0]
+        assert mode == "webhook"
+        assert kwargs["webhook_url"] == "https://example.com/adminbot"
+        assert kwargs["url_path"] == "adminbot" and kwargs["port"] == 8444
+        assert kwargs["secret_token"] == "secret"
+
+    def test_webhook_01(self, monkeypatch):
+        monkeypatch.setattr(ingress, "UPDATE_MODE", "webhook")
+        monkeypatch.setattr(ingress, "WEBHOOK_URL", "https://example.com")
+        monkeypatch.setattr(ingress, "WEBHOOK_SECRET", None)
+
+        with pytest.raises(ValueError):
+            ingress.run_application(FakeApplication(), url_path="bot", port=8443)
@@ -0,0 +1,93 @@
+import asyncio
+
+from persistence import SqlitePersistence
+
+
+async def save(path, chats=(), dropped=(), conversations=()):
+    persistence = SqlitePersistence(str(path))
+    for chat_id, data in chats:
+        await persistence.update_chat_data(chat_id, data)
+    for chat_id in dropped:
+        await persistence.drop_chat_data(chat_id)
+    for name, key, state in conversations:
+        await persistence.update_conversation(name, key, state)
+    await persistence.flush()
+    return persistence
+
+
+async def load(path, *names):
+    persistence = SqlitePersistence(str(path))
+    chat_data = await persistence.get_chat_data()
+    conversations = [await persistence.get_conversations(name) for name in names]
+    await persistence.flush()
+    return chat_data, conversations
+
+
+class TestSqlitePersistence:
+
+    def test_chat_data_00(self, tmp_path):
+        path = tmp_path / "state.sqlite3"
+        chats = [(1, {1: {"author": "A", "title": "T", "page": 5}}),
+                 (-100, {-100: {"author": "B", "title": "Q"}}),
+                 (2, {})]
+
+        asyncio.run(save(path, chats))
+        chat_data, _ = asyncio.run(load(path))
+
+        assert chat_data == dict(chats)
+
+    def test_chat_data_01(self, tmp_path):
+        path = tmp_path / "state.sqlite3"
+        asyncio.run(save(path, [(1, {"page": 1}), (2, {"page": 2})]))
+        # changes before a write replace each other
+        asyncio.run(save(path, [(1, {"page": 3}), (1, {"page": 4})], dropped=[2]))
+
+        chat_data, _ = asyncio.run(load(path))
+
+        assert chat_data == {1: {"page": 4}}
+
+    def test_conversations_00(self, tmp_path):
+        path = tmp_path / "state.sqlite3"
+        asyncio.run(save(path, conversations=[("divination", (1, 1), "browse"),
+                                              ("divination", (2, 2), "browse"),
+                                              ("select_book", (1, 1), "browse")]))
+        asyncio.run(save(path, conversations=[("divination", (2, 2), None)]))
+
+        _, (divination, select_book, other) = asyncio.run(
+            load(path, "divination", "select_book", "other"))
+
+        assert divination == {(1, 1): "browse"}
+        assert select_book == {(1, 1): "browse"}
+        assert other == {}
+
+    def test_write_behind_00(self, tmp_path):
+        async def update():
+            persistence = SqlitePersistence(str(tmp_path / "state.sqlite3"))
+            # calls of one run of `Application` are written by one transaction
+            for chat_id in range(100):
+                await persistence.update_chat_data(chat_id, {"page": chat_id})
+            waiting = persistence.stats()['waiting']
+            await persistence._writer
+            stats = persistence.stats()
+            await persistence.flush()
+            return waiting, stats
+
+        waiting, stats = asyncio.run(update())
+
+        assert waiting == 100
+        assert stats == {'waiting': 0, 'writes': 1, 'written': 100}
+
+    def test_gc_00(self, tmp_path, monkeypatch):
+        disabled = []
+        monkeypatch.setattr("gc.disable", lambda: disabled.append(True))
+
+        async def load_twice():
+            persistence = SqlitePersistence(str(tmp_path / "state.sqlite3"))
+            await persistence.get_chat_data()
+            await persistence.get_chat_data()
+            await persistence.flush()
+
+        asyncio.run(load_twice())
+
+        # only the load at startup pauses the garbage collector
+        assert disabled == [True]
@@ -0,0 +1,54 @@
+import asyncio
+import io
+
+from PIL import Image
+
+from renderpool import RenderPool
+
+
+async def render_many(pool: RenderPool, count: int) -> list[bytes]:
+    await pool.start()
+    return await asyncio.gather(*(pool.render("Author", "Title", f"Quote {i}")
+                                  for i in range(count)))
+
+
+class TestRenderPool:
+
+    def test_render_00(self, quote_image_kwargs):
+        pool = RenderPool(0, max_pending=2, **quote_image_kwargs)
+        try:
+            images = asyncio.run(render_many(pool, 5))
+        finally:
+            pool.shutdown()
+
+        assert len(set(images)) == 5
+        assert Image.open(io.BytesIO(images[0])).size == (1280, 720)
+        # 3 calls waited for the first two
+        assert pool.waits == 3
+        assert pool.rendered == 5 and pool.pending == 0
+
+    def test_render_01(self, quote_image_kwargs):
+        pool = RenderPool(2, max_pending=4, color_theme="red", **quote_image_kwargs)
+        try:
+            images = asyncio.run(render_many(pool, 4))
+        finally:
+            pool.shutdown()
+
+        assert pool.theme == "red"
+        image = Image.open(io.BytesIO(images[3])).convert('RGB')
+        assert image.getpixel((0, 0)) == (255, 0, 0)
+
+    def test_render_many_00(self, quote_image_kwargs):
+        pool = RenderPool(0, max_pending=4, **quote_image_kwargs)
+        items = [("Author", "Title", f"Quote {i}", (255, 0, 0) if i % 2 else None)
+                 for i in range(10)]
+        try:
+            results = list(pool.render_many(items, chunk_size=3))
+        finally:
+            pool.shutdown()
+
+        assert [item for item, _ in results] == items
+        colors = [Image.open(io.BytesIO(image)).convert('RGB').getpixel((0, 0))
+                  for _, image in results]
+        assert colors[:2] == [(143, 143, 143), (255, 0, 0)]
+        assert pool.rendered == 10
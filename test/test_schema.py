@@ -0,0 +1,48 @@
+import re
+from pathlib import Path
+
+import pytest
+
+from schema import TABLES_CREATION
+
+SQL_PATH = Path(__file__).parent.parent / "database.sql"
+# statements which must be the same in `database.sql` and `schema.py`
+STATEMENT = re.compile(r'^(CREATE TABLE|CREATE TRIGGER|CREATE OR REPLACE VIEW)\b')
+NAME = re.compile(r'^CREATE (?:TABLE IF NOT EXISTS|TRIGGER|OR REPLACE VIEW) `?(\w+)')
+
+
+def normalize(statement: str) -> str:
+    return " ".join(statement.split()).rstrip(";")
+
+def schema_statements() -> dict:
+    """name -> statement from `TABLES_CREATION`"""
+    statements = {}
+    for statement in TABLES_CREATION.values():
+        statement = normalize(statement)
+        if STATEMENT.match(statement):
+            statements[NAME.match(statement)[1]] = statement
+    return statements
+
+def sql_statements() -> dict:
+    """name -> statement from `database.sql`"""
+    text = "\n".join(line for line in SQL_PATH.read_text(encoding='utf-8').splitlines()
+                     if not line.lstrip().startswith("--"))
+    # triggers are written between `DELIMITER \\` and `\\`
+    head, _, tail = text.partition("DELIMITER \\\\")
+    *triggers, rest = tail.split("\\\\")
+    statements = {}
+    for statement in re.split(r';\s*\n', head) + triggers + re.split(r';\s*\n', rest):
+        statement = normalize(statement)
+        if STATEMENT.match(statement):
+            statements[NAME.match(statement)[1]] = statement
+    return statements
+
+
+class TestSchema:
+
+    def test_names_00(self):
+        assert sorted(sql_statements()) == sorted(schema_statements())
+
+    @pytest.mark.parametrize("name", sorted(schema_statements()))
+    def test_statements_00(self, name):
+        assert sql_statements()[name] == schema_statements()[name]
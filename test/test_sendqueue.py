@@ -0,0 +1,205 @@
+import asyncio
+import time
+
+import pytest
+from telegram.error import BadRequest, RetryAfter
+
+from sendqueue import SendQueue, TokenBucket
+
+
+class FakeBot:
+
+    def __init__(self, flood=0, error=None):
+        self.sent = []          # (chat_id, text, time)
+        self.flood = flood      # number of "429" responses before the first success
+        self.error = error
+        self.calls = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        if self.flood:
+            self.flood -= 1
+            raise RetryAfter(0.05)
+        self.sent.append((chat_id, text, time.perf_counter()))
+        return text
+
+
+async def send_all(queue, bot, messages, timeout=10):
+    queue.start(bot)
+    futures = [queue.send_message(chat_id, text) for chat_id, text in messages]
+    await queue.stop(timeout)
+    return futures
+
+
+class TestTokenBucket:
+
+    def test_bucket_00(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        assert bucket.delay() == 0
+        bucket.take()
+        bucket.take()
+        assert 0.05 < bucket.delay() <= 0.1
+        assert 0.15 < bucket.time_to_full() <= 0.2
+
+    def test_bucket_01(self):
+        bucket = TokenBucket(rate=100, capacity=5)
+        bucket.pause(0.2)
+        assert 0.15 < bucket.delay() <= 0.2
+
+    def test_acquire_00(self):
+        async def acquire_all():
+            bucket = TokenBucket(rate=50, capacity=1)
+            start = time.perf_counter()
+            for _ in range(6):
+                await bucket.acquire()
+            return time.perf_counter() - start
+
+        # the first token is in the bucket, others come every 20 ms
+        assert 0.09 < asyncio.run(acquire_all()) < 0.3
+
+
+class TestSendQueue:
+
+    def test_order_00(self):
+        bot = FakeBot()
+        queue = SendQueue(global_rate=1000, chat_rate=1000, burst=1)
+        messages = [(chat_id, f"{chat_id}:{num}") for num in range(5) for chat_id in (1, 2, 3)]
+
+        asyncio.run(send_all(queue, bot, messages))
+
+        for chat_id in (1, 2, 3):
+            assert [text for chat, text, _ in bot.sent if chat == chat_id] == \
+                   [f"{chat_id}:{num}" for num in range(5)]
+        stats = queue.stats()
+        assert stats['pending'] == stats['chats'] == 0
+        assert stats['sent'] == 15
+        assert stats['avg_latency'] is not None
+
+    def test_chat_rate_00(self):
+        bot = FakeBot()
+        queue = SendQueue(global_rate=1000, chat_rate=20, burst=2)
+
+        asyncio.run(send_all(queue, bot, [(1, str(num)) for num in range(6)]))
+
+        times = [t for _, _, t in bot.sent]
+        # 2 messages at once, then one every 50 ms
+        assert times[1] - times[0] < 0.03
+        assert times[-1] - times[0] >= 0.19
+
+    def test_group_rate_00(self):
+        bot = FakeBot()
+        queue = SendQueue(global_rate=1000, chat_rate=1000, group_rate=20, burst=1)
+
+        asyncio.run(send_all(queue, bot, [(-100, "a"), (-100, "b"), (5, "c"), (5, "d")]))
+
+        times = {text: t for _, text, t in bot.sent}
+        assert times['b'] - times['a'] >= 0.04
+        assert times['d'] - times['c'] < 0.03
+
+    def test_global_rate_00(self):
+        bot = FakeBot()
+        queue = SendQueue(global_rate=50, chat_rate=1000, burst=1)
+
+        asyncio.run(send_all(queue, bot, [(chat_id, "x") for chat_id in range(100)]))
+
+        times = sorted(t for _, _, t in bot.sent)
+        # 50 messages at once, then 50 per second
+        assert times[-1] - times[0] >= 0.9
+
+    def test_retry_00(self):
+        bot = FakeBot(flood=2)
+        queue = SendQueue(global_rate=1000, chat_rate=1000)
+
+        futures = asyncio.run(send_all(queue, bot, [(1, "a"), (1, "b")]))
+
+        assert [text for _, text, _ in bot.sent] == ["a", "b"]
+        assert [future.result() for future in futures] == ["a", "b"]
+        assert queue.stats()['retries'] == 2
+
+    def test_retry_01(self):
+        bot = FakeBot(flood=10)
+        queue = SendQueue(global_rate=1000, chat_rate=1000, max_retries=1)
+
+        futures = asyncio.run(send_all(queue, bot, [(1, "a")]))
+
+        assert bot.calls == 2
+        assert isinstance(futures[0].exception(), RetryAfter)
+        assert queue.stats()['failed'] == 1
+
+    def test_retry_02(self):
+        bot = FakeBot(flood=1)
+        queue = SendQueue(global_rate=1000, chat_rate=1000)
+        start = time.perf_counter()
+
+        asyncio.run(send_all(queue, bot, [(1, "a"), (2, "b")]))
+
+        # "429" in chat 1 pauses chat 2 too
+        times = {text: t for _, text, t in bot.sent}
+        assert times['b'] - start >= 0.04
+
+    def test_cap_00(self):
+        async def send(queue, bot):
+            queue.start(bot)
+            futures = [queue.enqueue(1, lambda bot, text=text: bot.send_message(1, text), key=key)
+                       for text, key in (("0", None), ("menu a", "a"), ("menu b", "b"),
+                                         ("1", None), ("2", None), ("3", None))]
+            await queue.stop()
+            return futures
+
+        bot = FakeBot()
+        queue = SendQueue(global_rate=1000, chat_rate=1000, max_chat_pending=2)
+
+        futures = asyncio.run(send(queue, bot))
+
+        # the oldest waiting messages with key are dropped, others are kept
+        assert [text for _, text, _ in bot.sent] == ["0", "1", "2", "3"]
+        assert futures[1].cancelled() and futures[2].cancelled()
+        assert queue.stats()['dropped'] == 2
+        assert queue.stats()['pending'] == 0
+
+    def test_merge_00(self):
+        async def edit_menu(queue, bot):
+            queue.start(bot)
+            futures = [queue.enqueue(1, lambda bot, text=text: bot.send_message(1, text), key=key)
+                       for text, key in (("a", None), ("menu 1", "m"), ("b", None),
+                                         ("menu 2", "m"), ("menu 3", "m"))]
+            await queue.stop()
+            return futures
+
+        bot = FakeBot()
+        queue = SendQueue(global_rate=1000, chat_rate=1000)
+
+        futures = asyncio.run(edit_menu(queue, bot))
+
+        assert [text for _, text, _ in bot.sent] == ["a", "b", "menu 3"]
+        assert futures[1].cancelled() and futures[3].cancelled()
+        assert queue.stats()['merged'] == 2
+
+    def test_error_00(self):
+        bot = FakeBot(error=BadRequest("chat not found"))
+        queue = SendQueue(global_rate=1000, chat_rate=1000)
+
+        futures = asyncio.run(send_all(queue, bot, [(1, "a"), (1, "b")]))
+
+        # errors are not retried and don't stop other messages of the chat
+        assert bot.calls == 2
+        assert all(isinstance(future.exception(), BadRequest) for future in futures)
+
+    def test_stop_00(self):
+        bot = FakeBot()
+        queue = SendQueue(global_rate=1000, chat_rate=1, burst=1)
+
+        futures = asyncio.run(send_all(queue, bot, [(1, "a"), (1, "b")], timeout=0.1))
+
+        assert [text for _, text, _ in bot.sent] == ["a"]
+        assert futures[1].cancelled()
+        assert queue.stats()['pending'] == 0
+
+    def test_not_started_00(self):
+        async def send():
+            SendQueue().send_message(1, "a")
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(send())
@@ -0,0 +1,111 @@
+from pathlib import Path
+
+import pytest
+
+import sentsplit
+from sentsplit import (
+    decode_spans,
+    encode_spans,
+    sentence_spans,
+    sentences_from_index
+)
+
+class TestSentenceIndex:
+
+    text = "Медведи живут в тайге.  Они едят ягоды, грибы и орехи.\nМедведя зовут Миша."
+    sentences = ["Медведи живут в тайге.", 
+                 "Они едят ягоды, грибы и орехи.", 
+                 "Медведя зовут Миша."]
+
+    def test_sentence_spans_00(self, monkeypatch):
+        monkeypatch.setattr("sentsplit.split_sentences", lambda text: self.sentences)
+
+        spans = sentence_spans(self.text)
+
+        assert [self.text[s:e] for s, e in spans] == self.sentences
+
+    def test_encode_spans_00(self):
+        spans = [(0, 22), (24, 54), (55, 74)]
+
+        assert encode_spans(spans) == "0 22 24 54 55 74"
+        assert decode_spans(encode_spans(spans)) == spans
+        assert decode_spans(encode_spans([])) == []
+
+    def test_sentences_from_index_00(self, monkeypatch):
+        monkeypatch.setattr("sentsplit.split_sentences", lambda text: self.sentences)
+        encoded = encode_spans(sentence_spans(self.text))
+
+        assert sentences_from_index(self.text, encoded) == self.sentences
+        assert sentences_from_index(self.text, None) == self.sentences
+
+
+def read_corpus():
+    """Texts from `corpus/sentences_ru.txt` as lists of sentences"""
+    path = Path(__file__).parent / 'corpus' / 'sentences_ru.txt'
+    texts = [[]]
+    with open(path, encoding='utf-8') as corpus:
+        for line in corpus:
+            line = line.strip()
+            if line.startswith('#'):
+                continue
+            if line:
+                texts[-1].append(line)
+            elif texts[-1]:
+                texts.append([])
+    return [t for t in texts if t]
+
+def nltk_available():
+    try:
+        sentsplit._nltk_split("Тест.")
+    except LookupError:
+        return False
+    return True
+
+
+class TestBuiltinSplitter:
+
+    @pytest.fixture(autouse=True)
+    def builtin_tokenizer(self, monkeypatch):
+        monkeypatch.setattr("sentsplit.SENT_TOKENIZER", "builtin")
+
+    @pytest.mark.parametrize("sentences", read_corpus())
+    def test_corpus_00(self, sentences):
+        assert sentsplit.split_sentences(" ".join(sentences)) == sentences
+
+    @pytest.mark.parametrize("sentences", read_corpus())
+    def test_corpus_01(self, sentences):
+        # lines of the pages are wrapped with "\n"
+        text = "\n".join(sentences).replace(" ", "\n", 3)
+        spans = sentence_spans(text)
+
+        assert [text[s:e].replace("\n", " ") for s, e in spans] == \
+               [s.replace("\n", " ") for s in sentences]
+
+    def test_paragraphs_00(self):
+        text = "  Глава 1\n\nМедведи живут в тайге.\n  \nОни едят ягоды \n"
+        desired = ["Глава 1", "Медведи живут в тайге.", "Они едят ягоды"]
+
+        assert sentsplit.split_sentences(text) == desired
+
+    def test_year_00(self):
+        text = "Это было в 1812 г. Потом война кончилась. Он жил в г. Москве."
+        desired = ["Это было в 1812 г.", "Потом война кончилась.", "Он жил в г. Москве."]
+
+        assert sentsplit.split_sentences(text) == desired
+
+    def test_empty_00(self):
+        assert sentsplit.split_sentences("") == []
+        assert sentsplit.split_sentences(" \n ") == []
+
+    @pytest.mark.skipif(not nltk_available(), reason="NLTK punkt is not installed")
+    def test_nltk_parity_00(self):
+        from test.test_bookparse import TestBook
+
+        texts = [" ".join(s) for s in read_corpus()] + [TestBook.story]
+        same = total = 0
+        for text in texts:
+            builtin = set(sentsplit.split_sentences(text))
+            punkt = sentsplit._nltk_split(text)
+            same += sum(s in builtin for s in punkt)
+            total += len(punkt)
+        assert same / total >= 0.9
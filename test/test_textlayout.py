@@ -0,0 +1,58 @@
+
+import pytest
+from PIL import ImageFont
+
+from textlayout import TextLayout
+
+
+class StubFont:
+    """Every character is 10 px wide, pair "AV" is kerned by -3 px"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def getlength(self, text: str) -> float:
+        self.calls += 1
+        return 10 * len(text) - 3 * text.count("AV")
+
+
+class TestTextLayout:
+
+    def test_width_00(self):
+        font = StubFont()
+        layout = TextLayout(font)
+
+        assert layout.width("") == 0
+        assert layout.width("abc") == 30
+        assert layout.width("AVAV") == 34
+        calls = font.calls
+        assert layout.width("VAVA") == 37
+        # all characters and pairs are cached
+        assert font.calls == calls
+
+    def test_width_01(self, font_path):
+        font = ImageFont.truetype(font_path, 32)
+        layout = TextLayout(font)
+        text = "Все счастливые семьи похожи друг на друга. AVATAR, «Ёлка» — Wa!"
+
+        assert layout.width(text) == pytest.approx(font.getlength(text))
+
+    def test_wrap_00(self):
+        layout = TextLayout(StubFont())
+
+        assert layout.wrap("aa bb cc  dddd", 50) == ["aa bb", "cc", "dddd"]
+        assert layout.wrap("aaaaaaa b", 30) == ["aaa", "aaa", "a b"]
+        assert layout.wrap("   ", 30) == []
+
+    def test_wrap_01(self):
+        layout = TextLayout(StubFont())
+        # "AV" is narrower than 20 px
+        assert layout.wrap("xAV AV", 50) == ["xAV", "AV"]
+        assert layout.wrap("xAV AV", 57) == ["xAV AV"]
+
+    def test_shorten_00(self):
+        layout = TextLayout(StubFont())
+
+        assert layout.shorten("aa   bb", 70) == "aa bb"
+        assert layout.shorten("aa bb cc", 70) == "aa..."
+        assert layout.shorten("aaaaaaaa", 70) == "aaaa..."
@@ -0,0 +1,101 @@
+from typing import List
+
+from PIL import ImageFont
+
+PLACEHOLDER = "..."
+
+
+class TextLayout:
+    """
+    Measures and wraps text of one font by width in pixels.
+
+    Advance widths of characters and kerning of character pairs are
+    requested from FreeType once and cached, width of a text is a sum
+    of cached values. Kerning of a pair is `getlength(pair)` minus advances
+    of its characters, so widths are the same as `font.getlength(text)`
+    for fonts without ligatures.
+    """
+    _advances: dict     # char -> advance width
+    _kerning: dict      # (char, char) -> kerning
+
+    def __init__(self, font: ImageFont.FreeTypeFont):
+        self.font = font
+        self._advances = {}
+        self._kerning = {}
+
+    def advance(self, char: str) -> float:
+        advance = self._advances.get(char)
+        if advance is None:
+            advance = self._advances[char] = self.font.getlength(char)
+        return advance
+
+    def kerning(self, left: str, right: str) -> float:
+        pair = (left, right)
+        kerning = self._kerning.get(pair)
+        if kerning is None:
+            kerning = self.font.getlength(left + right) \
+                      - self.advance(left) - self.advance(right)
+            self._kerning[pair] = kerning
+        return kerning
+
+    def width(self, text: str) -> float:
+        """Width of `text` in pixels"""
+        if not text:
+            return 0.0
+        width = self.advance(text[0])
+        for left, right in zip(text, text[1:]):
+            width += self.advance(right) + self.kerning(left, right)
+        return width
+
+    def wrap(self, text: str, max_width: float) -> List[str]:
+        """
+        Split `text` into lines not wider than `max_width` by spaces.
+        Words wider than `max_width` are split by characters
+        """
+        lines = []
+        line, line_width = "", 0.0
+        for word in text.split():
+            word_width = self.width(word)
+            if line:
+                joined_width = line_width + self._join_width(line[-1], ' ', word[0]) \
+                               + word_width
+                if joined_width <= max_width:
+                    line, line_width = line + ' ' + word, joined_width
+                    continue
+                lines.append(line)
+            if word_width > max_width:
+                *parts, word = self._split_word(word, max_width)
+                lines += parts
+                word_width = self.width(word)
+            line, line_width = word, word_width
+        if line:
+            lines.append(line)
+        return lines
+
+    def shorten(self, text: str, max_width: float, placeholder: str = PLACEHOLDER) -> str:
+        """
+        Collapse spaces of `text` and cut the last words to fit in `max_width`.
+        `placeholder` is appended to the cut text (as in `textwrap.shorten`)
+        """
+        text = " ".join(text.split())
+        if self.width(text) <= max_width:
+            return text
+        max_width -= self.width(placeholder)
+        lines = self.wrap(text, max_width)
+        if not lines:
+            return placeholder
+        return lines[0] + placeholder
+
+    def _join_width(self, left: str, space: str, right: str) -> float:
+        return self.kerning(left, space) + self.advance(space) + self.kerning(space, right)
+
+    def _split_word(self, word: str, max_width: float) -> List[str]:
+        parts = []
+        start, width = 0, self.advance(word[0])
+        for i in range(1, len(word)):
+            width += self.advance(word[i]) + self.kerning(word[i - 1], word[i])
+            if width > max_width:
+                parts.append(word[start:i])
+                start, width = i, self.advance(word[i])
+        parts.append(word[start:])
+        return parts